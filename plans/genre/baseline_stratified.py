@@ -7,7 +7,6 @@ from sklearn.dummy import DummyClassifier
 
 from nlp4musa2020.dataloaders.alf200k import ALF200KLoader, genre_target_labels
 import nlp4musa2020.evaluators as evaluators
-from nlp4musa2020.models.simplenn_genre import SimpleGenreNN
 
 dataloader = ALF200KLoader(
     'data/processed/dataset-lfm-genres.pickle',
@@ -1,5 +1,4 @@
 """lda plan for a random forest classifier model."""
-from dbispipeline.evaluators import GridEvaluator
 import dbispipeline.result_handlers as result_handlers
 from sklearn.ensemble import ExtraTreesClassifier
 from sklearn.pipeline import Pipeline
@@ -9,6 +8,7 @@ from nlp4musa2020.dataloaders import vectorizer
 from nlp4musa2020.dataloaders.alf200k import ALF200KLoader
 from nlp4musa2020.dataloaders.alf200k import genre_target_labels
 import nlp4musa2020.evaluators as evaluators
+from nlp4musa2020.evaluators.forest import WarmStartForestEvaluator
 
 dataloader = ALF200KLoader(
     path='data/processed/dataset-lfm-genres.pickle',
@@ -22,7 +22,7 @@ pipeline = Pipeline([
     ('model', ExtraTreesClassifier(n_jobs=-1)),
 ])
 
-evaluator = GridEvaluator(
+evaluator = WarmStartForestEvaluator(
     parameters={
         'model__n_estimators': [10, 100, 300],
     },
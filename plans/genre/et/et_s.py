@@ -1,5 +1,4 @@
 """Plan for a random forest classifier model."""
-from dbispipeline.evaluators import GridEvaluator
 import dbispipeline.result_handlers as result_handlers
 from sklearn.ensemble import ExtraTreesClassifier
 from sklearn.pipeline import Pipeline
@@ -8,6 +7,7 @@ from sklearn.preprocessing import StandardScaler
 from nlp4musa2020.dataloaders.alf200k import ALF200KLoader
 from nlp4musa2020.dataloaders.alf200k import genre_target_labels
 import nlp4musa2020.evaluators as evaluators
+from nlp4musa2020.evaluators.forest import WarmStartForestEvaluator
 
 dataloader = ALF200KLoader(
     path='data/processed/dataset-lfm-genres.pickle',
@@ -23,7 +23,7 @@ pipeline = Pipeline([
     ('model', ExtraTreesClassifier(n_jobs=-1)),
 ])
 
-evaluator = GridEvaluator(
+evaluator = WarmStartForestEvaluator(
     parameters={
         'model__n_estimators': [10, 100, 300],
     },
@@ -1,14 +1,17 @@
 """Plan for a knn model, rhymes, statist., statist. time, explicit, audio."""
-from dbispipeline.evaluators import GridEvaluator
 import dbispipeline.result_handlers as result_handlers
-from sklearn.neighbors import KNeighborsClassifier
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 
 from nlp4musa2020.dataloaders.alf200k import ALF200KLoader
+from nlp4musa2020.dataloaders.vectorizer import CorpusCounts
 from nlp4musa2020.dataloaders.vectorizer import lda
 from nlp4musa2020.dataloaders.vectorizer import tfidf
 import nlp4musa2020.evaluators as evaluators
+from nlp4musa2020.evaluators.knn import SharedNeighborsEvaluator
+from nlp4musa2020.models.neighbors import ExactKNeighborsClassifier
+
+corpus = CorpusCounts()
 
 dataloader = ALF200KLoader(
     path='data/processed/dataset-lfm-genres.pickle',
@@ -19,7 +22,7 @@ dataloader = ALF200KLoader(
         'explicitness',
         'audio',
     ],
-    text_vectorizers=lda() + tfidf(),
+    text_vectorizers=lda(corpus=corpus) + tfidf(corpus=corpus),
     target=[
         'alternative',
         'blues',
@@ -42,10 +45,10 @@ dataloader = ALF200KLoader(
 
 pipeline = Pipeline([
     ('scaler', StandardScaler()),
-    ('model', KNeighborsClassifier(n_jobs=-1, algorithm='ball_tree')),
+    ('model', ExactKNeighborsClassifier(n_jobs=-1)),
 ])
 
-evaluator = GridEvaluator(
+evaluator = SharedNeighborsEvaluator(
     parameters={
         'model__n_neighbors': [3, 4, 5, 10],
         'model__weights': ['distance'],
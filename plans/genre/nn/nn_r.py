@@ -7,8 +7,11 @@ from sklearn.svm import LinearSVR
 
 from nlp4musa2020.dataloaders.alf200k import ALF200KLoader, genre_target_labels
 import nlp4musa2020.evaluators as evaluators
+from nlp4musa2020.models import training_log
 from nlp4musa2020.models.simplenn_genre import SimpleGenreNN
 
+TRAINING_LOG = training_log.log_path('nn_r')
+
 dataloader = ALF200KLoader(
     'data/processed/dataset-lfm-genres.pickle',
     load_feature_groups=[
@@ -20,7 +23,10 @@ dataloader = ALF200KLoader(
 
 pipeline = Pipeline([
     ('scaler', StandardScaler()),
-    ('model', SimpleGenreNN(epochs=50)),
+    ('model', SimpleGenreNN(
+        epochs=50,
+        training_log=TRAINING_LOG,
+    )),
 ])
 
 evaluator = GridEvaluator(
@@ -38,4 +44,5 @@ evaluator = GridEvaluator(
 
 result_handlers = [
     result_handlers.print_gridsearch_results,
+    training_log.result_handler(TRAINING_LOG),
 ]
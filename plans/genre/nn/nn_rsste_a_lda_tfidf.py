@@ -6,11 +6,17 @@ from sklearn.preprocessing import StandardScaler
 
 from nlp4musa2020.dataloaders.alf200k import ALF200KLoader
 from nlp4musa2020.dataloaders.alf200k import genre_target_labels
+from nlp4musa2020.dataloaders.vectorizer import CorpusCounts
 from nlp4musa2020.dataloaders.vectorizer import lda
 from nlp4musa2020.dataloaders.vectorizer import tfidf
 import nlp4musa2020.evaluators as evaluators
+from nlp4musa2020.models import training_log
 from nlp4musa2020.models.simplenn_genre import SimpleGenreNN
 
+TRAINING_LOG = training_log.log_path('nn_rsste_a_lda_tfidf')
+
+corpus = CorpusCounts()
+
 dataloader = ALF200KLoader(
     path='data/processed/dataset-lfm-genres.pickle',
     load_feature_groups=[
@@ -20,13 +26,16 @@ dataloader = ALF200KLoader(
         'explicitness',
         'audio',
     ],
-    text_vectorizers=lda() + tfidf(),
+    text_vectorizers=lda(corpus=corpus) + tfidf(corpus=corpus),
     target=genre_target_labels(),
 )
 
 pipeline = Pipeline([
     ('scaler', StandardScaler()),
-    ('model', SimpleGenreNN(epochs=50)),
+    ('model', SimpleGenreNN(
+        epochs=50,
+        training_log=TRAINING_LOG,
+    )),
 ])
 
 evaluator = GridEvaluator(
@@ -42,4 +51,5 @@ evaluator = GridEvaluator(
 
 result_handlers = [
     result_handlers.print_gridsearch_results,
+    training_log.result_handler(TRAINING_LOG),
 ]
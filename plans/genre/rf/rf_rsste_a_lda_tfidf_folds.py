@@ -0,0 +1,53 @@
+"""Plan for a random forest classifier with text features fitted per fold."""
+import dbispipeline.result_handlers as result_handlers
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import FeatureUnion
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from nlp4musa2020.dataloaders.alf200k import ALF200KLoader
+from nlp4musa2020.dataloaders.alf200k import genre_target_labels
+import nlp4musa2020.evaluators as evaluators
+from nlp4musa2020.evaluators.forest import WarmStartForestEvaluator
+from nlp4musa2020.transformers.features import FeatureGroupSelector
+from nlp4musa2020.transformers.text import LDABlock
+from nlp4musa2020.transformers.text import TfidfBlock
+
+feature_groups = [
+    'rhymes',
+    'statistical',
+    'statistical_time',
+    'explicitness',
+    'audio',
+]
+memory = 'data/cache'
+
+dataloader = ALF200KLoader(
+    path='data/processed/dataset-lfm-genres.pickle',
+    load_feature_groups=feature_groups,
+    target=genre_target_labels(),
+    include_text=True,
+)
+
+pipeline = Pipeline([
+    ('features',
+     FeatureUnion([
+         ('groups', FeatureGroupSelector(groups=feature_groups)),
+         ('lda', LDABlock(memory=memory)),
+         ('tfidf_word', TfidfBlock(analyzer='word', memory=memory)),
+         ('tfidf_char', TfidfBlock(analyzer='char', memory=memory)),
+     ])),
+    ('scaler', StandardScaler(with_mean=False)),
+    ('model', RandomForestClassifier(n_jobs=-1)),
+])
+
+evaluator = WarmStartForestEvaluator(
+    parameters={
+        'model__n_estimators': [10, 100, 300],
+    },
+    grid_parameters=evaluators.grid_parameters_genres(),
+)
+
+result_handlers = [
+    result_handlers.print_gridsearch_results,
+]
@@ -1,13 +1,12 @@
 """Config for a linear regression model evaluated on a diabetes dataset."""
-from dbispipeline.evaluators import GridEvaluator
 import dbispipeline.result_handlers as result_handlers
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 
 from nlp4musa2020.dataloaders.alf200k import ALF200KLoader, genre_target_labels
 import nlp4musa2020.evaluators as evaluators
-from sklearn.svm import LinearSVC
-from sklearn.multioutput import MultiOutputClassifier
+from nlp4musa2020.evaluators.warm_start import WarmStartEvaluator
+from nlp4musa2020.models.linear import MultiLabelLinearSVC
 
 dataloader = ALF200KLoader(
     'data/processed/dataset-lfm-genres.pickle',
@@ -20,21 +19,21 @@ dataloader = ALF200KLoader(
 
 pipeline = Pipeline([
     ('scaler', StandardScaler()),
-    ('model', MultiOutputClassifier(LinearSVC())),
+    ('model', MultiLabelLinearSVC(n_jobs=-1)),
 ])
 
-evaluator = GridEvaluator(
+evaluator = WarmStartEvaluator(
     parameters={
-        'model__estimator__C': [
+        'model__C': [
             0.1,
             0.5,
             1.0,
             2.0,
             5.0,
         ],
-        'model__estimator__loss': ['epsilon_insensitive'],
     },
     grid_parameters=evaluators.grid_parameters_genres(),
+    warm_start_parameter='model__C',
 )
 
 result_handlers = [
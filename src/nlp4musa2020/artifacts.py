@@ -0,0 +1,193 @@
+"""Refits the best model of a plan and persists it for scoring new tracks.
+
+The evaluators do not refit, hence nothing trained during an evaluation is
+kept. After a plan was evaluated, refit trains its pipeline with the best
+parameters on all data and save stores it in a directory together with the
+fitted text vectorizers and the feature schema of the ALF200KLoader:
+
+    pipeline.joblib     the fitted pipeline.
+    vectorizers.joblib  the fitted text vectorizers of the loader, or None.
+    schema.json         the features, target and layout of the loader.
+
+load restores a loader whose transform computes the features of new tracks
+with the same layout, together with the pipeline.
+"""
+import json
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+
+from .dataloaders.alf200k import ALF200KLoader
+from .dataloaders.cache import detach_vectorizer
+
+PIPELINE_FILE = 'pipeline.joblib'
+VECTORIZERS_FILE = 'vectorizers.joblib'
+SCHEMA_FILE = 'schema.json'
+
+
+def best_params(result, ranking_score='f1_micro'):
+    """Returns the best parameters of an evaluation result.
+
+    Args:
+        result: the result of a GridEvaluator or one of the evaluators in
+            nlp4musa2020.evaluators.
+        ranking_score: the score used to select the best candidate if the
+            evaluator did not select one, i.e. with multiple scores.
+    """
+    if result.get('best_params') is not None:
+        return result['best_params']
+
+    cv_results = result['cv_results']
+    column = f'mean_test_{ranking_score}'
+    if column not in cv_results:
+        column = 'mean_test_score'
+    if column not in cv_results:
+        raise ValueError(f'The results contain no {ranking_score} score.')
+
+    scores = pd.Series(cv_results[column])
+    return cv_results['params'][scores.idxmax()]
+
+
+def refit(pipeline, params, data):
+    """Trains a copy of the pipeline with the given parameters on all data.
+
+    Args:
+        pipeline: the (unfitted) pipeline of the plan.
+        params: the parameters set before fitting, e.g. from best_params.
+        data: the tuple (X, y) returned by the dataloader.
+    """
+    x, y = data
+    return clone(pipeline).set_params(**params).fit(x, y)
+
+
+def save(directory, pipeline, dataloader, info=None):
+    """Stores a fitted pipeline together with the featurization of a loader.
+
+    The text vectorizers are stored as fitted by the loader, hence the loader
+    has to be the one that loaded the training data of the pipeline. Corpus
+    counts shared between vectorizers are not stored.
+
+    Args:
+        directory: the directory to create or overwrite.
+        pipeline: the fitted pipeline.
+        dataloader: the ALF200KLoader whose load returned the training data
+            of the pipeline.
+        info: a dict of further json serializable information added to the
+            schema, e.g. the plan and the selected parameters.
+    """
+    if not isinstance(dataloader, ALF200KLoader):
+        raise ValueError('Only plans using the ALF200KLoader can be saved.')
+
+    vectorizers = dataloader.text_vectorizers
+    if vectorizers is not None:
+        # Refitting would not reproduce the features of the training data,
+        # e.g. for the LDA topics.
+        if not all(_is_fitted(vectorizer) for vectorizer in vectorizers):
+            raise ValueError('The text vectorizers of the loader are not '
+                             'fitted, pass the loader that loaded the data.')
+        vectorizers = [detach_vectorizer(v) for v in vectorizers]
+
+    schema = {
+        'features': list(dataloader.features),
+        'feature_groups': None,
+        'target': dataloader.target,
+        'dtype': str(dataloader.dtype),
+        'sparse': dataloader.sparse,
+        'include_text': dataloader.include_text,
+        'text_vectorizers': str(dataloader.text_vectorizers),
+    }
+    if dataloader.from_feature_groups:
+        schema['feature_groups'] = {
+            group: dataloader.feature_groups[group]
+            for group in dataloader.load_feature_groups
+        }
+    schema.update(info or {})
+
+    os.makedirs(directory, exist_ok=True)
+    joblib.dump(pipeline, os.path.join(directory, PIPELINE_FILE))
+    joblib.dump(vectorizers, os.path.join(directory, VECTORIZERS_FILE))
+    with open(os.path.join(directory, SCHEMA_FILE), 'w') as schema_file:
+        json.dump(schema, schema_file, indent=2, default=str)
+
+
+def load_featurizer(directory, extract_lyrics_features=False):
+    """Returns the schema and a loader featurizing new tracks.
+
+    Args:
+        directory: a directory created by save.
+        extract_lyrics_features: if True, the loader computes missing
+            features of the lyrics feature groups, see ALF200KLoader.
+    """
+    with open(os.path.join(directory, SCHEMA_FILE)) as schema_file:
+        schema = json.load(schema_file)
+
+    dataloader = ALF200KLoader(
+        path=None,
+        text_vectorizers=joblib.load(os.path.join(directory,
+                                                  VECTORIZERS_FILE)),
+        target=schema['target'],
+        features=schema['features'],
+        sparse=schema['sparse'],
+        dtype=schema['dtype'],
+        include_text=schema['include_text'],
+        extract_lyrics_features=extract_lyrics_features,
+    )
+    return schema, dataloader
+
+
+def load(directory, extract_lyrics_features=False):
+    """Returns the schema, the featurizing loader and the fitted pipeline.
+
+    Args:
+        directory: a directory created by save.
+        extract_lyrics_features: passed to load_featurizer.
+    """
+    schema, dataloader = load_featurizer(
+        directory, extract_lyrics_features=extract_lyrics_features)
+    pipeline = joblib.load(os.path.join(directory, PIPELINE_FILE))
+    return schema, dataloader, pipeline
+
+
+def predict(schema, pipeline, x):
+    """Predicts featurized tracks and decodes the predictions.
+
+    Args:
+        schema: the schema returned by load.
+        pipeline: the pipeline returned by load.
+        x: the features computed by the transform of the loader.
+    """
+    if (isinstance(x, pd.DataFrame) and not schema['include_text'] and
+            not hasattr(pipeline, 'feature_names_in_')):
+        # The pipeline was fitted on the stored feature blocks.
+        x = x.to_numpy()
+
+    return decode(schema, pipeline.predict(x))
+
+
+def decode(schema, predictions):
+    """Converts the predictions of a pipeline to json serializable values.
+
+    For multiple target labels, a prediction is the list of predicted
+    labels, otherwise the predicted value.
+
+    Args:
+        schema: the schema returned by load.
+        predictions: the predictions of the pipeline.
+    """
+    target = schema['target']
+    if isinstance(target, str):
+        return np.asarray(predictions).tolist()
+
+    labels = np.asarray(target)
+    return [labels[row != 0].tolist() for row in np.asarray(predictions)]
+
+
+def _is_fitted(vectorizer):
+    # Like check_is_fitted, which requires a fit method.
+    return any(
+        name.endswith('_') and not name.startswith('__')
+        for name in vars(vectorizer))
+
@@ -2,16 +2,195 @@
 import sys
 
 import click
+from dbispipeline.utils import LOGGER
 
 
-@click.command()
+@click.group()
 def main(args=None):
     """Console script for nlp4musa2020."""
-    click.echo('Replace this message by putting your code into '
-               'nlp4musa2020.cli.main')
-    click.echo('See click documentation at http://click.pocoo.org/')
     return 0
 
 
+@main.command()
+@click.option('--dryrun', is_flag=True, help='Don\'t store results into DB')
+@click.option('--force', is_flag=True, help='Run even if git is dirty')
+@click.option('--mail',
+              type=click.Choice(['none', 'run', 'total']),
+              default='none',
+              help='Mail notification level passed to the dbispipeline.')
+@click.option('--n-jobs',
+              type=int,
+              default=None,
+              help='Overrides the n_jobs parameters of all plans.')
+@click.option('--persist',
+              type=click.Path(file_okay=False),
+              default=None,
+              help='Refits the best pipelines and saves them to this '
+              'directory, one subdirectory per plan.')
+@click.option('--ranking-score',
+              default='f1_micro',
+              help='Score selecting the best parameters to refit.')
+@click.argument('plans', nargs=-1, required=True, type=click.Path(exists=True))
+def run(dryrun, force, mail, n_jobs, persist, ranking_score, plans):
+    """Runs all PLANS in one process, loading shared data only once.
+
+    PLANS are plan files or directories that are searched recursively.
+    """
+    from nlp4musa2020.runner import run_plans
+
+    if not force and _is_git_dirty():
+        LOGGER.error('Please commit your changes before you run the plans.')
+        sys.exit(1)
+
+    failed = run_plans(
+        plans,
+        dryrun=dryrun,
+        mail=None if mail == 'none' else mail,
+        n_jobs=n_jobs,
+        persist=persist,
+        ranking_score=ranking_score,
+    )
+    if failed:
+        sys.exit(1)
+
+
+@main.command()
+@click.option('--dryrun', is_flag=True, help='Don\'t store results into DB')
+@click.option('--force', is_flag=True, help='Run even if git is dirty')
+@click.option('--mail',
+              type=click.Choice(['none', 'run', 'total']),
+              default='none',
+              help='Mail notification level passed to every job.')
+@click.option('--cpus',
+              type=int,
+              default=None,
+              help='Number of CPUs to use, defaults to all available CPUs.')
+@click.option('--threads-per-job',
+              type=int,
+              default=4,
+              help='Number of threads each concurrently running job may use.')
+@click.option('--history',
+              type=click.Path(dir_okay=False),
+              default=None,
+              help='Json file used to read and store measured runtimes.')
+@click.argument('plans', nargs=-1, required=True, type=click.Path(exists=True))
+def schedule(dryrun, force, mail, cpus, threads_per_job, history, plans):
+    """Runs PLANS concurrently within a CPU budget.
+
+    Plans sharing a dataloader are run as one job. Jobs run in parallel
+    processes, each limited to --threads-per-job threads, longest first.
+    """
+    from nlp4musa2020.scheduler import schedule as schedule_plans
+
+    if not force and _is_git_dirty():
+        LOGGER.error('Please commit your changes before you run the plans.')
+        sys.exit(1)
+
+    failed = schedule_plans(
+        plans,
+        cpus=cpus,
+        threads_per_job=threads_per_job,
+        history_path=history,
+        dryrun=dryrun,
+        mail=None if mail == 'none' else mail,
+    )
+    sys.exit(1 if failed else 0)
+
+
+@main.command()
+@click.option('--chunk-size',
+              type=int,
+              default=1000,
+              help='Number of records featurized and predicted at once.')
+@click.option('--n-jobs',
+              type=int,
+              default=None,
+              help='Number of featurizing processes, defaults to all CPUs.')
+@click.option('--id-field',
+              default='id',
+              help='Field identifying the records in the output.')
+@click.option('--extract-lyrics-features',
+              is_flag=True,
+              help='Compute missing statistical and rhyme features from the '
+              'lyrics.')
+@click.argument('artifacts',
+                type=click.Path(exists=True, file_okay=False))
+@click.argument('input', type=click.File('r'))
+@click.argument('output', type=click.File('w'), default='-')
+def score(chunk_size, n_jobs, id_field, extract_lyrics_features, artifacts,
+          input, output):
+    """Predicts the json lines of INPUT with a persisted model.
+
+    ARTIFACTS is a directory created by run --persist. Every line of INPUT
+    ('-' for stdin) is a json object with the lyrics in 'text' and the
+    numeric features of the model. With --extract-lyrics-features, the
+    statistical and rhyme features may be omitted. One json line per
+    prediction is written to OUTPUT, defaulting to stdout.
+    """
+    from nlp4musa2020.scoring import score as score_lines
+
+    score_lines(
+        artifacts,
+        input,
+        output,
+        chunk_size=chunk_size,
+        n_jobs=n_jobs,
+        id_field=id_field,
+        extract_lyrics_features=extract_lyrics_features,
+    )
+
+
+@main.command()
+@click.option('--host', default='127.0.0.1', help='Interface to listen on.')
+@click.option('--port', type=int, default=8000, help='Port to listen on.')
+@click.option('--max-batch-size',
+              type=int,
+              default=64,
+              help='Maximal number of records predicted at once.')
+@click.option('--max-delay',
+              type=float,
+              default=0.005,
+              help='Seconds a batch waits for further records.')
+@click.option('--max-body-size',
+              type=int,
+              default=2**24,
+              help='Maximal size of a request body in bytes.')
+@click.option('--extract-lyrics-features',
+              is_flag=True,
+              help='Compute missing statistical and rhyme features from the '
+              'lyrics.')
+@click.argument('artifacts',
+                type=click.Path(exists=True, file_okay=False))
+def serve(host, port, max_batch_size, max_delay, max_body_size,
+          extract_lyrics_features, artifacts):
+    """Serves predictions of a persisted model over HTTP.
+
+    ARTIFACTS is a directory created by run --persist. Concurrent requests
+    to POST /predict are predicted in micro-batches, GET /metrics reports
+    the latency percentiles and the throughput.
+    """
+    from nlp4musa2020.server import serve as serve_artifacts
+
+    serve_artifacts(
+        artifacts,
+        host=host,
+        port=port,
+        max_batch_size=max_batch_size,
+        max_delay=max_delay,
+        max_body_size=max_body_size,
+        extract_lyrics_features=extract_lyrics_features,
+    )
+
+
+def _is_git_dirty():
+    # GitPython is slow to import and only needed by run and schedule.
+    import git
+
+    try:
+        return git.Repo(search_parent_directories=True).is_dirty()
+    except git.GitError:
+        return False
+
+
 if __name__ == '__main__':
     sys.exit(main())  # pragma: no cover
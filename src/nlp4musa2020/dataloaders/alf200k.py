@@ -3,6 +3,10 @@ import pickle
 
 from dbispipeline.base import Loader
 import numpy as np
+from scipy import sparse
+
+from . import store
+from .cache import VectorizerCache
 
 
 def pearson_correlated_20():
@@ -46,8 +50,23 @@ def genre_target_labels():
     ]
 
 
+def lyrics_extractors():
+    """Returns the extractors computing feature groups from the lyrics.
+
+    The extractors are stateless vectorizers returning the columns of the
+    feature group in the order of ALF200KLoader.feature_groups.
+    """
+    from ..lyrics.rhymes import RhymeFeatureExtractor
+    from ..lyrics.statistical import StatisticalFeatureExtractor
+
+    return {
+        'rhymes': RhymeFeatureExtractor(),
+        'statistical': StatisticalFeatureExtractor(),
+    }
+
+
 class ALF200KLoader(Loader):
-    """Loads the ALF200K dataset from a pickled dataframe."""
+    """Loads the ALF200K dataset from a pickled dataframe or a store."""
 
     feature_groups = {
         'rhymes': [
@@ -126,12 +145,19 @@ class ALF200KLoader(Loader):
                  text_vectorizers=None,
                  target='popularity',
                  features=None,
-                 drop_duplicates=True):
+                 drop_duplicates=True,
+                 sparse=False,
+                 cache=None,
+                 dtype='float64',
+                 include_text=False,
+                 extract_lyrics_features=False):
         """Intitializes the dataloader object.
 
         Parameters:
             path (str): The path to the pickled dataframe containing the
-                ALF200k dataset.
+                ALF200k dataset or to a dataset store created by
+                tools/convert_dataset.py. For stores, only the needed columns
+                are read and feature groups are memory mapped if available.
             feature_groups (list): The list of feature groups to load. If None
                 (default), load all features.
             text_vectorizers (list): List of feature vectorizers to run on the
@@ -139,13 +165,45 @@ class ALF200KLoader(Loader):
             features (list): if set, the feature_groups are ignored and the
                 loader selects those features.
             drop_duplicates (bool): drops duplicates based on title and artist.
+            sparse (bool): if True, the vectorized texts are kept as sparse
+                matrices and joined with the numeric features into one CSR
+                matrix instead of a dense array. Only useful in combination
+                with text_vectorizers and models accepting sparse input.
+            cache (str or VectorizerCache): if set, the outputs of the text
+                vectorizers are cached on disk. A string is used as the cache
+                directory of a VectorizerCache with default size.
+            dtype (str): the dtype of the numeric features and the vectorized
+                texts, e.g. 'float32' to halve the memory footprint. Pass the
+                same dtype to the vectorizer factories to avoid conversions.
+            include_text (bool): if True, the features are returned as a
+                dataframe together with the raw 'text' column. This allows to
+                vectorize the lyrics inside the pipeline per fold, see
+                nlp4musa2020.transformers. Cannot be combined with
+                text_vectorizers.
+            extract_lyrics_features (bool): if True, transform computes the
+                features of the groups returned by lyrics_extractors from the
+                lyrics if they are missing. The extracted values only
+                approximate the dataset columns, check them with
+                tools/check_lyrics.py before enabling this.
         """
+        if include_text and text_vectorizers is not None:
+            raise ValueError(
+                'include_text cannot be combined with text_vectorizers.')
+
         self.path = path
         self.load_feature_groups = load_feature_groups
         self.text_vectorizers = text_vectorizers
         self.target = target
         self.drop_duplicates = drop_duplicates
+        self.sparse = sparse
+        if isinstance(cache, str):
+            cache = VectorizerCache(cache)
+        self.cache = cache
+        self.dtype = dtype
+        self.include_text = include_text
+        self.extract_lyrics_features = extract_lyrics_features
 
+        self.from_feature_groups = features is None
         if features is not None:
             self.features = features
         else:
@@ -155,32 +213,161 @@ class ALF200KLoader(Loader):
 
     def load(self):
         """Load the dataset as a dataframe."""
-        # Load the dataframe from the pickle file.
-        df = pickle.load(open(self.path, 'rb'))
+        blocks = None
+        if store.is_store(self.path):
+            if self._use_group_blocks():
+                blocks = store.read_groups(
+                    self.path,
+                    self.load_feature_groups,
+                    drop_duplicates=self.drop_duplicates,
+                )
+            df = store.read_store(
+                self.path,
+                columns=self._columns(with_features=blocks is None),
+                drop_duplicates=self.drop_duplicates,
+            )
+        else:
+            # Load the dataframe from the pickle file.
+            df = pickle.load(open(self.path, 'rb'))
 
-        if self.drop_duplicates is True:
-            df = df.drop_duplicates(['name', 'artist_name'])
+            if self.drop_duplicates is True:
+                df = df.drop_duplicates(['name', 'artist_name'])
 
         # Extract the popularity as the target label.
         y = df[self.target].to_numpy()
 
+        if self.include_text:
+            X = df[self.features].astype(self.dtype)  # noqa: N806
+            X['text'] = df['text']
+            return X, y
+
         # Load the selected features.
-        X = df[self.features]  # noqa: N806
+        if blocks is None:
+            X = df[self.features].astype(self.dtype)  # noqa: N806
+            blocks = [X.to_numpy()]
+        else:
+            # Views on the memory mapped blocks, only copied if the dtype
+            # differs from the stored one.
+            blocks = [block.astype(self.dtype, copy=False) for block in blocks]
+            if len(blocks) == 1:
+                X = blocks[0]  # noqa: N806
+            elif self.text_vectorizers is None:
+                X = np.hstack(blocks)  # noqa: N806
 
         if self.text_vectorizers is not None:
-            data = [X.to_numpy().astype('float64')]
-            for vectorizer in self.text_vectorizers:
-                vectorized = vectorizer.fit_transform(df['text'])
-                try:
-                    vectorized = vectorized.todense().astype('float64')
-                except AttributeError:
-                    pass
-                data.append(vectorized)
-            X = np.hstack(data)  # noqa: N806
+            X = self._vectorize(blocks, df['text'], fit=True)  # noqa: N806
 
         # Done.
         return X, y
 
+    def transform(self, df):
+        """Computes the features of new tracks like load.
+
+        The text vectorizers have to be fitted, e.g. by a previous call of
+        load. The columns of the result have the same layout as the ones
+        returned by load. Without text vectorizers, a dataframe is returned.
+        With extract_lyrics_features, features of groups that can be computed
+        from the lyrics, see lyrics_extractors, are computed if they are
+        missing in df.
+
+        Args:
+            df: a dataframe containing the input_columns.
+        """
+        if self.extract_lyrics_features:
+            df = self._extract_missing(df)
+        X = df[self.features].astype(self.dtype)  # noqa: N806
+        if self.include_text:
+            X['text'] = df['text']
+            return X
+
+        if self.text_vectorizers is None:
+            return X
+
+        return self._vectorize([X.to_numpy()], df['text'], fit=False)
+
+    def input_columns(self):
+        """Returns the columns of the dataframe passed to transform."""
+        extracted = set()
+        if self.extract_lyrics_features:
+            for group in lyrics_extractors():
+                extracted.update(self.feature_groups[group])
+
+        columns = [
+            feature for feature in self.features if feature not in extracted
+        ]
+        if (len(columns) < len(self.features) or
+                self.text_vectorizers is not None or self.include_text):
+            columns.append('text')
+
+        return columns
+
+    def _extract_missing(self, df):
+        """Adds missing features computed from the lyrics to df."""
+        missing = [
+            feature for feature in self.features if feature not in df.columns
+        ]
+        if not missing or 'text' not in df.columns:
+            return df
+
+        extracted = {}
+        for group, extractor in lyrics_extractors().items():
+            columns = self.feature_groups[group]
+            if any(feature in missing for feature in columns):
+                values = extractor.transform(df['text'])
+                for column, feature in enumerate(columns):
+                    if feature in missing:
+                        extracted[feature] = values[:, column]
+
+        return df.assign(**extracted)
+
+    def _vectorize(self, blocks, texts, fit):
+        """Joins the feature blocks with the vectorized texts."""
+        data = list(blocks)
+        for i, vectorizer in enumerate(self.text_vectorizers):
+            if not fit:
+                vectorized = vectorizer.transform(texts)
+            elif self.cache is not None:
+                # On a cache hit, the vectorizer that computed the cached
+                # matrix replaces the unfitted one.
+                vectorized, fitted = self.cache.fit_transform(
+                    vectorizer,
+                    texts,
+                    self.drop_duplicates,
+                )
+                self.text_vectorizers[i] = fitted
+            else:
+                vectorized = vectorizer.fit_transform(texts)
+            if sparse.issparse(vectorized):
+                vectorized = vectorized.astype(self.dtype, copy=False)
+                if not self.sparse:
+                    vectorized = vectorized.toarray()
+            else:
+                vectorized = np.asarray(vectorized, dtype=self.dtype)
+            data.append(vectorized)
+
+        if self.sparse:
+            return sparse.hstack(data, format='csr')
+
+        return np.hstack(data)
+
+    def _use_group_blocks(self):
+        """Checks if the features can be read from the stored blocks."""
+        return (self.from_feature_groups and not self.include_text and
+                len(self.load_feature_groups) > 0 and
+                store.has_groups(self.path, self.load_feature_groups))
+
+    def _columns(self, with_features=True):
+        """Returns the columns of the dataset needed by this loader."""
+        columns = list(self.features) if with_features else []
+        if isinstance(self.target, str):
+            columns.append(self.target)
+        else:
+            columns.extend(self.target)
+        if self.text_vectorizers is not None or self.include_text:
+            columns.append('text')
+
+        return columns
+
     @property
     def configuration(self):
         """Returns a dict-like representation of the configuration."""
@@ -192,4 +379,8 @@ class ALF200KLoader(Loader):
             'text_vectorizers': str(self.text_vectorizers),
             'target': self.target,
             'drop_duplicates': self.drop_duplicates,
+            'sparse': self.sparse,
+            'cache': str(self.cache),
+            'dtype': str(self.dtype),
+            'include_text': self.include_text,
         }
@@ -0,0 +1,245 @@
+"""Persistent on-disk cache for the output of text vectorizers."""
+import copy
+import hashlib
+import json
+import os
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+def dataset_hash(texts):
+    """Computes a content hash of the given texts.
+
+    Args:
+        texts: a pandas series containing the texts.
+    """
+    hashes = pd.util.hash_pandas_object(texts, index=False)
+    return hashlib.sha1(hashes.to_numpy().tobytes()).hexdigest()
+
+
+def vectorizer_parameters(vectorizer):
+    """Returns a json serializable representation of a vectorizer.
+
+    Args:
+        vectorizer: the vectorizer to describe.
+    """
+    try:
+        params = vectorizer.get_params()
+    except AttributeError:
+        params = vars(vectorizer)
+
+    return {
+        'class': type(vectorizer).__name__,
+        'params': {name: repr(value) for name, value in params.items()},
+    }
+
+
+def detach_vectorizer(vectorizer):
+    """Returns a copy of a fitted vectorizer suitable to be stored.
+
+    Shared corpus counts and the stop_words_ of scikit-learn vectorizers,
+    which contain all pruned n-grams, are only needed for fitting and are
+    left out.
+
+    Args:
+        vectorizer: the fitted vectorizer.
+    """
+    vectorizer = copy.copy(vectorizer)
+    if getattr(vectorizer, 'corpus', None) is not None:
+        vectorizer.corpus = None
+    if hasattr(vectorizer, 'stop_words_'):
+        del vectorizer.stop_words_
+    return vectorizer
+
+
+class VectorizerCache:
+    """Stores vectorized texts on disk with a size bounded LRU eviction.
+
+    Sparse matrices are stored as .npz and dense arrays as .npy files. The
+    latter are read memory mapped. The fitted vectorizer is stored next to
+    its matrix as .joblib file, so that a cache hit also provides a
+    vectorizer transforming new texts into the same feature space. Each
+    entry is addressed by a hash of the texts, the drop duplicates flag of
+    the loader and the parameters of the vectorizer. The files of an entry
+    are used, accounted and evicted together.
+    """
+
+    EXTENSIONS = ('.npz', '.npy', '.joblib')
+
+    def __init__(self, directory, max_size=10 * 2**30):
+        """Initializes the cache.
+
+        Args:
+            directory: the directory used to store the cached matrices.
+            max_size: the maximal size of the cache in bytes. The least
+                recently used entries are evicted if this size is exceeded.
+        """
+        self.directory = directory
+        self.max_size = max_size
+
+    def key(self, vectorizer, texts, drop_duplicates):
+        """Returns the cache key of a vectorizer run.
+
+        Args:
+            vectorizer: the vectorizer used to transform the texts.
+            texts: a pandas series containing the texts.
+            drop_duplicates: the drop duplicates flag of the loader.
+        """
+        description = json.dumps(
+            {
+                'dataset': dataset_hash(texts),
+                'drop_duplicates': drop_duplicates,
+                'vectorizer': vectorizer_parameters(vectorizer),
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha1(description.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Returns the cached matrix for a key or None if it is missing.
+
+        Args:
+            key: the cache key.
+        """
+        for ext in ['.npz', '.npy']:
+            path = os.path.join(self.directory, key + ext)
+            try:
+                if ext == '.npz':
+                    matrix = sparse.load_npz(path)
+                else:
+                    matrix = np.load(path, mmap_mode='r')
+            except FileNotFoundError:
+                continue
+
+            self._touch(key)
+            return matrix
+
+        return None
+
+    def get_vectorizer(self, key):
+        """Returns the fitted vectorizer of a key or None if it is missing.
+
+        Args:
+            key: the cache key.
+        """
+        path = os.path.join(self.directory, key + '.joblib')
+        try:
+            vectorizer = joblib.load(path)
+        except FileNotFoundError:
+            return None
+
+        self._touch(key)
+        return vectorizer
+
+    def put(self, key, matrix, vectorizer=None):
+        """Stores a matrix in the cache and evicts old entries if needed.
+
+        Args:
+            key: the cache key.
+            matrix: a sparse matrix or a dense array.
+            vectorizer: the fitted vectorizer which computed the matrix.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+
+        # Files of a previous fit of the same key are replaced or removed.
+        self._remove(key)
+        if vectorizer is not None:
+            vectorizer = detach_vectorizer(vectorizer)
+            self._write(key + '.joblib',
+                        lambda file: joblib.dump(vectorizer, file))
+        if sparse.issparse(matrix):
+            self._write(key + '.npz',
+                        lambda file: sparse.save_npz(file, matrix))
+        else:
+            self._write(key + '.npy',
+                        lambda file: np.save(file, np.asarray(matrix)))
+
+        self.evict()
+
+    def _write(self, name, write):
+        """Writes a file atomically by calling write with a temporary file."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as tmp_file:
+            write(tmp_file)
+        os.replace(tmp_path, os.path.join(self.directory, name))
+
+    def _paths(self, key):
+        """Returns the paths of all files an entry may consist of."""
+        return [
+            os.path.join(self.directory, key + ext) for ext in self.EXTENSIONS
+        ]
+
+    def _touch(self, key):
+        """Marks all files of an entry as recently used."""
+        for path in self._paths(key):
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+
+    def _remove(self, key):
+        """Removes all files of an entry."""
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def evict(self):
+        """Removes the least recently used entries exceeding the max size.
+
+        The size of an entry is the size of all its files, its last use the
+        latest modification of one of them.
+        """
+        entries = {}
+        for name in os.listdir(self.directory):
+            key, ext = os.path.splitext(name)
+            if ext not in self.EXTENSIONS:
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            mtime, size = entries.get(key, (0, 0))
+            entries[key] = (max(mtime, stat.st_mtime), size + stat.st_size)
+
+        size = sum(entry_size for _, entry_size in entries.values())
+        for (_, entry_size), key in sorted(
+                (entry, key) for key, entry in entries.items()):
+            if size <= self.max_size:
+                break
+            self._remove(key)
+            size -= entry_size
+
+    def fit_transform(self, vectorizer, texts, drop_duplicates):
+        """Returns the vectorized texts and the fitted vectorizer.
+
+        If the texts are not cached, the vectorizer is fitted and returned.
+        Otherwise the vectorizer that computed the cached matrix is
+        returned, with the corpus of the given vectorizer.
+
+        Args:
+            vectorizer: the vectorizer used to transform the texts.
+            texts: a pandas series containing the texts.
+            drop_duplicates: the drop duplicates flag of the loader.
+        """
+        key = self.key(vectorizer, texts, drop_duplicates)
+        matrix = self.get(key)
+        fitted = None if matrix is None else self.get_vectorizer(key)
+        if fitted is None:
+            matrix = vectorizer.fit_transform(texts)
+            self.put(key, matrix, vectorizer)
+            return matrix, vectorizer
+
+        if hasattr(vectorizer, 'corpus'):
+            fitted.corpus = vectorizer.corpus
+        return matrix, fitted
+
+    def __repr__(self):
+        """Returns a string representation of the cache."""
+        return (f'VectorizerCache(directory={self.directory!r}, '
+                f'max_size={self.max_size!r})')
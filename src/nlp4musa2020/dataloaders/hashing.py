@@ -0,0 +1,148 @@
+"""Stateless hashing based text vectorizers running on text shards."""
+from joblib import delayed
+from joblib import Parallel
+import numpy as np
+from scipy import sparse
+from sklearn.base import BaseEstimator
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+
+def _count_shard(vectorizer, texts, columns=None):
+    """Hashes a shard of texts.
+
+    Args:
+        vectorizer: the HashingVectorizer.
+        texts: the texts of the shard.
+        columns: if set, only the counts of these columns are returned.
+
+    Returns: the hashed counts and, without columns, the statistics of the
+        non-zero columns as a tuple (columns, term frequencies, document
+        frequencies), otherwise None.
+    """
+    counts = vectorizer.transform(texts)
+    if columns is not None:
+        return counts[:, columns], None
+
+    counts.sum_duplicates()
+    indices, document_frequencies = np.unique(counts.indices,
+                                              return_counts=True)
+    term_frequencies = np.bincount(np.searchsorted(indices, counts.indices),
+                                   weights=counts.data,
+                                   minlength=len(indices))
+
+    return counts, (indices, term_frequencies, document_frequencies)
+
+
+class ParallelHashingVectorizer(BaseEstimator):
+    """Hashing vectorizer processing shards of texts in parallel.
+
+    The texts are split into shards which are hashed independently in a
+    process pool, since hashing does not need a vocabulary. The term and
+    document frequencies of the non-zero columns are computed per shard and
+    reduced afterwards to select the most frequent columns and to compute
+    the idf weights. The shard counts are pruned to these columns before
+    they are stacked.
+    """
+
+    def __init__(self,
+                 analyzer='word',
+                 ngram_range=(1, 3),
+                 n_features=2**20,
+                 max_features=2_000,
+                 use_idf=True,
+                 norm='l2',
+                 shard_size=10_000,
+                 n_jobs=None,
+                 dtype=np.float64):
+        """Initializes the vectorizer.
+
+        Args:
+            analyzer: either 'word' or 'char'.
+            ngram_range: the n-gram range to hash.
+            n_features: the number of hash buckets.
+            max_features: the number of most frequent buckets to keep. If
+                None, all buckets are kept.
+            use_idf: if True, the counts are weighted by the idf (tf-idf).
+            norm: the norm used to normalize rows, None disables it.
+            shard_size: the number of texts per shard.
+            n_jobs: the number of processes used to hash the shards.
+            dtype: the dtype of the resulting matrix.
+        """
+        self.analyzer = analyzer
+        self.ngram_range = ngram_range
+        self.n_features = n_features
+        self.max_features = max_features
+        self.use_idf = use_idf
+        self.norm = norm
+        self.shard_size = shard_size
+        self.n_jobs = n_jobs
+        self.dtype = dtype
+
+    def _hashing_vectorizer(self):
+        return HashingVectorizer(
+            analyzer=self.analyzer,
+            ngram_range=self.ngram_range,
+            n_features=self.n_features,
+            alternate_sign=False,
+            norm=None,
+            dtype=np.float64,
+        )
+
+    def _count(self, X, columns=None):  # noqa: N803
+        """Hashes the texts shard wise.
+
+        Returns: the list of shard count matrices, restricted to columns if
+            given. Without columns, the term and document frequencies of all
+            columns reduced from the shard statistics are returned as well.
+        """
+        X = list(X)  # noqa: N806
+        vectorizer = self._hashing_vectorizer()
+        shards = Parallel(n_jobs=self.n_jobs)(
+            delayed(_count_shard)(vectorizer, X[i:i + self.shard_size],
+                                  columns)
+            for i in range(0, len(X), self.shard_size))
+        counts = [shard[0] for shard in shards]
+        if columns is not None:
+            return counts
+
+        term_frequencies = np.zeros(self.n_features)
+        document_frequencies = np.zeros(self.n_features, dtype=np.int64)
+        for _, (indices, shard_terms, shard_documents) in shards:
+            term_frequencies[indices] += shard_terms
+            document_frequencies[indices] += shard_documents
+
+        return counts, term_frequencies, document_frequencies
+
+    def fit_transform(self, X):  # noqa: N803
+        """Computes the features for X."""
+        counts, term_frequencies, document_frequencies = self._count(X)
+
+        columns = np.flatnonzero(term_frequencies)
+        if self.max_features is not None:
+            order = np.argsort(-term_frequencies[columns], kind='stable')
+            columns = np.sort(columns[order[:self.max_features]])
+        self.columns_ = columns
+
+        if self.use_idf:
+            n_documents = sum(shard.shape[0] for shard in counts)
+            self.idf_ = np.log(
+                (1 + n_documents) / (1 + document_frequencies[columns])) + 1
+
+        # The shards are pruned one by one before they are stacked.
+        for i, shard in enumerate(counts):
+            counts[i] = shard[:, columns]
+        return self._weight(sparse.vstack(counts, format='csr'))
+
+    def transform(self, X):  # noqa: N803
+        """Computes the features for X using the fitted columns and idf."""
+        counts = self._count(X, columns=self.columns_)
+        return self._weight(sparse.vstack(counts, format='csr'))
+
+    def _weight(self, counts):
+        if self.use_idf:
+            counts = counts @ sparse.diags(self.idf_)
+        if self.norm is not None:
+            counts = normalize(counts, norm=self.norm, copy=False)
+
+        return sparse.csr_matrix(counts, dtype=self.dtype)
@@ -0,0 +1,135 @@
+"""Columnar on-disk store for the ALF200k dataset.
+
+A store is a directory containing the dataset as a parquet file and a small
+json file with meta information. Optionally, each feature group is stored as
+a contiguous float64 block in a .npy file which is read memory mapped, such
+that processes on the same machine share the same physical pages.
+
+The rows are ordered such that the first occurrence of every
+(name, artist_name) pair comes first. Hence, dropping duplicates boils down
+to reading a prefix of the rows and does not require loading the name and
+artist columns.
+"""
+import json
+import os.path
+
+import numpy as np
+import pandas as pd
+
+DATA_FILE = 'data.parquet'
+META_FILE = 'meta.json'
+GROUPS_DIR = 'groups'
+
+
+def is_store(path):
+    """Checks if the given path points to a dataset store.
+
+    Args:
+        path: the path to check.
+    """
+    return os.path.isfile(os.path.join(path, META_FILE))
+
+
+def write_store(df,
+                path,
+                feature_groups=None,
+                duplicate_columns=('name', 'artist_name')):
+    """Writes a dataframe to a dataset store.
+
+    Args:
+        df: the dataframe to store.
+        path: the directory used to store the dataset.
+        feature_groups: a dict mapping group names to lists of columns. Each
+            group is additionally stored as a float64 block.
+        duplicate_columns: the columns used to identify duplicates.
+    """
+    os.makedirs(path, exist_ok=True)
+
+    duplicated = df.duplicated(list(duplicate_columns)).to_numpy()
+    df = pd.concat([df[~duplicated], df[duplicated]])
+    df = df.reset_index(drop=True)
+
+    df.to_parquet(os.path.join(path, DATA_FILE), index=False)
+
+    groups = {}
+    if feature_groups is not None:
+        os.makedirs(os.path.join(path, GROUPS_DIR), exist_ok=True)
+        for group, columns in feature_groups.items():
+            block = np.ascontiguousarray(df[columns].to_numpy('float64'))
+            np.save(_group_path(path, group), block)
+            groups[group] = list(columns)
+
+    meta = {
+        'rows': len(df),
+        'unique_rows': int((~duplicated).sum()),
+        'columns': [str(column) for column in df.columns],
+        'groups': groups,
+    }
+    with open(os.path.join(path, META_FILE), 'w') as meta_file:
+        json.dump(meta, meta_file, indent=2)
+
+
+def read_meta(path):
+    """Reads the meta information of a dataset store.
+
+    Args:
+        path: the directory of the store.
+    """
+    with open(os.path.join(path, META_FILE), 'r') as meta_file:
+        return json.load(meta_file)
+
+
+def read_store(path, columns=None, drop_duplicates=True):
+    """Reads selected columns from a dataset store.
+
+    Args:
+        path: the directory of the store.
+        columns: the columns to read. If None, all columns are read.
+        drop_duplicates: if True, only the first occurrence of each track is
+            returned.
+    """
+    if columns is not None:
+        columns = list(dict.fromkeys(columns))
+
+    df = pd.read_parquet(os.path.join(path, DATA_FILE), columns=columns)
+
+    if drop_duplicates is True:
+        df = df.iloc[:read_meta(path)['unique_rows']]
+
+    return df
+
+
+def read_groups(path, groups, drop_duplicates=True):
+    """Returns memory mapped views of the stored feature group blocks.
+
+    Args:
+        path: the directory of the store.
+        groups: the names of the feature groups to read.
+        drop_duplicates: if True, only the first occurrence of each track is
+            returned.
+    """
+    rows = None
+    if drop_duplicates is True:
+        rows = read_meta(path)['unique_rows']
+
+    blocks = []
+    for group in groups:
+        block = np.load(_group_path(path, group), mmap_mode='r')
+        blocks.append(block[:rows])
+
+    return blocks
+
+
+def has_groups(path, groups):
+    """Checks if all given feature groups are stored as blocks.
+
+    Args:
+        path: the directory of the store.
+        groups: the names of the feature groups.
+    """
+    stored = read_meta(path).get('groups', {})
+    return all(group in stored for group in groups)
+
+
+def _group_path(path, group):
+    return os.path.join(path, GROUPS_DIR, group.replace(' ', '_') + '.npy')
@@ -1,103 +1,585 @@
 """Commonly used predefined vectorizers."""
+from collections import Counter
+import copy
+import numbers
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator
 from sklearn.decomposition import LatentDirichletAllocation
 from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.feature_extraction.text import TfidfTransformer
 from sklearn.feature_extraction.text import TfidfVectorizer
 
+from .cache import dataset_hash
+from .hashing import ParallelHashingVectorizer
+from .vocabulary import StreamingVocabularyVectorizer
+
 
-def tfidf(max_features=2_000):
+def tfidf(max_features=2_000,
+          dtype=np.float64,
+          corpus=None,
+          streaming=False):
     """List of tf-idf vectorizers.
 
     Args:
         max_features: number of features to consider.
+        dtype: the dtype of the resulting matrices.
+        corpus: if set, a CorpusCounts object shared between vectorizers.
+        streaming: if True, the word vocabulary is selected with bounded
+            memory, see tfidf_word.
     """
     return [
-        tfidf_word(max_features=max_features),
-        tfidf_char(max_features=max_features),
+        tfidf_word(
+            max_features=max_features,
+            dtype=dtype,
+            corpus=corpus,
+            streaming=streaming,
+        ),
+        tfidf_char(max_features=max_features, dtype=dtype, corpus=corpus),
     ]
 
 
-def tfidf_word(max_features=2_000):
+def tfidf_word(max_features=2_000,
+               dtype=np.float64,
+               corpus=None,
+               streaming=False):
     """Word tf-idf vectorizer.
 
     Args:
         max_features: number of features to consider.
+        dtype: the dtype of the resulting matrix.
+        corpus: if set, a CorpusCounts object shared between vectorizers.
+        streaming: if True, the vocabulary is selected in two passes with
+            memory proportional to max_features instead of counting all
+            distinct n-grams. Ignored if corpus is set.
     """
+    if corpus is not None:
+        return SharedTfidfVectorizer(
+            corpus,
+            analyzer='word',
+            max_features=max_features,
+            dtype=dtype,
+        )
+
+    if streaming:
+        return StreamingVocabularyVectorizer(
+            analyzer='word',
+            max_features=max_features,
+            use_idf=True,
+            dtype=dtype,
+        )
+
     return TfidfVectorizer(
         ngram_range=(1, 3),
         analyzer='word',
         max_features=max_features,
+        dtype=np.dtype(dtype).type,
     )
 
 
-def tfidf_char(max_features=2_000):
+def tfidf_char(max_features=2_000, dtype=np.float64, corpus=None):
     """Char tf-idf vectorizer.
 
     Args:
         max_features: number of features to consider.
+        dtype: the dtype of the resulting matrix.
+        corpus: if set, a CorpusCounts object shared between vectorizers.
     """
+    if corpus is not None:
+        return SharedTfidfVectorizer(
+            corpus,
+            analyzer='char',
+            max_features=max_features,
+            dtype=dtype,
+        )
+
     return TfidfVectorizer(
         ngram_range=(1, 3),
         analyzer='char',
         max_features=max_features,
+        dtype=np.dtype(dtype).type,
     )
 
 
-def ngram(max_features=2_000):
+def ngram(max_features=2_000,
+          dtype=np.int64,
+          corpus=None,
+          streaming=False):
     """List of ngram vectorizers.
 
     Args:
         max_features: number of features to consider.
+        dtype: the dtype of the resulting matrices.
+        corpus: if set, a CorpusCounts object shared between vectorizers.
+        streaming: if True, the word vocabulary is selected with bounded
+            memory, see ngram_word.
     """
     return [
-        ngram_word(max_features=max_features),
-        ngram_char(max_features=max_features),
+        ngram_word(
+            max_features=max_features,
+            dtype=dtype,
+            corpus=corpus,
+            streaming=streaming,
+        ),
+        ngram_char(max_features=max_features, dtype=dtype, corpus=corpus),
     ]
 
 
-def ngram_word(max_features=2_000):
+def ngram_word(max_features=2_000,
+               dtype=np.int64,
+               corpus=None,
+               streaming=False):
     """Word count vectorizer.
 
     Args:
         max_features: number of features to consider.
+        dtype: the dtype of the resulting matrix.
+        corpus: if set, a CorpusCounts object shared between vectorizers.
+        streaming: if True, the vocabulary is selected in two passes with
+            memory proportional to max_features instead of counting all
+            distinct n-grams. Ignored if corpus is set.
     """
+    if corpus is not None:
+        return SharedCountVectorizer(
+            corpus,
+            analyzer='word',
+            max_features=max_features,
+            dtype=dtype,
+        )
+
+    if streaming:
+        return StreamingVocabularyVectorizer(
+            analyzer='word',
+            max_features=max_features,
+            use_idf=False,
+            dtype=dtype,
+        )
+
     return CountVectorizer(
         ngram_range=(1, 3),
         analyzer='word',
         max_features=max_features,
+        dtype=np.dtype(dtype).type,
     )
 
 
-def ngram_char(max_features=2_000):
+def ngram_char(max_features=2_000, dtype=np.int64, corpus=None):
     """Char count vectorizer.
 
     Args:
         max_features: number of features to consider.
+        dtype: the dtype of the resulting matrix.
+        corpus: if set, a CorpusCounts object shared between vectorizers.
     """
+    if corpus is not None:
+        return SharedCountVectorizer(
+            corpus,
+            analyzer='char',
+            max_features=max_features,
+            dtype=dtype,
+        )
+
     return CountVectorizer(
         ngram_range=(1, 3),
         analyzer='char',
         max_features=max_features,
+        dtype=np.dtype(dtype).type,
     )
 
 
-def lda():
-    """LDA vectorizer."""
-    return [LDAVectorizer()]
+def hashed_tfidf(max_features=2_000,
+                 n_features=2**20,
+                 n_jobs=None,
+                 dtype=np.float64):
+    """List of hashing based tf-idf vectorizers running on text shards.
+
+    Args:
+        max_features: number of features to consider.
+        n_features: number of hash buckets.
+        n_jobs: number of processes used to vectorize the shards.
+        dtype: the dtype of the resulting matrices.
+    """
+    return [
+        ParallelHashingVectorizer(
+            analyzer=analyzer,
+            n_features=n_features,
+            max_features=max_features,
+            n_jobs=n_jobs,
+            dtype=dtype,
+        ) for analyzer in ['word', 'char']
+    ]
+
+
+def hashed_ngram(max_features=2_000,
+                 n_features=2**20,
+                 n_jobs=None,
+                 dtype=np.int64):
+    """List of hashing based count vectorizers running on text shards.
+
+    Args:
+        max_features: number of features to consider.
+        n_features: number of hash buckets.
+        n_jobs: number of processes used to vectorize the shards.
+        dtype: the dtype of the resulting matrices.
+    """
+    return [
+        ParallelHashingVectorizer(
+            analyzer=analyzer,
+            n_features=n_features,
+            max_features=max_features,
+            use_idf=False,
+            norm=None,
+            n_jobs=n_jobs,
+            dtype=dtype,
+        ) for analyzer in ['word', 'char']
+    ]
+
+
+def lda(dtype=np.float64, corpus=None, **kwargs):
+    """LDA vectorizer.
+
+    Args:
+        dtype: the dtype of the resulting topic distributions.
+        corpus: if set, a CorpusCounts object shared between vectorizers.
+        kwargs: further parameters passed to the LDAVectorizer.
+    """
+    return [LDAVectorizer(dtype=dtype, corpus=corpus, **kwargs)]
+
+
+class LDAVectorizer(BaseEstimator):
+    """LDA vectorizer impementation.
+
+    Besides fitting on all texts at once, the topic model can be learned
+    online from chunks of texts (see chunk_size and partial_fit). A fitted
+    vectorizer transforms unseen texts and can be saved to and loaded from
+    disk.
+    """
+
+    def __init__(self,
+                 dtype=np.float64,
+                 corpus=None,
+                 n_components=25,
+                 learning_method='batch',
+                 batch_size=128,
+                 chunk_size=None,
+                 n_jobs=None,
+                 min_df=1,
+                 max_df=1.0,
+                 max_features=None,
+                 random_state=None):
+        """Initializers the vectorizer.
+
+        Args:
+            dtype: the dtype of the resulting topic distributions.
+            corpus: if set, the word counts are taken from this CorpusCounts
+                object instead of counting the texts again.
+            n_components: the number of topics.
+            learning_method: either 'batch' or 'online', see
+                LatentDirichletAllocation.
+            batch_size: the number of documents per minibatch for online
+                learning.
+            chunk_size: if set, the texts are counted and passed to the topic
+                model in chunks of this size using online learning. Without
+                a corpus, the vocabulary is selected in a first pass keeping
+                only the frequencies per word, hence the count matrix of all
+                texts is never materialized.
+            n_jobs: the number of processes used in the E-step.
+            min_df: ignores words with a lower document frequency.
+            max_df: ignores words with a higher document frequency.
+            max_features: the number of most frequent words to consider.
+            random_state: the seed of the topic model.
+        """
+        self.dtype = dtype
+        self.corpus = corpus
+        self.n_components = n_components
+        self.learning_method = learning_method
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.n_jobs = n_jobs
+        self.min_df = min_df
+        self.max_df = max_df
+        self.max_features = max_features
+        self.random_state = random_state
+
+    def _count_vectorizer(self, vocabulary=None):
+        if vocabulary is not None:
+            return CountVectorizer(vocabulary=vocabulary)
+
+        return CountVectorizer(
+            min_df=self.min_df,
+            max_df=self.max_df,
+            max_features=self.max_features,
+        )
+
+    def _init_lda(self):
+        self.lda = LatentDirichletAllocation(
+            n_components=self.n_components,
+            learning_method=self.learning_method,
+            batch_size=self.batch_size,
+            n_jobs=self.n_jobs,
+            random_state=self.random_state,
+        )
+
+    def _fit_counts(self, X):  # noqa: N803
+        """Fits the vocabulary and returns the counts of X."""
+        if self.corpus is None:
+            self.vectorizer_ = self._count_vectorizer()
+            return self.vectorizer_.fit_transform(X)
+
+        counts, names = self.corpus.counts(X, 'word')
+        unigrams = np.flatnonzero(~np.char.count(names, ' ').astype(bool))
+        counts = counts[:, unigrams]
+        columns = self._prune(
+            np.bincount(counts.indices, minlength=counts.shape[1]),
+            np.asarray(counts.sum(axis=0)).ravel(),
+            counts.shape[0],
+        )
+
+        self.vectorizer_ = self._count_vectorizer(names[unigrams][columns])
+        return counts[:, columns]
+
+    def _fit_vocabulary(self, X):  # noqa: N803
+        """Fits the vocabulary on chunks of X without counting per text."""
+        analyze = self._count_vectorizer().build_analyzer()
+        frequencies = Counter()
+        document_frequencies = Counter()
+        n_documents = 0
+        for chunk in self._chunks(X):
+            for text in chunk:
+                words = analyze(text)
+                frequencies.update(words)
+                document_frequencies.update(set(words))
+                n_documents += 1
+
+        # Sorted like the vocabulary of the CountVectorizer.
+        names = np.asarray(sorted(frequencies), dtype=str)
+        columns = self._prune(
+            np.fromiter(map(document_frequencies.get, names), np.int64,
+                        len(names)),
+            np.fromiter(map(frequencies.get, names), np.int64, len(names)),
+            n_documents,
+        )
+        self.vectorizer_ = self._count_vectorizer(names[columns])
+
+    def _prune(self, document_frequencies, frequencies, n_documents):
+        """Selects columns like the CountVectorizer pruning parameters."""
+        # Integers, e.g. np.int64 from parameter grids, are absolute counts.
+        max_count = (self.max_df if isinstance(self.max_df, numbers.Integral)
+                     else self.max_df * n_documents)
+        min_count = (self.min_df if isinstance(self.min_df, numbers.Integral)
+                     else self.min_df * n_documents)
+
+        columns = np.flatnonzero((document_frequencies >= min_count) &
+                                 (document_frequencies <= max_count))
+
+        if self.max_features is not None:
+            order = (-frequencies[columns]).argsort()
+            columns = np.sort(columns[order[:self.max_features]])
+
+        return columns
+
+    def _chunks(self, X):  # noqa: N803
+        X = list(X)  # noqa: N806
+        for start in range(0, len(X), self.chunk_size):
+            yield X[start:start + self.chunk_size]
+
+    def fit(self, X):  # noqa: N803
+        """Fits the vocabulary and the topic model on X."""
+        self._init_lda()
+
+        if self.chunk_size is None:
+            self.lda.fit(self._fit_counts(X))
+        elif self.corpus is not None:
+            # The shared counts are materialized anyway, pass their rows.
+            counts = self._fit_counts(X)
+            for start in range(0, counts.shape[0], self.chunk_size):
+                self.lda.partial_fit(counts[start:start + self.chunk_size])
+        else:
+            self._fit_vocabulary(X)
+            for chunk in self._chunks(X):
+                self.lda.partial_fit(self.vectorizer_.transform(chunk))
+
+        return self
+
+    def partial_fit(self, X):  # noqa: N803
+        """Updates the topic model with a chunk of texts.
+
+        The vocabulary is fitted on the first chunk if the vectorizer is not
+        fitted yet.
+        """
+        if not hasattr(self, 'vectorizer_'):
+            self._init_lda()
+            self.lda.partial_fit(self._fit_counts(X))
+        else:
+            self.lda.partial_fit(self.vectorizer_.transform(X))
+
+        return self
+
+    def transform(self, X):  # noqa: N803
+        """Computes the topic distributions of X using the fitted model."""
+        if self.chunk_size is None:
+            topics = self.lda.transform(self.vectorizer_.transform(X))
+        else:
+            topics = np.vstack([
+                self.lda.transform(self.vectorizer_.transform(chunk))
+                for chunk in self._chunks(X)
+            ])
+
+        return topics.astype(self.dtype, copy=False)
+
+    def fit_transform(self, X):  # noqa: N803
+        """Computes the features for X."""
+        if self.chunk_size is None:
+            # Get word counts per document.
+            counts = self._fit_counts(X)
+
+            # Fit LDA.
+            self._init_lda()
+            topics = self.lda.fit_transform(counts)
+            return topics.astype(self.dtype, copy=False)
+
+        return self.fit(X).transform(X)
+
+    def save(self, path):
+        """Stores the fitted vectorizer without the shared corpus counts."""
+        vectorizer = copy.copy(self)
+        vectorizer.corpus = None
+        joblib.dump(vectorizer, path)
+
+    @classmethod
+    def load(cls, path):
+        """Loads a vectorizer stored with save."""
+        return joblib.load(path)
+
+
+class CorpusCounts(BaseEstimator):
+    """Counts the word and char n-grams of a corpus once.
+
+    The count vectorizers, tf-idf vectorizers and the LDA vectorizer created
+    with the same CorpusCounts object derive their matrices from the same
+    count matrix instead of tokenizing and counting the texts on their own.
+    Only the counts of the most recently analyzed texts are kept.
+    """
+
+    def __init__(self, ngram_range=(1, 3)):
+        """Initializes the corpus counts.
+
+        Args:
+            ngram_range: the n-gram range counted for words and chars.
+        """
+        self.ngram_range = ngram_range
+
+    def counts(self, X, analyzer):  # noqa: N803
+        """Returns the n-gram counts and feature names for the texts.
+
+        Args:
+            X: the texts to analyze.
+            analyzer: either 'word' or 'char'.
+        """
+        corpus_hash = dataset_hash(pd.Series(X))
+        if getattr(self, 'corpus_hash_', None) != corpus_hash:
+            self.corpus_hash_ = corpus_hash
+            self.counts_ = {}
+
+        if analyzer not in self.counts_:
+            cv = CountVectorizer(
+                ngram_range=self.ngram_range,
+                analyzer=analyzer,
+            )
+            counts = cv.fit_transform(X)
+            names = cv.get_feature_names_out().astype(str)
+            self.counts_[analyzer] = (counts, names)
+
+        return self.counts_[analyzer]
+
+
+class SharedCountVectorizer(BaseEstimator):
+    """Count vectorizer based on the counts of a CorpusCounts object."""
+
+    def __init__(self,
+                 corpus,
+                 analyzer='word',
+                 max_features=2_000,
+                 dtype=np.int64):
+        """Initializes the vectorizer.
+
+        Args:
+            corpus: the CorpusCounts object providing the counts.
+            analyzer: either 'word' or 'char'.
+            max_features: number of features to consider.
+            dtype: the dtype of the resulting matrix.
+        """
+        self.corpus = corpus
+        self.analyzer = analyzer
+        self.max_features = max_features
+        self.dtype = dtype
+
+    def _limited_counts(self, X):  # noqa: N803
+        """Returns the counts of the most frequent features."""
+        counts, names = self.corpus.counts(X, self.analyzer)
+
+        columns = np.arange(counts.shape[1])
+        if self.max_features is not None:
+            frequencies = np.asarray(counts.sum(axis=0)).ravel()
+            # Same ordering as scikit-learn to break ties identically.
+            order = (-frequencies).argsort()
+            columns = np.sort(order[:self.max_features])
+
+        self.vocabulary_ = {name: i for i, name in enumerate(names[columns])}
+        self.ngram_range_ = self.corpus.ngram_range
+        return counts[:, columns]
+
+    def _counts(self, X):  # noqa: N803
+        """Counts the features of the fitted vocabulary in X.
+
+        Does not use the corpus, hence it can be removed once fitted.
+        """
+        return CountVectorizer(
+            ngram_range=self.ngram_range_,
+            analyzer=self.analyzer,
+            vocabulary=self.vocabulary_,
+        ).transform(X)
+
+    def fit_transform(self, X):  # noqa: N803
+        """Computes the features for X."""
+        return self._limited_counts(X).astype(self.dtype)
+
+    def transform(self, X):  # noqa: N803
+        """Computes the features for X using the fitted vocabulary."""
+        return self._counts(X).astype(self.dtype)
+
 
+class SharedTfidfVectorizer(SharedCountVectorizer):
+    """Tf-idf vectorizer based on the counts of a CorpusCounts object."""
 
-class LDAVectorizer:
-    """LDA vectorizer impementation."""
+    def __init__(self,
+                 corpus,
+                 analyzer='word',
+                 max_features=2_000,
+                 dtype=np.float64):
+        """Initializes the vectorizer.
 
-    def __init__(self):
-        """Initializers the vectorizer."""
-        pass
+        Args:
+            corpus: the CorpusCounts object providing the counts.
+            analyzer: either 'word' or 'char'.
+            max_features: number of features to consider.
+            dtype: the dtype of the resulting matrix.
+        """
+        super().__init__(
+            corpus,
+            analyzer=analyzer,
+            max_features=max_features,
+            dtype=dtype,
+        )
 
     def fit_transform(self, X):  # noqa: N803
         """Computes the features for X."""
-        # Get word counts per document.
-        cv = CountVectorizer()
-        counts = cv.fit_transform(X)
+        self.tfidf_ = TfidfTransformer()
+        tfidf = self.tfidf_.fit_transform(self._limited_counts(X))
+        return tfidf.astype(self.dtype)
 
-        # Fit LDA.
-        self.lda = LatentDirichletAllocation(n_components=25)
-        return self.lda.fit_transform(counts)
+    def transform(self, X):  # noqa: N803
+        """Computes the features for X using the fitted vocabulary and idf."""
+        return self.tfidf_.transform(self._counts(X)).astype(self.dtype)
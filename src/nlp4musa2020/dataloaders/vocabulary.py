@@ -0,0 +1,166 @@
+"""Bounded memory vocabulary selection for n-gram vectorizers."""
+from collections import Counter
+
+import numpy as np
+from sklearn.base import BaseEstimator
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.feature_extraction.text import TfidfTransformer
+from sklearn.utils import murmurhash3_32
+
+
+class CountMinSketch:
+    """Count-min sketch estimating the frequencies of strings."""
+
+    def __init__(self, width=2**20, depth=4, random_state=0):
+        """Initializes the sketch.
+
+        Args:
+            width: the number of counters per row, has to be a power of two.
+            depth: the number of rows, each using its own hash function.
+            random_state: the seed used to draw the hash functions.
+        """
+        if width & (width - 1) != 0:
+            raise ValueError(f'width must be a power of two, got {width}')
+
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+
+        # Seeds of the hash functions, one per row. The strings are hashed
+        # with murmurhash since the built-in hash is salted per process.
+        rng = np.random.RandomState(random_state)
+        self._seeds = rng.randint(0, 2**31, size=depth).tolist()
+
+    def _indices(self, items):
+        indices = np.empty((self.depth, len(items)), dtype=np.int64)
+        for row, seed in enumerate(self._seeds):
+            indices[row] = [
+                murmurhash3_32(item, seed=seed, positive=True)
+                for item in items
+            ]
+        return indices & (self.width - 1)
+
+    def update(self, items, counts):
+        """Adds the counts of the items and returns their new estimates.
+
+        Args:
+            items: a list of strings.
+            counts: the counts of the items.
+        """
+        indices = self._indices(items)
+        for row in range(self.depth):
+            np.add.at(self.table[row], indices[row], counts)
+
+        return self.table[np.arange(self.depth)[:, np.newaxis],
+                          indices].min(axis=0)
+
+
+class StreamingVocabularyVectorizer(BaseEstimator):
+    """N-gram vectorizer selecting its vocabulary with bounded memory.
+
+    In a first pass over the texts, the n-gram frequencies are estimated with
+    a count-min sketch and the most frequent n-grams are kept as candidates.
+    Only the candidates are counted exactly in a second pass, from which the
+    max_features most frequent n-grams are selected. Hence, the memory is
+    proportional to the number of candidates instead of all distinct n-grams.
+    """
+
+    def __init__(self,
+                 analyzer='word',
+                 ngram_range=(1, 3),
+                 max_features=2_000,
+                 use_idf=True,
+                 candidate_factor=4,
+                 sketch_width=2**20,
+                 sketch_depth=4,
+                 chunk_size=1_000,
+                 dtype=np.float64):
+        """Initializes the vectorizer.
+
+        Args:
+            analyzer: either 'word' or 'char'.
+            ngram_range: the n-gram range to count.
+            max_features: number of features to consider.
+            use_idf: if True, tf-idf values are returned instead of counts.
+            candidate_factor: the number of candidates kept after the first
+                pass relative to max_features.
+            sketch_width: the number of counters per row of the sketch.
+            sketch_depth: the number of rows of the sketch.
+            chunk_size: the number of texts counted at once.
+            dtype: the dtype of the resulting matrix.
+        """
+        self.analyzer = analyzer
+        self.ngram_range = ngram_range
+        self.max_features = max_features
+        self.use_idf = use_idf
+        self.candidate_factor = candidate_factor
+        self.sketch_width = sketch_width
+        self.sketch_depth = sketch_depth
+        self.chunk_size = chunk_size
+        self.dtype = dtype
+
+    def _count_vectorizer(self, vocabulary=None):
+        return CountVectorizer(
+            analyzer=self.analyzer,
+            ngram_range=self.ngram_range,
+            vocabulary=vocabulary,
+        )
+
+    def _candidates(self, X):  # noqa: N803
+        """Returns the most frequent n-grams estimated by the sketch."""
+        analyze = self._count_vectorizer().build_analyzer()
+        sketch = CountMinSketch(self.sketch_width, self.sketch_depth)
+        capacity = self.candidate_factor * self.max_features
+
+        candidates = {}
+        for start in range(0, len(X), self.chunk_size):
+            chunk = Counter()
+            for text in X[start:start + self.chunk_size]:
+                chunk.update(analyze(text))
+
+            items = list(chunk.keys())
+            estimates = sketch.update(items,
+                                      np.fromiter(chunk.values(), np.int64))
+            candidates.update(zip(items, estimates))
+
+            if len(candidates) > capacity:
+                items = list(candidates.keys())
+                estimates = np.fromiter(candidates.values(), np.int64)
+                keep = np.argpartition(-estimates, capacity)[:capacity]
+                candidates = {items[i]: estimates[i] for i in keep}
+
+        return sorted(candidates.keys())
+
+    def fit_transform(self, X):  # noqa: N803
+        """Computes the features for X."""
+        X = list(X)  # noqa: N806
+
+        if self.max_features is None:
+            vectorizer = self._count_vectorizer()
+            counts = vectorizer.fit_transform(X)
+            self.vocabulary_ = vectorizer.vocabulary_
+        else:
+            candidates = self._candidates(X)
+            counts = self._count_vectorizer(candidates).transform(X)
+
+            # Same ordering as scikit-learn to break ties identically.
+            frequencies = np.asarray(counts.sum(axis=0)).ravel()
+            columns = np.sort((-frequencies).argsort()[:self.max_features])
+            counts = counts[:, columns]
+            self.vocabulary_ = {
+                candidates[column]: i for i, column in enumerate(columns)
+            }
+
+        if self.use_idf:
+            self.tfidf_ = TfidfTransformer()
+            counts = self.tfidf_.fit_transform(counts)
+
+        return counts.astype(self.dtype)
+
+    def transform(self, X):  # noqa: N803
+        """Computes the features for X using the fitted vocabulary."""
+        counts = self._count_vectorizer(self.vocabulary_).transform(X)
+        if self.use_idf:
+            counts = self.tfidf_.transform(counts)
+
+        return counts.astype(self.dtype)
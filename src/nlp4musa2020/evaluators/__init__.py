@@ -19,4 +19,4 @@ def grid_parameters_genres():
         'refit': False,
         'scoring': ['f1_micro', 'f1_macro'],
         'return_train_score': True,
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,34 @@
+"""Grid evaluator growing tree ensembles once per fold."""
+from .warm_start import WarmStartEvaluator
+
+
+class WarmStartForestEvaluator(WarmStartEvaluator):
+    """Grid evaluator for random forests and extra trees.
+
+    Instead of training a separate forest for every value of n_estimators,
+    the forest is grown once per fold and parameter combination using
+    warm_start, and every requested number of trees is scored on the way.
+    The fit time of a prefix contains the time to grow all its trees, hence
+    the results have the same shape and meaning as the ones of the
+    GridEvaluator.
+    """
+
+    def __init__(self,
+                 parameters,
+                 grid_parameters,
+                 n_estimators_parameter='model__n_estimators'):
+        """Creates a new instance.
+
+        Args:
+            parameters: the parameter grid, has to contain the
+                n_estimators_parameter.
+            grid_parameters: the GridSearchCV parameters used to configure the
+                evaluation (cv, scoring, return_train_score, error_score,
+                n_jobs and verbose).
+            n_estimators_parameter: the name of the pipeline parameter
+                setting the number of trees of the final estimator.
+        """
+        super().__init__(parameters,
+                         grid_parameters,
+                         warm_start_parameter=n_estimators_parameter,
+                         cumulative_fit_time=True)
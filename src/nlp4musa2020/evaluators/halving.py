@@ -0,0 +1,141 @@
+"""Successive halving grid search evaluator."""
+import math
+
+from dbispipeline.evaluators import GridEvaluator
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import GridSearchCV
+from sklearn.model_selection import ParameterGrid
+
+from .results import n_samples
+from .results import select_rows
+
+
+def _ranking(scores):
+    """Returns the candidate indices from best to worst, NaN scores last."""
+    scores = np.nan_to_num(np.asarray(scores, dtype=np.float64), nan=-np.inf)
+    return np.argsort(-scores, kind='stable')
+
+
+class HalvingGridEvaluator(GridEvaluator):
+    """Grid evaluator dropping weak candidates early.
+
+    All candidates are first evaluated on a small random sample of the data.
+    Only the best 1/factor of the candidates is evaluated again on a factor
+    times larger sample, until the remaining candidates are evaluated on all
+    data. The cv_results of the last iteration have the same shape as the
+    ones of the GridEvaluator, the results of all iterations are returned as
+    halving_results.
+    """
+
+    def __init__(self,
+                 parameters,
+                 grid_parameters,
+                 factor=3,
+                 min_resources=100,
+                 ranking_score=None,
+                 random_state=0):
+        """Creates a new instance.
+
+        Args:
+            parameters: passed to the GridSearchCV as configuration.
+            grid_parameters: passed to the GridSearchCV to configure the
+                gridsearch.
+            factor: the factor by which the candidates are reduced and the
+                samples are increased in each iteration.
+            min_resources: the minimal number of samples used in the first
+                iteration.
+            ranking_score: the score used to rank the candidates. Defaults to
+                the first score of the grid parameters.
+            random_state: the seed used to sample the data.
+        """
+        super().__init__(parameters, grid_parameters)
+        self.factor = factor
+        self.min_resources = min_resources
+        self.ranking_score = ranking_score
+        self.random_state = random_state
+
+    def _ranking_column(self):
+        if self.ranking_score is not None:
+            return 'mean_test_' + self.ranking_score
+
+        scoring = self.grid_parameters.get('scoring')
+        if isinstance(scoring, (list, tuple)):
+            return 'mean_test_' + scoring[0]
+        if isinstance(scoring, dict):
+            return 'mean_test_' + next(iter(scoring))
+        return 'mean_test_score'
+
+    def _grid(self, model, candidates):
+        parameters = [{
+            name: [value] for name, value in candidate.items()
+        } for candidate in candidates]
+        grid_parameters = dict(self.grid_parameters)
+        grid_parameters['refit'] = False
+        return GridSearchCV(model, parameters, **grid_parameters)
+
+    def evaluate(self, model, data):
+        """
+        Evaluates the pipline based on the given dataset.
+
+        Args:
+            model: the model given in the pipeline.
+            data: the data needed for this run, a tuple of (x, y).
+
+        Returns: A dict containting the results of the grid search.
+        """
+        x, y = data
+        n_rows = n_samples(x)
+        candidates = list(ParameterGrid(self.parameters))
+        n_iterations = max(0, math.ceil(math.log(len(candidates),
+                                                 self.factor)))
+
+        rng = np.random.RandomState(self.random_state)
+        order = rng.permutation(n_rows)
+        ranking_column = self._ranking_column()
+
+        history = []
+        for iteration in range(n_iterations + 1):
+            n_resources = int(n_rows * self.factor**(iteration -
+                                                     n_iterations))
+            n_resources = min(n_rows, max(n_resources, self.min_resources))
+            if iteration == n_iterations:
+                n_resources = n_rows
+            indices = np.sort(order[:n_resources])
+
+            grid = self._grid(model, candidates)
+            grid.fit(select_rows(x, indices), select_rows(y, indices))
+            cv_results = pd.DataFrame(grid.cv_results_)
+            history.append({
+                'iteration': iteration,
+                'n_resources': n_resources,
+                'cv_results': cv_results.to_dict(),
+            })
+
+            if iteration < n_iterations:
+                n_keep = max(1, math.ceil(len(candidates) / self.factor))
+                # Failed fits score NaN (error_score) and are ranked last.
+                best = _ranking(cv_results[ranking_column])
+                candidates = [candidates[i] for i in sorted(best[:n_keep])]
+
+        best = _ranking(cv_results[ranking_column])[0]
+        return {
+            'cv_results': cv_results.to_dict(),
+            'best_score': cv_results[ranking_column][best],
+            'best_params': candidates[best],
+            'halving_results': history,
+        }
+
+    @property
+    def configuration(self):
+        """
+        Returns a dict-like representation of this evaluator.
+
+        This is for storing its state in the database.
+        """
+        configuration = super().configuration
+        configuration['factor'] = self.factor
+        configuration['min_resources'] = self.min_resources
+        configuration['ranking_score'] = self.ranking_score
+        configuration['random_state'] = self.random_state
+        return configuration
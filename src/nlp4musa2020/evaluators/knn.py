@@ -0,0 +1,220 @@
+"""Grid evaluator sharing the neighbor graph between KNN candidates."""
+import time
+
+from dbispipeline.evaluators import GridEvaluator
+from joblib import delayed
+from joblib import Parallel
+import numpy as np
+from sklearn.base import BaseEstimator
+from sklearn.base import clone
+from sklearn.base import ClassifierMixin
+from sklearn.base import is_classifier
+from sklearn.base import RegressorMixin
+from sklearn.model_selection import check_cv
+from sklearn.model_selection import ParameterGrid
+from sklearn.pipeline import Pipeline
+
+from . import results
+from ..models.neighbors import neighbor_weights
+from ..models.neighbors import predict_classes
+from ..models.neighbors import predict_values
+
+
+class _PredictedClassifier(ClassifierMixin, BaseEstimator):
+    """Returns predictions that were computed from a neighbor graph."""
+
+    def __init__(self, predictions, classes):
+        self.predictions = predictions
+        self.classes_ = classes
+
+    def predict(self, x):
+        return self.predictions
+
+
+class _PredictedRegressor(RegressorMixin, BaseEstimator):
+    """Returns predictions that were computed from a neighbor graph."""
+
+    def __init__(self, predictions, classes=None):
+        self.predictions = predictions
+
+    def predict(self, x):
+        return self.predictions
+
+
+def _evaluate_graph(pipeline, parameters, candidates, x, y, train, test,
+                    scorers, return_train_score):
+    """Computes the neighbor graph of one fold and scores all candidates.
+
+    Args:
+        candidates: tuples of (n_neighbors, weights) evaluated on the graph.
+
+    Returns: a list containing the fit time, score time, test scores and
+        train scores per candidate.
+    """
+    max_neighbors = max(n_neighbors for n_neighbors, _ in candidates)
+    pipeline = clone(pipeline).set_params(**parameters)
+    x_train = results.select_rows(x, train)
+    y_train = results.select_rows(y, train)
+    x_test = results.select_rows(x, test)
+    y_test = results.select_rows(y, test)
+
+    start = time.perf_counter()
+    if isinstance(pipeline, Pipeline):
+        model = pipeline.steps[-1][1]
+        x_train = pipeline[:-1].fit_transform(x_train, y_train)
+    else:
+        model = pipeline
+    model.set_params(n_neighbors=max_neighbors)
+    model.fit(x_train, y_train)
+    fit_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if isinstance(pipeline, Pipeline):
+        x_test = pipeline[:-1].transform(x_test)
+    graphs = [(x_test, y_test, model.kneighbors(x_test))]
+    if return_train_score:
+        graphs.append((x_train, y_train, model.kneighbors(x_train)))
+    # The graph is shared, hence its query time is split among candidates.
+    query_time = (time.perf_counter() - start) / len(candidates)
+
+    if is_classifier(model):
+        predict = predict_classes
+        predicted = _PredictedClassifier
+    else:
+        predict = predict_values
+        predicted = _PredictedRegressor
+
+    evaluated = []
+    for n_neighbors, weights in candidates:
+        start = time.perf_counter()
+        scores = []
+        for x_graph, y_graph, (distances, indices) in graphs:
+            distances = distances[:, :n_neighbors]
+            indices = indices[:, :n_neighbors]
+            estimator = predicted(
+                predict(y_train, indices,
+                        neighbor_weights(distances, weights)),
+                getattr(model, 'classes_', None),
+            )
+            scores.append({
+                name: scorer(estimator, x_graph, y_graph)
+                for name, scorer in scorers.items()
+            })
+        score_time = query_time + time.perf_counter() - start
+
+        train_scores = scores[1] if return_train_score else None
+        evaluated.append((fit_time, score_time, scores[0], train_scores))
+
+    return evaluated
+
+
+class SharedNeighborsEvaluator(GridEvaluator):
+    """Grid evaluator for KNN classifiers and regressors.
+
+    The neighbor graph of the largest n_neighbors is computed once per fold
+    and combination of the remaining parameters (e.g. the metric). The
+    predictions for all smaller n_neighbors and all weights are derived from
+    a prefix of this graph, so every test point is queried only once per
+    fold and metric.
+    """
+
+    def __init__(self,
+                 parameters,
+                 grid_parameters,
+                 model_name='model'):
+        """Creates a new instance.
+
+        Args:
+            parameters: the parameter grid, has to contain the n_neighbors
+                parameter of the model.
+            grid_parameters: the GridSearchCV parameters used to configure the
+                evaluation (cv, scoring, return_train_score, n_jobs and
+                verbose).
+            model_name: the name of the KNN step in the pipeline.
+        """
+        super().__init__(parameters, grid_parameters)
+        self.model_name = model_name
+
+    def evaluate(self, model, data):
+        """
+        Evaluates the pipline based on the given dataset.
+
+        Args:
+            model: the model given in the pipeline.
+            data: the data needed for this run, a tuple of (x, y).
+
+        Returns: A dict containting the results of the grid search.
+        """
+        x, y = data
+        prefix = self.model_name + '__' if isinstance(model, Pipeline) else ''
+        n_neighbors_name = prefix + 'n_neighbors'
+        weights_name = prefix + 'weights'
+        default_weights = model.get_params()[weights_name]
+
+        candidates = list(ParameterGrid(self.parameters))
+        parameters = dict(self.parameters)
+        n_neighbors = parameters.pop(n_neighbors_name)
+        weights = parameters.pop(weights_name, [default_weights])
+        combinations = list(ParameterGrid(parameters))
+        graph_candidates = [(k, w) for k in n_neighbors for w in weights]
+
+        cv = check_cv(self.grid_parameters.get('cv'),
+                      y,
+                      classifier=is_classifier(model))
+        splits = list(cv.split(x, y))
+        scorers = results.get_scorers(self.grid_parameters.get('scoring'))
+        return_train_score = self.grid_parameters.get(
+            'return_train_score', False)
+
+        parallel = Parallel(
+            n_jobs=self.grid_parameters.get('n_jobs'),
+            verbose=self.grid_parameters.get('verbose', 0),
+        )
+        folds = parallel(
+            delayed(_evaluate_graph)(model, combination, graph_candidates, x,
+                                     y, train, test, scorers,
+                                     return_train_score)
+            for combination in combinations for train, test in splits)
+
+        shape = (len(candidates), len(splits))
+        fit_times = np.zeros(shape)
+        score_times = np.zeros(shape)
+        test_scores = {name: np.zeros(shape) for name in scorers}
+        train_scores = None
+        if return_train_score:
+            train_scores = {name: np.zeros(shape) for name in scorers}
+
+        for i, evaluated in enumerate(folds):
+            combination = combinations[i // len(splits)]
+            split = i % len(splits)
+            for (k, w), (fit_time, score_time, test, train) in zip(
+                    graph_candidates, evaluated):
+                candidate = dict(combination)
+                candidate[n_neighbors_name] = k
+                if weights_name in self.parameters:
+                    candidate[weights_name] = w
+                index = candidates.index(candidate)
+                fit_times[index, split] = fit_time
+                score_times[index, split] = score_time
+                for name in scorers:
+                    test_scores[name][index, split] = test[name]
+                    if return_train_score:
+                        train_scores[name][index, split] = train[name]
+
+        ranking_score = 'score' if list(scorers) == ['score'] else None
+        return results.outcome(
+            results.cv_results(candidates, fit_times, score_times,
+                               test_scores, train_scores),
+            ranking_score,
+        )
+
+    @property
+    def configuration(self):
+        """
+        Returns a dict-like representation of this evaluator.
+
+        This is for storing its state in the database.
+        """
+        configuration = super().configuration
+        configuration['model_name'] = self.model_name
+        return configuration
@@ -0,0 +1,124 @@
+"""Helpers creating grid search results outside of GridSearchCV."""
+import numpy as np
+import pandas as pd
+from scipy.stats import rankdata
+from sklearn.metrics import get_scorer
+
+
+def _score(estimator, x, y):
+    return estimator.score(x, y)
+
+
+def n_samples(data):
+    """Returns the number of rows of an array, sparse matrix or dataframe."""
+    return data.shape[0] if hasattr(data, 'shape') else len(data)
+
+
+def select_rows(data, indices):
+    """Returns the rows of an array, sparse matrix, pandas object or list.
+
+    Args:
+        data: the data to index.
+        indices: an integer array of row positions.
+    """
+    if hasattr(data, 'iloc'):
+        return data.iloc[indices]
+    if isinstance(data, list):
+        return [data[i] for i in indices]
+    return data[indices]
+
+
+def get_scorers(scoring):
+    """Returns a dict mapping score names to scorers.
+
+    Args:
+        scoring: the scoring as passed to GridSearchCV.
+    """
+    if scoring is None:
+        return {'score': _score}
+    if isinstance(scoring, str):
+        return {'score': get_scorer(scoring)}
+    if callable(scoring):
+        return {'score': scoring}
+    if isinstance(scoring, dict):
+        return {
+            name: get_scorer(scorer) if isinstance(scorer, str) else scorer
+            for name, scorer in scoring.items()
+        }
+    return {name: get_scorer(name) for name in scoring}
+
+
+def cv_results(candidates,
+               fit_times,
+               score_times,
+               test_scores,
+               train_scores=None):
+    """Returns a dict shaped like the cv_results_ of GridSearchCV.
+
+    Args:
+        candidates: the list of evaluated parameter dicts.
+        fit_times: array of shape (n_candidates, n_splits).
+        score_times: array of shape (n_candidates, n_splits).
+        test_scores: a dict mapping score names to arrays of shape
+            (n_candidates, n_splits).
+        train_scores: like test_scores, but for the training data.
+    """
+    results = {}
+
+    def _store(name, values, rank=False):
+        values = np.asarray(values, dtype=np.float64)
+        for split in range(values.shape[1]):
+            results[f'split{split}_{name}'] = values[:, split]
+        means = values.mean(axis=1)
+        results[f'mean_{name}'] = means
+        results[f'std_{name}'] = values.std(axis=1)
+        if rank:
+            # Like GridSearchCV, NaN scores of failed fits rank last.
+            if not np.isnan(means).all():
+                means = np.nan_to_num(means, nan=np.nanmin(means) - 1)
+            results[f'rank_{name}'] = rankdata(-means,
+                                               method='min').astype(np.int32)
+
+    for name, values in [('fit_time', fit_times),
+                         ('score_time', score_times)]:
+        values = np.asarray(values, dtype=np.float64)
+        results[f'mean_{name}'] = values.mean(axis=1)
+        results[f'std_{name}'] = values.std(axis=1)
+
+    for name in sorted({name for candidate in candidates
+                        for name in candidate}):
+        results[f'param_{name}'] = [
+            candidate.get(name) for candidate in candidates
+        ]
+    results['params'] = candidates
+
+    for name, values in test_scores.items():
+        _store(f'test_{name}', values, rank=True)
+    if train_scores is not None:
+        for name, values in train_scores.items():
+            _store(f'train_{name}', values)
+
+    return results
+
+
+def outcome(results, ranking_score=None):
+    """Returns the results in the format of the GridEvaluator.
+
+    Args:
+        results: the dict returned by cv_results.
+        ranking_score: the score used to select the best candidate. If None,
+            no best candidate is selected like in a multi-metric GridSearchCV
+            without refit.
+    """
+    best_score = None
+    best_params = None
+    if ranking_score is not None:
+        best = int(np.argmin(results[f'rank_test_{ranking_score}']))
+        best_score = results[f'mean_test_{ranking_score}'][best]
+        best_params = results['params'][best]
+
+    return {
+        'cv_results': pd.DataFrame(results).to_dict(),
+        'best_score': best_score,
+        'best_params': best_params,
+    }
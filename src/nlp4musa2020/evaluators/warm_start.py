@@ -0,0 +1,230 @@
+"""Grid evaluator fitting a warm started path of models once per fold."""
+import time
+import warnings
+
+from dbispipeline.evaluators import GridEvaluator
+from joblib import delayed
+from joblib import Parallel
+import numpy as np
+from sklearn.base import clone
+from sklearn.base import is_classifier
+from sklearn.exceptions import FitFailedWarning
+from sklearn.model_selection import check_cv
+from sklearn.model_selection import ParameterGrid
+from sklearn.pipeline import Pipeline
+
+from . import results
+
+
+def _failed(value, fit_time, scorers, return_train_score, error_score,
+            error):
+    """Returns the path entry of a value whose fit failed.
+
+    Like GridSearchCV, the error is raised if error_score is 'raise' and
+    otherwise all scores of the value are set to error_score.
+    """
+    if error_score == 'raise':
+        raise error
+
+    warnings.warn(
+        f'Fitting failed, the scores of {value} are set to {error_score}. '
+        f'Details: {error!r}', FitFailedWarning)
+    scores = {name: error_score for name in scorers}
+    return (value, fit_time, 0.0, scores,
+            dict(scores) if return_train_score else None)
+
+
+def _fit_path(pipeline, parameters, parameter, values, x, y, train, test,
+              scorers, return_train_score, cumulative_fit_time, error_score):
+    """Fits the warm started models of one fold and scores all of them.
+
+    Returns: a list containing the value, fit time, score time, test scores
+        and train scores per value of the warm started parameter.
+    """
+    pipeline = clone(pipeline).set_params(**parameters)
+    x_train = results.select_rows(x, train)
+    y_train = results.select_rows(y, train)
+    x_test = results.select_rows(x, test)
+    y_test = results.select_rows(y, test)
+
+    # The preprocessing is fitted once and reused for all values.
+    start = time.perf_counter()
+    try:
+        if isinstance(pipeline, Pipeline):
+            model = pipeline.steps[-1][1]
+            preprocessing = pipeline[:-1]
+            x_train = preprocessing.fit_transform(x_train, y_train)
+        else:
+            model = pipeline
+            preprocessing = None
+    except Exception as e:
+        fit_time = time.perf_counter() - start
+        return [
+            _failed(value, fit_time, scorers, return_train_score,
+                    error_score, e) for value in sorted(values)
+        ]
+    fit_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if preprocessing is not None:
+        x_test = preprocessing.transform(x_test)
+    transform_time = time.perf_counter() - start
+
+    model.set_params(warm_start=True)
+    preprocessing_time = fit_time
+    path = []
+    for value in sorted(values):
+        start = time.perf_counter()
+        pipeline.set_params(**{parameter: value})
+        try:
+            model.fit(x_train, y_train)
+            error = None
+        except Exception as e:
+            error = e
+        if cumulative_fit_time:
+            fit_time += time.perf_counter() - start
+        else:
+            fit_time = preprocessing_time + time.perf_counter() - start
+
+        if error is not None:
+            path.append(
+                _failed(value, fit_time, scorers, return_train_score,
+                        error_score, error))
+            # The next value is fitted from scratch like in a grid search.
+            model = clone(model)
+            if preprocessing is not None:
+                pipeline.steps[-1] = (pipeline.steps[-1][0], model)
+            else:
+                pipeline = model
+            continue
+
+        start = time.perf_counter()
+        test_scores = {
+            name: scorer(model, x_test, y_test)
+            for name, scorer in scorers.items()
+        }
+        score_time = transform_time + time.perf_counter() - start
+
+        train_scores = None
+        if return_train_score:
+            train_scores = {
+                name: scorer(model, x_train, y_train)
+                for name, scorer in scorers.items()
+            }
+        path.append((value, fit_time, score_time, test_scores, train_scores))
+
+    return path
+
+
+class WarmStartEvaluator(GridEvaluator):
+    """Grid evaluator for models supporting warm_start.
+
+    Instead of fitting a separate model for every value of the warm started
+    parameter, the values are fitted in ascending order using warm_start
+    once per fold and combination of the remaining parameters, and every
+    model is scored on the way. The preprocessing steps of a pipeline are
+    fitted once per fold and combination. The results have the same shape
+    as the ones of the GridEvaluator. As in the GridSearchCV, failed fits
+    are scored with the error_score of the grid parameters (NaN by
+    default).
+    """
+
+    def __init__(self,
+                 parameters,
+                 grid_parameters,
+                 warm_start_parameter,
+                 cumulative_fit_time=False):
+        """Creates a new instance.
+
+        Args:
+            parameters: the parameter grid, has to contain the
+                warm_start_parameter.
+            grid_parameters: the GridSearchCV parameters used to configure the
+                evaluation (cv, scoring, return_train_score, error_score,
+                n_jobs and verbose).
+            warm_start_parameter: the name of the pipeline parameter iterated
+                with warm_start, e.g. model__n_estimators.
+            cumulative_fit_time: if True, the fit time of a value contains
+                the fit times of all smaller values, e.g. since a forest
+                contains the trees of all smaller forests.
+        """
+        super().__init__(parameters, grid_parameters)
+        self.warm_start_parameter = warm_start_parameter
+        self.cumulative_fit_time = cumulative_fit_time
+
+    def evaluate(self, model, data):
+        """
+        Evaluates the pipline based on the given dataset.
+
+        Args:
+            model: the model given in the pipeline.
+            data: the data needed for this run, a tuple of (x, y).
+
+        Returns: A dict containting the results of the grid search.
+        """
+        x, y = data
+        candidates = list(ParameterGrid(self.parameters))
+        parameters = dict(self.parameters)
+        values = parameters.pop(self.warm_start_parameter)
+        combinations = list(ParameterGrid(parameters))
+
+        cv = check_cv(self.grid_parameters.get('cv'),
+                      y,
+                      classifier=is_classifier(model))
+        splits = list(cv.split(x, y))
+        scorers = results.get_scorers(self.grid_parameters.get('scoring'))
+        return_train_score = self.grid_parameters.get(
+            'return_train_score', False)
+        error_score = self.grid_parameters.get('error_score', np.nan)
+
+        parallel = Parallel(
+            n_jobs=self.grid_parameters.get('n_jobs'),
+            verbose=self.grid_parameters.get('verbose', 0),
+        )
+        folds = parallel(
+            delayed(_fit_path)(model, combination, self.warm_start_parameter,
+                               values, x, y, train, test, scorers,
+                               return_train_score, self.cumulative_fit_time,
+                               error_score)
+            for combination in combinations for train, test in splits)
+
+        shape = (len(candidates), len(splits))
+        fit_times = np.zeros(shape)
+        score_times = np.zeros(shape)
+        test_scores = {name: np.zeros(shape) for name in scorers}
+        train_scores = None
+        if return_train_score:
+            train_scores = {name: np.zeros(shape) for name in scorers}
+
+        for i, path in enumerate(folds):
+            combination = combinations[i // len(splits)]
+            split = i % len(splits)
+            for value, fit_time, score_time, test, train in path:
+                candidate = dict(combination)
+                candidate[self.warm_start_parameter] = value
+                index = candidates.index(candidate)
+                fit_times[index, split] = fit_time
+                score_times[index, split] = score_time
+                for name in scorers:
+                    test_scores[name][index, split] = test[name]
+                    if return_train_score:
+                        train_scores[name][index, split] = train[name]
+
+        ranking_score = 'score' if list(scorers) == ['score'] else None
+        return results.outcome(
+            results.cv_results(candidates, fit_times, score_times,
+                               test_scores, train_scores),
+            ranking_score,
+        )
+
+    @property
+    def configuration(self):
+        """
+        Returns a dict-like representation of this evaluator.
+
+        This is for storing its state in the database.
+        """
+        configuration = super().configuration
+        configuration['warm_start_parameter'] = self.warm_start_parameter
+        configuration['cumulative_fit_time'] = self.cumulative_fit_time
+        return configuration
@@ -0,0 +1 @@
+"""Features computed from raw lyrics for nlp4musa2020."""
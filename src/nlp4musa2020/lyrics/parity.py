@@ -0,0 +1,50 @@
+"""Comparison of extracted lyrics features with the dataset columns.
+
+The statistical and rhyme features of the ALF200k dataset were computed by
+the dataset authors, the extractors of this package only approximate them.
+compare quantifies the agreement per feature, such that the extracted
+features are only used in place of the dataset columns if they agree within
+a tolerance, see tools/check_lyrics.py and the extract_lyrics_features
+option of the ALF200KLoader.
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+
+
+def compare(expected, extracted):
+    """Compares the extracted features with the expected ones.
+
+    Args:
+        expected: a dataframe of the dataset features.
+        extracted: a dataframe with the same columns and index containing
+            the extracted features.
+
+    Returns: a dataframe indexed by feature containing the Pearson and
+        Spearman correlation, the mean absolute difference ('mae'), the mae
+        relative to the mean absolute expected value ('relative_mae') and
+        the fraction of (nearly) equal values ('equal'). Correlations of
+        constant columns are nan.
+    """
+    rows = {}
+    for feature in expected.columns:
+        values = expected[feature].to_numpy(dtype=np.float64)
+        actual = extracted[feature].to_numpy(dtype=np.float64)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            pearson = expected[feature].corr(extracted[feature])
+            spearman = expected[feature].corr(extracted[feature],
+                                              method='spearman')
+        mae = np.mean(np.abs(values - actual))
+        scale = np.mean(np.abs(values))
+        rows[feature] = {
+            'pearson': pearson,
+            'spearman': spearman,
+            'mae': mae,
+            'relative_mae': mae / scale if scale > 0 else mae,
+            'equal': np.mean(np.isclose(values, actual, rtol=1e-3,
+                                        atol=1e-6)),
+        }
+
+    return pd.DataFrame.from_dict(rows, orient='index')
@@ -0,0 +1,361 @@
+"""Approximate pronunciations of English words for the lyrics features.
+
+Words are converted to ARPAbet like phonemes (without stress) using a table
+of grapheme rules, matched longest first, and a table of frequent irregular
+words. The pronunciations and the syllables derived from them are memoized
+per word, hence every distinct word of a corpus is converted only once.
+Diacritics are removed before the rules are applied, other letters not
+covered by the rules are treated like silent consonants.
+"""
+import functools
+import unicodedata
+
+VOWELS = [
+    'AA', 'AE', 'AH', 'AO', 'AW', 'AY', 'EH', 'ER', 'EY', 'IH', 'IY', 'OW',
+    'OY', 'UH', 'UW'
+]
+
+# Consonant classes, codas of the same classes rhyme imperfectly.
+CONSONANT_CLASSES = {
+    'P': 'stop',
+    'B': 'stop',
+    'T': 'stop',
+    'D': 'stop',
+    'K': 'stop',
+    'G': 'stop',
+    'M': 'nasal',
+    'N': 'nasal',
+    'NG': 'nasal',
+    'F': 'fricative',
+    'V': 'fricative',
+    'TH': 'fricative',
+    'DH': 'fricative',
+    'S': 'sibilant',
+    'Z': 'sibilant',
+    'SH': 'sibilant',
+    'ZH': 'sibilant',
+    'CH': 'sibilant',
+    'JH': 'sibilant',
+    'HH': 'h',
+    'L': 'l',
+    'R': 'r',
+    'W': 'w',
+    'Y': 'y',
+}
+
+IRREGULAR_WORDS = {
+    'a': 'AH',
+    'above': 'AH B AH V',
+    'again': 'AH G EH N',
+    'ah': 'AA',
+    'ain\'t': 'EY N T',
+    'are': 'AA R',
+    'been': 'B IH N',
+    'both': 'B OW TH',
+    'break': 'B R EY K',
+    'can\'t': 'K AE N T',
+    'come': 'K AH M',
+    'do': 'D UW',
+    'does': 'D AH Z',
+    'don\'t': 'D OW N T',
+    'done': 'D AH N',
+    'enough': 'IH N AH F',
+    'eye': 'AY',
+    'eyes': 'AY Z',
+    'friend': 'F R EH N D',
+    'friends': 'F R EH N D Z',
+    'give': 'G IH V',
+    'gone': 'G AO N',
+    'great': 'G R EY T',
+    'have': 'HH AE V',
+    'heart': 'HH AA R T',
+    'how': 'HH AW',
+    'i': 'AY',
+    'i\'d': 'AY D',
+    'i\'ll': 'AY L',
+    'i\'m': 'AY M',
+    'i\'ve': 'AY V',
+    'laugh': 'L AE F',
+    'live': 'L IH V',
+    'lose': 'L UW Z',
+    'love': 'L AH V',
+    'loved': 'L AH V D',
+    'lover': 'L AH V ER',
+    'loves': 'L AH V Z',
+    'lovin': 'L AH V IH N',
+    'loving': 'L AH V IH NG',
+    'move': 'M UW V',
+    'none': 'N AH N',
+    'now': 'N AW',
+    'of': 'AH V',
+    'oh': 'OW',
+    'once': 'W AH N S',
+    'one': 'W AH N',
+    'ooh': 'UW',
+    'our': 'AW R',
+    'people': 'P IY P AH L',
+    'put': 'P UH T',
+    'rough': 'R AH F',
+    'said': 'S EH D',
+    'says': 'S EH Z',
+    'shoe': 'SH UW',
+    'some': 'S AH M',
+    'sure': 'SH UH R',
+    'the': 'DH AH',
+    'their': 'DH EH R',
+    'there': 'DH EH R',
+    'they': 'DH EY',
+    'though': 'DH OW',
+    'through': 'TH R UW',
+    'to': 'T UW',
+    'tough': 'T AH F',
+    'two': 'T UW',
+    'uh': 'AH',
+    'want': 'W AA N T',
+    'was': 'W AH Z',
+    'were': 'W ER',
+    'what': 'W AH T',
+    'where': 'W EH R',
+    'who': 'HH UW',
+    'woman': 'W UH M AH N',
+    'women': 'W IH M AH N',
+    'won\'t': 'W OW N T',
+    'word': 'W ER D',
+    'work': 'W ER K',
+    'world': 'W ER L D',
+    'wow': 'W AW',
+    'yeah': 'Y EH',
+    'you': 'Y UW',
+    'you\'re': 'Y UH R',
+    'your': 'Y AO R',
+}
+
+# Grapheme rules (grapheme, phonemes, position), the longest matching
+# grapheme wins. Position 'start' or 'end' restricts a rule to the start or
+# end of a word, 'suffix' to the end of a word with a vowel before. Magic e
+# and single vowels are handled in _vowel.
+GRAPHEMES = [
+    ('eigh', 'EY', None),
+    ('ough', 'AO', None),
+    ('augh', 'AO', None),
+    ('tion', 'SH AH N', None),
+    ('sion', 'ZH AH N', None),
+    ('ted', 'T IH D', 'suffix'),
+    ('ded', 'D IH D', 'suffix'),
+    ('igh', 'AY', None),
+    ('eau', 'OW', None),
+    ('ear', 'IY R', None),
+    ('eer', 'IY R', None),
+    ('air', 'EH R', None),
+    ('are', 'EH R', 'end'),
+    ('ire', 'AY R', 'end'),
+    ('ore', 'AO R', 'end'),
+    ('ure', 'UH R', 'end'),
+    ('our', 'AW R', None),
+    ('ind', 'AY N D', 'end'),
+    ('ild', 'AY L D', 'end'),
+    ('old', 'OW L D', 'end'),
+    ('ost', 'OW S T', 'end'),
+    ('sch', 'S K', 'start'),
+    ('tch', 'CH', None),
+    ('dge', 'JH', None),
+    ('ar', 'AA R', None),
+    ('er', 'ER', None),
+    ('ir', 'ER', None),
+    ('ur', 'ER', None),
+    ('or', 'AO R', None),
+    ('ee', 'IY', None),
+    ('ea', 'IY', None),
+    ('ie', 'AY', 'end'),
+    ('ie', 'IY', None),
+    ('ei', 'EY', None),
+    ('ey', 'IY', 'end'),
+    ('ay', 'EY', None),
+    ('ai', 'EY', None),
+    ('oa', 'OW', None),
+    ('oe', 'OW', None),
+    ('oo', 'UW', None),
+    ('ou', 'AW', None),
+    ('ow', 'OW', 'end'),
+    ('ow', 'AW', None),
+    ('oi', 'OY', None),
+    ('oy', 'OY', None),
+    ('au', 'AO', None),
+    ('aw', 'AO', None),
+    ('ew', 'UW', None),
+    ('ue', 'UW', None),
+    ('ui', 'UW', None),
+    ('ed', 'D', 'suffix'),
+    ('es', 'Z', 'suffix'),
+    ('kn', 'N', 'start'),
+    ('wr', 'R', 'start'),
+    ('wh', 'W', 'start'),
+    ('mb', 'M', 'end'),
+    ('gh', '', None),
+    ('ph', 'F', None),
+    ('th', 'TH', None),
+    ('sh', 'SH', None),
+    ('ch', 'CH', None),
+    ('ck', 'K', None),
+    ('ng', 'NG', None),
+    ('qu', 'K W', None),
+    ('ce', 'S', 'end'),
+    ('ci', 'S IH', None),
+    ('ge', 'JH', 'end'),
+    ('x', 'K S', None),
+    ('b', 'B', None),
+    ('c', 'K', None),
+    ('d', 'D', None),
+    ('f', 'F', None),
+    ('g', 'G', None),
+    ('h', 'HH', None),
+    ('j', 'JH', None),
+    ('k', 'K', None),
+    ('l', 'L', None),
+    ('m', 'M', None),
+    ('n', 'N', None),
+    ('p', 'P', None),
+    ('r', 'R', None),
+    ('s', 'S', None),
+    ('t', 'T', None),
+    ('v', 'V', None),
+    ('w', 'W', None),
+    ('z', 'Z', None),
+]
+
+SHORT_VOWELS = {'a': 'AE', 'e': 'EH', 'i': 'IH', 'o': 'AA', 'u': 'AH'}
+LONG_VOWELS = {'a': 'EY', 'e': 'IY', 'i': 'AY', 'o': 'OW', 'u': 'UW'}
+
+_RULES = {}
+for _grapheme, _phonemes, _position in GRAPHEMES:
+    _RULES.setdefault(_grapheme, []).append((_phonemes.split(), _position))
+_MAX_GRAPHEME = max(len(grapheme) for grapheme in _RULES)
+
+
+def _is_vowel(letter):
+    return letter in 'aeiou'
+
+
+def _magic_e(word, start):
+    """Checks if the vowel at start is followed by a consonant and final e.
+
+    The e may be followed by the suffix s or d, e.g. times or hoped.
+    """
+    return (word[start + 2:] in ('e', 'es', 'ed') and
+            start + 1 < len(word) and not _is_vowel(word[start + 1]) and
+            word[start + 1] not in 'wy')
+
+
+def _vowel(word, start):
+    """Returns the phonemes and length of a single vowel letter."""
+    letter = word[start]
+    if letter == 'y':
+        if start == 0:
+            return ['Y'], 1
+        if start == len(word) - 1:
+            has_vowel = any(_is_vowel(other) for other in word[:start])
+            return ['IY' if has_vowel else 'AY'], 1
+        return ['AY' if _magic_e(word, start) else 'IH'], 1
+
+    if letter == 'e' and start == len(word) - 1 and start > 0:
+        # A final e is silent unless it is the only vowel.
+        if any(_is_vowel(other) or other == 'y' for other in word[:start]):
+            return [], 1
+        return ['IY'], 1
+
+    if _magic_e(word, start):
+        return [LONG_VOWELS[letter]], 1
+
+    if start == len(word) - 1 and letter in 'io':
+        # E.g. go, hi.
+        return [LONG_VOWELS[letter]], 1
+
+    return [SHORT_VOWELS[letter]], 1
+
+
+@functools.lru_cache(maxsize=2**18)
+def pronounce(word):
+    """Returns the approximate phonemes of a lowercase word as a tuple.
+
+    Numbers are pronounced as a single syllable which only rhymes with the
+    same number.
+    """
+    if word in IRREGULAR_WORDS:
+        return tuple(IRREGULAR_WORDS[word].split())
+    if any(letter.isdigit() for letter in word):
+        return ('AH', '#' + word)
+
+    word = ''.join(
+        letter for letter in unicodedata.normalize('NFKD', word)
+        if not unicodedata.combining(letter)).replace('\'', '')
+    phonemes = []
+    start = 0
+    while start < len(word):
+        for length in range(min(_MAX_GRAPHEME, len(word) - start), 0, -1):
+            grapheme = word[start:start + length]
+            match = None
+            for rule, position in _RULES.get(grapheme, []):
+                if position == 'start' and start != 0:
+                    continue
+                if (position in ('end', 'suffix') and
+                        start + length != len(word)):
+                    continue
+                if position == 'suffix' and not any(
+                        _is_vowel(other) for other in word[:start]):
+                    continue
+                match = rule
+                break
+            if match is not None:
+                break
+        else:
+            match, length = _vowel(word, start) if word[start] in (
+                'aeiouy') else ([], 1)
+
+        if phonemes and match and phonemes[-1] == match[0]:
+            # Double consonants are pronounced once.
+            match = match[1:]
+        phonemes.extend(match)
+        start += length
+
+    if not any(phoneme in VOWELS for phoneme in phonemes):
+        phonemes.insert(0, 'AH')
+
+    return tuple(phonemes)
+
+
+@functools.lru_cache(maxsize=2**18)
+def syllables(word):
+    """Returns the syllables of a lowercase word.
+
+    Every syllable is a tuple (onset, vowel, coda) where onset and coda are
+    tuples of consonants. Of the consonants between two vowels, the last one
+    starts the next syllable.
+    """
+    phonemes = pronounce(word)
+    vowels = [i for i, phoneme in enumerate(phonemes) if phoneme in VOWELS]
+
+    result = []
+    onset_start = 0
+    for number, vowel in enumerate(vowels):
+        if number + 1 < len(vowels):
+            coda_end = max(vowels[number + 1] - 1, vowel + 1)
+        else:
+            coda_end = len(phonemes)
+        result.append((
+            phonemes[onset_start:vowel],
+            phonemes[vowel],
+            phonemes[vowel + 1:coda_end],
+        ))
+        onset_start = coda_end
+
+    return tuple(result)
+
+
+def count_syllables(word):
+    """Returns the number of syllables of a lowercase word."""
+    return len(syllables(word))
+
+
+def coda_classes(coda):
+    """Returns the consonant classes of a coda, used for imperfect rhymes."""
+    return tuple(CONSONANT_CLASSES.get(phoneme, phoneme) for phoneme in coda)
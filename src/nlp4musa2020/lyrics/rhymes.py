@@ -0,0 +1,308 @@
+"""Rhyme analysis computing the rhyme features of lyrics.
+
+Computes the columns of the 'rhymes' feature group of the ALF200KLoader
+from raw lyrics, following the rhyme categories of Hirjee and Brown's rhyme
+analyzer. Words are converted to syllables with the memoized phoneme table
+(see phonemes), once per distinct word of a shard.
+
+Instead of comparing all pairs of words, every lyrics keeps a hashed index
+from rhyme tails, the vowel and the coda consonant classes of the last
+syllable, to the recent words ending in this tail. A word rhymes with the
+most recent different word with the same tail, at most max_line_distance
+lines before it. The rhyme is extended backwards over the preceding
+syllables of both words (possibly crossing word boundaries within the
+lines) as long as their vowels match. Words ending in an unstressed schwa,
+e.g. 'the', are not considered.
+
+The features are relative to the number of non-blank lines (x_per_line),
+syllables or rhymes (x_per_rhyme):
+
+    rhymes_per_line, rhymes_per_syllable: the number of rhymes.
+    rhyme_density: the fraction of syllables that are part of a rhyme.
+    end_pairs_per_line: rhymes between two line endings.
+    singles/doubles/triples/quads/longs_per_rhyme: rhymes of 1, 2, 3, 4
+        and at least 5 syllables.
+    perfect_rhymes: the fraction of rhymes with identical final codas.
+    line_internals_per_line: rhymes within a line.
+    links_per_line: rhymes between a line ending and a word within a line.
+    bridges_per_line: rhymes between words within different lines.
+    compounds_per_line: rhymes spanning multiple words.
+    chaining_per_line: rhymes continuing a rhyme of the previous word.
+"""
+from joblib import delayed
+from joblib import Parallel
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator
+
+from ..dataloaders.alf200k import ALF200KLoader
+from .phonemes import coda_classes
+from .phonemes import syllables
+from .phonemes import VOWELS
+from .tokens import TokenizedLyrics
+
+FEATURES = ALF200KLoader.feature_groups['rhymes']
+
+# Counters per lyrics, the rhyme lengths have to be consecutive.
+COUNTERS = [
+    'rhymes',
+    'rhymed_syllables',
+    'end_pairs',
+    'singles',
+    'doubles',
+    'triples',
+    'quads',
+    'longs',
+    'perfect',
+    'line_internals',
+    'links',
+    'bridges',
+    'compounds',
+    'chaining',
+]
+_COUNTER = {name: i for i, name in enumerate(COUNTERS)}
+_SCHWA = (VOWELS.index('AH'), ())
+
+
+class _Words:
+    """Phonetic properties of the vocabulary of a shard, by token id."""
+
+    def __init__(self, vocabulary):
+        tails = {}
+        perfect_tails = {}
+        self.n_syllables = np.zeros(len(vocabulary), dtype=np.int64)
+        self.tails = np.full(len(vocabulary), -1, dtype=np.int64)
+        self.perfect_tails = np.zeros(len(vocabulary), dtype=np.int64)
+        vowels = []
+        for word, word_syllables in enumerate(map(syllables, vocabulary)):
+            self.n_syllables[word] = len(word_syllables)
+            vowels.extend(
+                VOWELS.index(vowel) for _, vowel, _ in word_syllables)
+            _, vowel, coda = word_syllables[-1]
+            tail = (VOWELS.index(vowel), coda_classes(coda))
+            if tail != _SCHWA:
+                self.tails[word] = tails.setdefault(tail, len(tails))
+            self.perfect_tails[word] = perfect_tails.setdefault(
+                (vowel, coda), len(perfect_tails))
+
+        self.vowels = np.asarray(vowels, dtype=np.int64)
+        self.offsets = np.cumsum(self.n_syllables) - self.n_syllables
+
+
+class _Syllables:
+    """The syllables of all tokens of a shard in reading order."""
+
+    def __init__(self, tokenized, words):
+        counts = words.n_syllables[tokenized.tokens]
+        # The index after the last syllable of every token.
+        self.ends = np.cumsum(counts)
+        starts = self.ends - counts
+        positions = np.arange(self.ends[-1] if len(counts) else 0)
+        first = np.repeat(words.offsets[tokenized.tokens] - starts, counts)
+        self.vowels = words.vowels[first + positions]
+        self.lines = np.repeat(tokenized.token_lines, counts)
+
+
+def _rhyme_length(syllable_vowels, syllable_lines, first, second, limit):
+    """Returns the number of matching syllables ending at first and second.
+
+    Args:
+        syllable_vowels: the vowel of every syllable.
+        syllable_lines: the line of every syllable.
+        first: the index of the last syllable of the first word.
+        second: the index of the last syllable of the second word.
+        limit: the index of the first syllable of the lyrics.
+    """
+    length = 1
+    while (first - length >= limit and
+           second - length > first and
+           syllable_lines[first - length] == syllable_lines[first] and
+           syllable_lines[second - length] == syllable_lines[second] and
+           syllable_vowels[first - length] == syllable_vowels[second -
+                                                              length]):
+        length += 1
+
+    return length
+
+
+def _document_counters(start, end, tokenized, words, sylls, line_ends,
+                       max_line_distance):
+    """Finds the rhymes of the tokens start to end of a single lyrics."""
+    counters = np.zeros(len(COUNTERS))
+    if start == end:
+        return counters
+
+    tokens = tokenized.tokens
+    token_lines = tokenized.token_lines
+    syllable_start = sylls.ends[start] - words.n_syllables[tokens[start]]
+    rhymed = np.zeros(sylls.ends[end - 1] - syllable_start, dtype=bool)
+
+    # Per tail, the last token and the last token of a different word than
+    # the last one. The partner of a token is the last preceding token of a
+    # different word with the same tail, hence one of both.
+    index = {}
+    second_parts = set()
+    for token in range(start, end):
+        tail = words.tails[tokens[token]]
+        if tail < 0:
+            continue
+        line = token_lines[token]
+        last, last_different = index.get(tail, (None, None))
+        if last is not None and tokens[last] != tokens[token]:
+            last_different = last
+        index[tail] = token, last_different
+
+        partner = last_different
+        if (partner is None or
+                token_lines[partner] < line - max_line_distance):
+            continue
+
+        first = sylls.ends[partner] - 1
+        second = sylls.ends[token] - 1
+        length = _rhyme_length(sylls.vowels, sylls.lines, first, second,
+                               syllable_start)
+        rhymed[first - length + 1 - syllable_start:first + 1 -
+               syllable_start] = True
+        rhymed[second - length + 1 - syllable_start:second + 1 -
+               syllable_start] = True
+
+        counters[_COUNTER['rhymes']] += 1
+        counters[_COUNTER['singles'] + min(length, 5) - 1] += 1
+        if (words.perfect_tails[tokens[partner]] ==
+                words.perfect_tails[tokens[token]]):
+            counters[_COUNTER['perfect']] += 1
+        if length > min(words.n_syllables[tokens[partner]],
+                        words.n_syllables[tokens[token]]):
+            counters[_COUNTER['compounds']] += 1
+        if partner in second_parts:
+            counters[_COUNTER['chaining']] += 1
+        second_parts.add(token)
+
+        if token_lines[partner] == line:
+            counters[_COUNTER['line_internals']] += 1
+        elif line_ends[partner] and line_ends[token]:
+            counters[_COUNTER['end_pairs']] += 1
+        elif line_ends[partner] or line_ends[token]:
+            counters[_COUNTER['links']] += 1
+        else:
+            counters[_COUNTER['bridges']] += 1
+
+    counters[_COUNTER['rhymed_syllables']] = rhymed.sum()
+    return counters
+
+
+def _divide(numerator, denominator):
+    """Divides element wise, resulting in zero where denominator is zero."""
+    return np.divide(numerator,
+                     denominator,
+                     out=np.zeros_like(numerator, dtype=np.float64),
+                     where=denominator != 0)
+
+
+def _extract_shard(texts, max_line_distance):
+    """Computes the rhyme features of a shard of lyrics."""
+    tokenized = TokenizedLyrics(texts)
+    n = tokenized.n_documents
+    words = _Words(tokenized.vocabulary)
+    sylls = _Syllables(tokenized, words)
+
+    token_lines = tokenized.token_lines
+    line_ends = np.ones(len(token_lines), dtype=bool)
+    line_ends[:-1] = token_lines[:-1] != token_lines[1:]
+
+    boundaries = np.searchsorted(tokenized.token_documents, np.arange(n + 1))
+    counters = np.array([
+        _document_counters(boundaries[document], boundaries[document + 1],
+                           tokenized, words, sylls, line_ends,
+                           max_line_distance) for document in range(n)
+    ]).reshape(n, len(COUNTERS))
+    counters = dict(zip(COUNTERS, counters.T))
+
+    lines = np.bincount(tokenized.line_documents, minlength=n)
+    syllable_count = np.bincount(
+        tokenized.token_documents,
+        weights=words.n_syllables[tokenized.tokens],
+        minlength=n,
+    )
+    rhymes = counters['rhymes']
+
+    features = {
+        'rhymes_per_line': _divide(rhymes, lines),
+        'rhymes_per_syllable': _divide(rhymes, syllable_count),
+        'rhyme_density': _divide(counters['rhymed_syllables'],
+                                 syllable_count),
+        'end_pairs_per_line': _divide(counters['end_pairs'], lines),
+        'perfect_rhymes': _divide(counters['perfect'], rhymes),
+    }
+    for name in ['singles', 'doubles', 'triples', 'quads', 'longs']:
+        features[f'{name}_per_rhyme'] = _divide(counters[name], rhymes)
+    for name in ['line_internals', 'links', 'bridges', 'compounds']:
+        features[f'{name}_per_line'] = _divide(counters[name], lines)
+    features['chaining_per_line'] = _divide(counters['chaining'], lines)
+
+    return np.column_stack([features[name] for name in FEATURES])
+
+
+class RhymeFeatureExtractor(BaseEstimator):
+    """Computes the rhyme feature group from raw lyrics.
+
+    The extractor is stateless and can be used as text vectorizer of the
+    ALF200KLoader. The columns are ordered like FEATURES.
+    """
+
+    def __init__(self,
+                 max_line_distance=2,
+                 shard_size=10_000,
+                 n_jobs=None,
+                 dtype=np.float64):
+        """Initializes the extractor.
+
+        Args:
+            max_line_distance: the maximal number of lines between two
+                rhyming words, 0 only considers rhymes within lines.
+            shard_size: the number of lyrics per shard.
+            n_jobs: the number of processes extracting the shards.
+            dtype: the dtype of the resulting array.
+        """
+        self.max_line_distance = max_line_distance
+        self.shard_size = shard_size
+        self.n_jobs = n_jobs
+        self.dtype = dtype
+
+    def fit(self, X):  # noqa: N803
+        """Nothing to fit, the extraction is stateless."""
+        return self
+
+    def transform(self, X):  # noqa: N803
+        """Computes the features of the lyrics in X."""
+        X = list(X)  # noqa: N806
+        if len(X) <= self.shard_size:
+            shards = [_extract_shard(X, self.max_line_distance)]
+        else:
+            shards = Parallel(n_jobs=self.n_jobs)(
+                delayed(_extract_shard)(X[i:i + self.shard_size],
+                                        self.max_line_distance)
+                for i in range(0, len(X), self.shard_size))
+
+        features = np.vstack(shards).astype(self.dtype, copy=False)
+        return features.reshape(len(X), len(FEATURES))
+
+    def fit_transform(self, X):  # noqa: N803
+        """Computes the features of the lyrics in X."""
+        return self.transform(X)
+
+    def get_feature_names_out(self):
+        """Returns the names of the columns."""
+        return np.asarray(FEATURES, dtype=object)
+
+
+def extract(texts, **kwargs):
+    """Returns the rhyme features of the texts as a dataframe.
+
+    Args:
+        texts: the lyrics, e.g. a pandas series whose index is kept.
+        kwargs: the parameters of the RhymeFeatureExtractor.
+    """
+    features = RhymeFeatureExtractor(**kwargs).transform(texts)
+    index = texts.index if isinstance(texts, pd.Series) else None
+    return pd.DataFrame(features, columns=FEATURES, index=index)
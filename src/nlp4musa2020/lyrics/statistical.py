@@ -0,0 +1,265 @@
+"""Vectorized extraction of the statistical lyrics features.
+
+Computes the columns of the 'statistical' feature group of the
+ALF200KLoader from raw lyrics. A shard of lyrics is tokenized once (see
+TokenizedLyrics) and all features are derived from the flat token arrays
+with numpy, e.g. distinct n-grams and word frequencies per lyrics are found
+by sorting (lyrics, token) keys instead of building a counter per lyrics.
+Shards are processed in a process pool.
+
+Tokens are lowercase words and numbers, lines are the non-blank lines of
+the lyrics. Features of the form x_ratio are relative to the number of
+tokens (words) or lines, x_per_line are averages over the lines. Syllables
+are counted with the phoneme table shared with the rhyme features.
+"""
+from joblib import delayed
+from joblib import Parallel
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+from ..dataloaders.alf200k import ALF200KLoader
+from .phonemes import count_syllables
+from .tokens import TokenizedLyrics
+
+FEATURES = ALF200KLoader.feature_groups['statistical']
+
+CHARACTERS = {
+    'digits': '0123456789',
+    'exclamation_marks': '!',
+    'question_marks': '?',
+    'colons': ':',
+    'semicolons': ';',
+    'quotes': '"“”',
+    'commas': ',',
+    'dots': '.',
+    'hyphens': '-',
+}
+
+
+def _divide(numerator, denominator):
+    """Divides element wise, resulting in zero where denominator is zero."""
+    numerator = np.asarray(numerator, dtype=np.float64)
+    return np.divide(numerator,
+                     denominator,
+                     out=np.zeros_like(numerator),
+                     where=np.asarray(denominator) != 0)
+
+
+def _groups(keys):
+    """Finds the distinct rows of keys.
+
+    Args:
+        keys: a list of equally long integer arrays, the first one being the
+            lyrics index.
+
+    Returns: the lyrics index and the size of every distinct row.
+    """
+    if len(keys[0]) == 0:
+        return keys[0], keys[0]
+
+    order = np.lexsort(keys[::-1])
+    sorted_keys = np.stack([key[order] for key in keys])
+    starts = np.ones(len(order), dtype=bool)
+    starts[1:] = (sorted_keys[:, 1:] != sorted_keys[:, :-1]).any(axis=0)
+    starts = np.flatnonzero(starts)
+    sizes = np.diff(np.append(starts, len(order)))
+
+    return sorted_keys[0, starts], sizes
+
+
+def _ngram_ratio(tokenized, n):
+    """Returns the ratio of distinct n-grams within lines per lyrics."""
+    tokens = tokenized.tokens
+    lines = tokenized.token_lines
+    if len(tokens) < n:
+        return np.zeros(tokenized.n_documents)
+
+    # n-grams starting at i are complete if token i + n - 1 is on line i.
+    starts = np.flatnonzero(lines[:len(lines) - n + 1] == lines[n - 1:])
+    documents = tokenized.line_documents[lines[starts]]
+    keys = [documents] + [tokens[starts + i] for i in range(n)]
+    distinct_documents, _ = _groups(keys)
+
+    return _divide(
+        np.bincount(distinct_documents, minlength=tokenized.n_documents),
+        np.bincount(documents, minlength=tokenized.n_documents))
+
+
+def _character_counts(texts):
+    """Counts the characters of the CHARACTERS classes in every text."""
+    counts = np.zeros((len(texts), len(CHARACTERS)))
+    for row, text in enumerate(texts):
+        if not isinstance(text, str):
+            continue
+        for column, characters in enumerate(CHARACTERS.values()):
+            counts[row, column] = sum(map(text.count, characters))
+
+    return counts
+
+
+def _extract_shard(texts):
+    """Computes the statistical features of a shard of lyrics."""
+    texts = list(texts)
+    tokenized = TokenizedLyrics(texts)
+    n = tokenized.n_documents
+    tokens = tokenized.tokens
+    token_documents = tokenized.token_documents
+    line_documents = tokenized.line_documents
+    features = {}
+
+    def per_document(values=None, documents=token_documents):
+        return np.bincount(documents, weights=values, minlength=n)
+
+    token_count = per_document()
+    line_count = per_document(documents=line_documents)
+
+    # Frequencies of the distinct words per lyrics.
+    word_documents, frequencies = _groups([token_documents, tokens])
+    unique_tokens = per_document(documents=word_documents)
+
+    # Distinct words per line.
+    line_word_lines, _ = _groups([tokenized.token_lines, tokens])
+    unique_line_tokens = per_document(
+        documents=line_documents[line_word_lines])
+
+    # Distinct lines per lyrics.
+    line_ids = {}
+    line_keys = np.fromiter(
+        (line_ids.setdefault(line, len(line_ids))
+         for line in tokenized.lines),
+        dtype=np.int64,
+        count=len(tokenized.lines),
+    )
+    unique_lines = per_document(
+        documents=_groups([line_documents, line_keys])[0])
+
+    lengths = tokenized.word_property(len)[tokens]
+    stopwords = tokenized.word_property(
+        ENGLISH_STOP_WORDS.__contains__)[tokens]
+    syllables = tokenized.word_property(count_syllables)[tokens]
+
+    line_syllables = np.bincount(tokenized.token_lines,
+                                 weights=syllables,
+                                 minlength=len(line_documents))
+    mean_line_syllables = _divide(
+        per_document(line_syllables, line_documents), line_count)
+    mean_squared_line_syllables = _divide(
+        per_document(line_syllables**2, line_documents), line_count)
+
+    # A token is novel if its word did not occur on a previous line.
+    first_lines = np.full(len(tokens), -1)
+    if len(tokens):
+        order = np.lexsort([tokenized.token_lines, tokens, token_documents])
+        sorted_lines = tokenized.token_lines[order]
+        starts = np.ones(len(order), dtype=bool)
+        starts[1:] = ((tokens[order][1:] != tokens[order][:-1]) |
+                      (token_documents[order][1:] !=
+                       token_documents[order][:-1]))
+        first = np.maximum.accumulate(
+            np.where(starts, np.arange(len(order)), 0))
+        first_lines[order] = sorted_lines[first]
+    novel = first_lines == tokenized.token_lines
+    line_tokens = np.bincount(tokenized.token_lines,
+                              minlength=len(line_documents))
+    line_novel = np.bincount(tokenized.token_lines,
+                             weights=novel,
+                             minlength=len(line_documents))
+
+    features['token_count'] = token_count
+    features['unique_token_ratio'] = _divide(unique_tokens, token_count)
+    features['unique_bigram_ratio'] = _ngram_ratio(tokenized, 2)
+    features['unique_trigram_ratio'] = _ngram_ratio(tokenized, 3)
+    features['average_token_length'] = _divide(per_document(lengths),
+                                               token_count)
+    features['unique_tokens_per_line'] = _divide(unique_line_tokens,
+                                                 line_count)
+    features['average_tokens_per_line'] = _divide(token_count, line_count)
+    features['repeat_word_ratio'] = _divide(token_count - unique_tokens,
+                                            token_count)
+    features['line_count'] = line_count
+    features['unique_line_count'] = unique_lines
+    blank_lines = tokenized.line_counts - line_count
+    features['blank_line_count'] = blank_lines
+    features['blank_line_ratio'] = _divide(blank_lines,
+                                           tokenized.line_counts)
+    features['repeat_line_ratio'] = _divide(line_count - unique_lines,
+                                            line_count)
+    for name, counts in zip(CHARACTERS, _character_counts(texts).T):
+        features[name] = counts
+    features['stopwords_ratio'] = _divide(per_document(stopwords),
+                                          token_count)
+    features['stopwords_per_line'] = _divide(per_document(stopwords),
+                                             line_count)
+    for name, frequency in [('hapax', 1), ('dis', 2), ('tris', 3)]:
+        features[f'{name}_legomenon_ratio'] = _divide(
+            per_document(frequencies == frequency, word_documents),
+            token_count)
+    features['syllables_per_line'] = mean_line_syllables
+    features['syllables_per_word'] = _divide(per_document(syllables),
+                                             token_count)
+    features['syllable_variation'] = np.sqrt(
+        np.maximum(mean_squared_line_syllables - mean_line_syllables**2, 0))
+    features['novel_word_proportion'] = _divide(
+        per_document(_divide(line_novel, line_tokens), line_documents),
+        per_document(line_tokens > 0, line_documents))
+
+    return np.column_stack([features[name] for name in FEATURES])
+
+
+class StatisticalFeatureExtractor(BaseEstimator):
+    """Computes the statistical feature group from raw lyrics.
+
+    The extractor is stateless and can be used as text vectorizer of the
+    ALF200KLoader. The columns are ordered like FEATURES.
+    """
+
+    def __init__(self, shard_size=10_000, n_jobs=None, dtype=np.float64):
+        """Initializes the extractor.
+
+        Args:
+            shard_size: the number of lyrics per shard.
+            n_jobs: the number of processes extracting the shards.
+            dtype: the dtype of the resulting array.
+        """
+        self.shard_size = shard_size
+        self.n_jobs = n_jobs
+        self.dtype = dtype
+
+    def fit(self, X):  # noqa: N803
+        """Nothing to fit, the extraction is stateless."""
+        return self
+
+    def transform(self, X):  # noqa: N803
+        """Computes the features of the lyrics in X."""
+        X = list(X)  # noqa: N806
+        if len(X) <= self.shard_size:
+            shards = [_extract_shard(X)]
+        else:
+            shards = Parallel(n_jobs=self.n_jobs)(
+                delayed(_extract_shard)(X[i:i + self.shard_size])
+                for i in range(0, len(X), self.shard_size))
+
+        features = np.vstack(shards).astype(self.dtype, copy=False)
+        return features.reshape(len(X), len(FEATURES))
+
+    def fit_transform(self, X):  # noqa: N803
+        """Computes the features of the lyrics in X."""
+        return self.transform(X)
+
+    def get_feature_names_out(self):
+        """Returns the names of the columns."""
+        return np.asarray(FEATURES, dtype=object)
+
+
+def extract(texts, **kwargs):
+    """Returns the statistical features of the texts as a dataframe.
+
+    Args:
+        texts: the lyrics, e.g. a pandas series whose index is kept.
+        kwargs: the parameters of the StatisticalFeatureExtractor.
+    """
+    features = StatisticalFeatureExtractor(**kwargs).transform(texts)
+    index = texts.index if isinstance(texts, pd.Series) else None
+    return pd.DataFrame(features, columns=FEATURES, index=index)
@@ -0,0 +1,82 @@
+"""Shared tokenization of lyrics into lines and word ids."""
+import re
+import unicodedata
+
+import numpy as np
+
+# Words of letters and digits of any script, possibly with apostrophes.
+TOKEN_PATTERN = re.compile(r"[^\W_]+(?:'[^\W_]+)*")
+
+
+class TokenizedLyrics:
+    """A batch of lyrics split into lines and tokens once.
+
+    The tokens are mapped to ids of a vocabulary shared by the batch, hence
+    properties of words, e.g. their syllables, are computed once per
+    distinct word and looked up with numpy indexing.
+
+    Attributes:
+        n_documents: the number of lyrics.
+        vocabulary: a list of the distinct tokens, indexed by token id.
+        tokens: the token id of every token in the batch.
+        token_lines: the line index of every token.
+        line_documents: the lyrics index of every non-blank line.
+        lines: the normalized text of every non-blank line.
+        line_counts: the number of lines of every lyrics, including blank
+            lines between the first and the last non-blank line.
+    """
+
+    def __init__(self, texts):
+        """Tokenizes the texts.
+
+        Args:
+            texts: an iterable of lyrics, missing lyrics may be None.
+        """
+        vocabulary = {}
+        add = vocabulary.setdefault
+        tokens = []
+        line_lengths = []
+        line_documents = []
+        lines = []
+        line_counts = []
+
+        for document, text in enumerate(texts):
+            if isinstance(text, str):
+                # Composed characters, such that accents are part of words.
+                text = unicodedata.normalize('NFC', text).lower().strip()
+            else:
+                text = ''
+            text_lines = text.split('\n') if text else []
+            line_counts.append(len(text_lines))
+            for line in text_lines:
+                line = ' '.join(line.split())
+                if not line:
+                    continue
+                line_tokens = [
+                    add(token, len(vocabulary))
+                    for token in TOKEN_PATTERN.findall(line)
+                ]
+                tokens.extend(line_tokens)
+                line_lengths.append(len(line_tokens))
+                line_documents.append(document)
+                lines.append(line)
+
+        self.n_documents = len(line_counts)
+        self.vocabulary = list(vocabulary)
+        self.tokens = np.asarray(tokens, dtype=np.int64)
+        self.line_documents = np.asarray(line_documents, dtype=np.int64)
+        self.token_lines = np.repeat(np.arange(len(line_lengths)),
+                                     line_lengths)
+        self.lines = lines
+        self.line_counts = np.asarray(line_counts, dtype=np.int64)
+
+    @property
+    def token_documents(self):
+        """The lyrics index of every token."""
+        return self.line_documents[self.token_lines]
+
+    def word_property(self, function, dtype=np.float64):
+        """Applies function to every distinct word, indexed by token id."""
+        return np.fromiter(map(function, self.vocabulary),
+                           dtype=dtype,
+                           count=len(self.vocabulary))
@@ -0,0 +1,107 @@
+"""tf.data input pipelines feeding the Keras models batch wise.
+
+TensorFlow is imported inside the functions, so importing this module does
+not load it.
+"""
+import numpy as np
+from scipy import sparse
+
+
+def batches(X,  # noqa: N803
+            y=None,
+            batch_size=256,
+            shuffle=False,
+            random_state=None,
+            rows=None):
+    """Yields batches of rows of X (and y) converted to float32.
+
+    Only the rows of the current batch are copied, hence X can be a memmap
+    or a sparse matrix which is never materialized as a dense array.
+
+    Args:
+        X: a dense array, memmap or sparse matrix.
+        y: the targets, or None to only yield X.
+        batch_size: the number of rows per batch.
+        shuffle: if True, the rows are visited in a random order.
+        random_state: a numpy RandomState used for shuffling.
+        rows: the indices of the rows to use, defaults to all rows.
+    """
+    import tensorflow as tf
+
+    if sparse.issparse(X):
+        X = X.tocsr()  # noqa: N806
+
+    order = rows
+    if shuffle:
+        order = random_state.permutation(
+            X.shape[0] if rows is None else rows)
+
+    n_rows = X.shape[0] if rows is None else len(rows)
+    for start in range(0, n_rows, batch_size):
+        if shuffle:
+            # Sorted rows read memmaps sequentially.
+            batch = np.sort(order[start:start + batch_size])
+        elif rows is None:
+            batch = slice(start, start + batch_size)
+        else:
+            batch = rows[start:start + batch_size]
+
+        x_batch = X[batch]
+        if sparse.issparse(x_batch):
+            # Sparse tensors need their indices in row-major order.
+            x_batch.sort_indices()
+            x_batch = x_batch.tocoo()
+            x_batch = tf.SparseTensor(
+                indices=np.column_stack([x_batch.row, x_batch.col]),
+                values=x_batch.data.astype(np.float32),
+                dense_shape=x_batch.shape,
+            )
+        else:
+            x_batch = np.asarray(x_batch, dtype=np.float32)
+
+        if y is None:
+            yield x_batch
+        else:
+            yield x_batch, np.asarray(y[batch], dtype=np.float32)
+
+
+def make_dataset(X,  # noqa: N803
+                 y=None,
+                 batch_size=256,
+                 shuffle=False,
+                 random_state=None,
+                 rows=None):
+    """Creates a prefetching tf.data.Dataset of batches.
+
+    The dataset can be iterated multiple times, every iteration (epoch) uses
+    a new random order if shuffle is True.
+
+    Args:
+        X: a dense array, memmap or sparse matrix.
+        y: the targets, or None for predictions.
+        batch_size: the number of rows per batch.
+        shuffle: if True, the rows are shuffled every epoch.
+        random_state: the seed used for shuffling.
+        rows: the indices of the rows to use, defaults to all rows.
+    """
+    import tensorflow as tf
+
+    if sparse.issparse(X):
+        x_spec = tf.SparseTensorSpec(shape=(None, X.shape[1]),
+                                     dtype=tf.float32)
+    else:
+        x_spec = tf.TensorSpec(shape=(None, X.shape[1]), dtype=tf.float32)
+
+    if y is None:
+        signature = x_spec
+    else:
+        y = np.asarray(y)
+        y_spec = tf.TensorSpec(shape=(None,) + y.shape[1:], dtype=tf.float32)
+        signature = (x_spec, y_spec)
+
+    rng = np.random.RandomState(random_state)
+    dataset = tf.data.Dataset.from_generator(
+        lambda: batches(X, y, batch_size, shuffle, rng, rows),
+        output_signature=signature,
+    )
+    return dataset.prefetch(tf.data.AUTOTUNE)
@@ -0,0 +1,146 @@
+"""Linear models for multi-label targets."""
+from joblib import delayed
+from joblib import Parallel
+import numpy as np
+from scipy import sparse
+from scipy.optimize import minimize
+from sklearn.base import BaseEstimator
+from sklearn.base import ClassifierMixin
+from sklearn.utils import check_array
+
+
+def _squared_hinge(weights, x, y, c, fit_intercept):
+    """Returns the L2-SVM objective and its gradient.
+
+    Like liblinear, the intercept is treated as a feature of constant value
+    one and therefore regularized as well. The products with x are computed
+    in the dtype of x, such that float32 features are not copied.
+    """
+    coef = weights[:-1] if fit_intercept else weights
+    margins = np.asarray(x @ coef.astype(x.dtype, copy=False),
+                         dtype=np.float64)
+    if fit_intercept:
+        margins += weights[-1]
+    losses = np.maximum(0, 1 - y * margins)
+
+    objective = 0.5 * weights @ weights + c * losses @ losses
+    residuals = -2 * c * y * losses
+    gradient = weights.copy()
+    products = x.T @ residuals.astype(x.dtype, copy=False)
+    if fit_intercept:
+        gradient[:-1] += products
+        gradient[-1] += residuals.sum()
+    else:
+        gradient += products
+
+    return objective, gradient
+
+
+def _fit_label(x, y, c, initial, fit_intercept, tol, max_iter):
+    """Trains the L2-SVM of a single label with L-BFGS."""
+    result = minimize(
+        _squared_hinge,
+        initial,
+        args=(x, y, c, fit_intercept),
+        method='L-BFGS-B',
+        jac=True,
+        options={
+            'gtol': tol,
+            'maxiter': max_iter,
+        },
+    )
+    return result.x
+
+
+class MultiLabelLinearSVC(ClassifierMixin, BaseEstimator):
+    """Linear support vector classifier for multi-label targets.
+
+    It solves the same primal problem as LinearSVC with the squared hinge
+    loss and L2 penalty for every label, but validates X only once and
+    shares it between the labels, which are trained in a thread pool. With
+    warm_start, the previous solution is used as starting point, e.g. when
+    fitting increasing values of C. It replaces
+    MultiOutputClassifier(LinearSVC()).
+    """
+
+    def __init__(self,
+                 C=1.0,  # noqa: N803
+                 fit_intercept=True,
+                 tol=1e-4,
+                 max_iter=1000,
+                 warm_start=False,
+                 n_jobs=None):
+        """Initializes the classifier.
+
+        Args:
+            C: the inverse regularization strength.
+            fit_intercept: if True, an intercept is fitted per label.
+            tol: the gradient tolerance of the solver.
+            max_iter: the maximal number of solver iterations per label.
+            warm_start: if True, fit starts from the previous solution.
+            n_jobs: the number of threads training the labels.
+        """
+        self.C = C
+        self.fit_intercept = fit_intercept
+        self.tol = tol
+        self.max_iter = max_iter
+        self.warm_start = warm_start
+        self.n_jobs = n_jobs
+
+    def fit(self, X, y):  # noqa: N803
+        """Trains one linear classifier per label on the shared X."""
+        X = check_array(  # noqa: N806
+            X, accept_sparse='csr', dtype=(np.float64, np.float32))
+        y = np.asarray(y)
+        if y.ndim == 1:
+            y = y.reshape(-1, 1)
+
+        self.classes_ = []
+        signs = np.empty(y.shape)
+        for label in range(y.shape[1]):
+            classes = np.unique(y[:, label])
+            if len(classes) > 2:
+                raise ValueError('Every label has to be binary, label '
+                                 f'{label} has {len(classes)} classes.')
+            self.classes_.append(classes)
+            signs[:, label] = np.where(y[:, label] == classes[-1], 1., -1.)
+
+        n_weights = X.shape[1] + int(self.fit_intercept)
+        initial = np.zeros((y.shape[1], n_weights))
+        if self.warm_start and hasattr(self, 'coef_'):
+            if self.coef_.shape == (y.shape[1], X.shape[1]):
+                initial[:, :X.shape[1]] = self.coef_
+                if self.fit_intercept:
+                    initial[:, -1] = self.intercept_
+
+        weights = Parallel(n_jobs=self.n_jobs, prefer='threads')(
+            delayed(_fit_label)(X, signs[:, label], self.C, initial[label],
+                                self.fit_intercept, self.tol, self.max_iter)
+            for label in range(y.shape[1]))
+        weights = np.asarray(weights)
+
+        self.coef_ = weights[:, :X.shape[1]]
+        if self.fit_intercept:
+            self.intercept_ = weights[:, -1]
+        else:
+            self.intercept_ = np.zeros(y.shape[1])
+
+        return self
+
+    def decision_function(self, X):  # noqa: N803
+        """Returns the signed distances to the hyperplanes of the labels."""
+        X = check_array(  # noqa: N806
+            X, accept_sparse='csr', dtype=(np.float64, np.float32))
+        scores = X @ self.coef_.T.astype(X.dtype, copy=False)
+        if sparse.issparse(scores):
+            scores = scores.toarray()
+        return scores + self.intercept_
+
+    def predict(self, X):  # noqa: N803
+        """Predicts the labels of X."""
+        scores = self.decision_function(X)
+        predictions = np.empty(scores.shape, dtype=self.classes_[0].dtype)
+        for label, classes in enumerate(self.classes_):
+            predictions[:, label] = np.where(scores[:, label] > 0,
+                                             classes[-1], classes[0])
+        return predictions
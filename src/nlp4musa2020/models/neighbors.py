@@ -0,0 +1,490 @@
+"""Nearest neighbor models and helpers for the KNN plans."""
+import abc
+
+import joblib
+from joblib import delayed
+from joblib import effective_n_jobs
+from joblib import Parallel
+import numpy as np
+from scipy import sparse
+from scipy.spatial.distance import cdist
+from sklearn.base import BaseEstimator
+from sklearn.base import ClassifierMixin
+from sklearn.utils import check_array
+from sklearn.utils import check_random_state
+from sklearn.utils.extmath import row_norms
+from sklearn.utils.extmath import safe_sparse_dot
+
+
+def neighbor_weights(distances, weights):
+    """Returns the neighbor weights like the scikit-learn KNN estimators.
+
+    Args:
+        distances: the distances of shape (n_queries, n_neighbors).
+        weights: either 'uniform' or 'distance'.
+    """
+    if weights == 'uniform':
+        return np.ones_like(distances)
+    if weights != 'distance':
+        raise ValueError(f'Unsupported weights: {weights}')
+
+    with np.errstate(divide='ignore'):
+        weights = 1. / distances
+    # Points with zero distance get all the weight.
+    inf_mask = np.isinf(weights)
+    inf_row = np.any(inf_mask, axis=1)
+    weights[inf_row] = inf_mask[inf_row]
+    return weights
+
+
+def predict_classes(y, indices, weights):
+    """Returns the weighted majority vote of the neighbors.
+
+    Args:
+        y: the training targets of shape (n_samples,) or (n_samples,
+            n_outputs).
+        indices: the neighbor indices of shape (n_queries, n_neighbors).
+        weights: the neighbor weights of the same shape as indices.
+    """
+    y = np.asarray(y)
+    single_output = y.ndim == 1
+    if single_output:
+        y = y.reshape(-1, 1)
+
+    rows = np.repeat(np.arange(indices.shape[0]), indices.shape[1])
+    predictions = np.empty((indices.shape[0], y.shape[1]), dtype=y.dtype)
+    for output in range(y.shape[1]):
+        classes, encoded = np.unique(y[:, output], return_inverse=True)
+        votes = np.zeros((indices.shape[0], len(classes)))
+        np.add.at(votes, (rows, encoded[indices].ravel()), weights.ravel())
+        # argmax prefers the smallest class on ties, like weighted_mode.
+        predictions[:, output] = classes[votes.argmax(axis=1)]
+
+    if single_output:
+        return predictions.ravel()
+    return predictions
+
+
+def predict_values(y, indices, weights):
+    """Returns the weighted mean of the neighbor targets.
+
+    Args:
+        y: the training targets of shape (n_samples,) or (n_samples,
+            n_outputs).
+        indices: the neighbor indices of shape (n_queries, n_neighbors).
+        weights: the neighbor weights of the same shape as indices.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    neighbors = y[indices]
+    if y.ndim > 1:
+        weights = weights[:, :, np.newaxis]
+    return (neighbors * weights).sum(axis=1) / weights.sum(axis=1)
+
+
+def minkowski_distances(x, y, p):
+    """Returns the exact pairwise minkowski distances between x and y."""
+    if p == 2:
+        return cdist(x, y, 'euclidean')
+    if p == 1:
+        return cdist(x, y, 'cityblock')
+    return cdist(x, y, 'minkowski', p=p)
+
+
+def nearest_candidates(distances, n_candidates):
+    """Returns the indices of the smallest distances of every row.
+
+    Besides the n_candidates smallest distances, all points tied with the
+    largest of them are included in every row, hence the result may have
+    more than n_candidates columns and contains the true neighbors
+    regardless of how ties are broken.
+
+    Args:
+        distances: the distances of shape (n_queries, n_samples).
+        n_candidates: the minimal number of candidates per query.
+    """
+    n_samples = distances.shape[1]
+    if n_candidates < n_samples:
+        indices = np.argpartition(distances, n_candidates - 1, axis=1)
+        threshold = np.take_along_axis(
+            distances, indices[:, n_candidates - 1:n_candidates], axis=1)
+        width = int((distances <= threshold).sum(axis=1).max())
+        if width == n_candidates:
+            return indices[:, :n_candidates]
+        if width < n_samples:
+            return np.argpartition(distances, width - 1, axis=1)[:, :width]
+
+    return np.tile(np.arange(n_samples), (distances.shape[0], 1))
+
+
+class RandomProjectionTree:
+    """Binary tree splitting the data by random hyperplanes.
+
+    Like in Annoy, every split uses the hyperplane equidistant to two random
+    points of the node. Only the indices of the two points are stored, hence
+    the tree needs little memory even for high dimensional data.
+    """
+
+    def __init__(self, x, leaf_size, random_state, max_retries=3):
+        """Builds the tree.
+
+        Args:
+            x: the data of shape (n_samples, n_features).
+            leaf_size: the maximal number of points in a leaf.
+            random_state: a numpy RandomState used to draw the hyperplanes.
+            max_retries: the number of hyperplanes tried before a node that
+                cannot be split becomes a leaf.
+        """
+        self.left = []
+        self.right = []
+        self.point_a = []
+        self.point_b = []
+        self.thresholds = []
+        leaves = []
+
+        # Children >= 0 are nodes, children < 0 encode the leaf -child - 1.
+        self.root = 0
+        stack = [(np.arange(x.shape[0]), None, None)]
+        while stack:
+            indices, parent, is_left = stack.pop()
+            split = None
+            if len(indices) > leaf_size:
+                split = self._split(x, indices, random_state, max_retries)
+
+            if split is None:
+                child = -len(leaves) - 1
+                leaves.append(indices)
+            else:
+                child = len(self.left)
+                a, b, threshold, go_left = split
+                self.left.append(0)
+                self.right.append(0)
+                self.point_a.append(a)
+                self.point_b.append(b)
+                self.thresholds.append(threshold)
+                stack.append((indices[~go_left], child, False))
+                stack.append((indices[go_left], child, True))
+
+            if parent is None:
+                self.root = child
+            elif is_left:
+                self.left[parent] = child
+            else:
+                self.right[parent] = child
+
+        self.left = np.asarray(self.left, dtype=np.int64)
+        self.right = np.asarray(self.right, dtype=np.int64)
+        self.point_a = np.asarray(self.point_a, dtype=np.int64)
+        self.point_b = np.asarray(self.point_b, dtype=np.int64)
+        self.thresholds = np.asarray(self.thresholds, dtype=np.float64)
+        self.leaf_offsets = np.cumsum([0] + [len(leaf) for leaf in leaves])
+        self.leaf_indices = np.concatenate(leaves)
+
+    @staticmethod
+    def _split(x, indices, random_state, max_retries):
+        for _ in range(max_retries):
+            a, b = random_state.choice(indices, 2, replace=False)
+            normal = x[a] - x[b]
+            threshold = normal @ (x[a] + x[b]) / 2
+            go_left = x[indices] @ normal > threshold
+            if 0 < go_left.sum() < len(indices):
+                return a, b, threshold, go_left
+
+        return None
+
+    def leaves(self, x, queries):
+        """Returns the leaf of every query.
+
+        Args:
+            x: the data the tree was built on.
+            queries: the query points of shape (n_queries, n_features).
+        """
+        children = np.full(queries.shape[0], self.root, dtype=np.int64)
+        active = np.flatnonzero(children >= 0)
+        while len(active) > 0:
+            nodes = children[active]
+            normals = x[self.point_a[nodes]] - x[self.point_b[nodes]]
+            go_left = np.einsum('ij,ij->i', queries[active],
+                                normals) > self.thresholds[nodes]
+            children[active] = np.where(go_left, self.left[nodes],
+                                        self.right[nodes])
+            active = active[children[active] >= 0]
+
+        return -children - 1
+
+    def points(self, leaf):
+        """Returns the indices of the points in a leaf."""
+        start, end = self.leaf_offsets[leaf:leaf + 2]
+        return self.leaf_indices[start:end]
+
+
+class _NeighborsClassifier(ClassifierMixin, BaseEstimator, abc.ABC):
+    """Base class of the KNN classifiers processing queries in batches."""
+
+    # The sparse formats accepted by check_array.
+    _accept_sparse = False
+
+    def _fit_data(self, X, y):  # noqa: N803
+        # float32 features are kept to save memory.
+        self._fit_x = check_array(X,
+                                  dtype=(np.float64, np.float32),
+                                  accept_sparse=self._accept_sparse)
+        self._y = np.asarray(y)
+        if self._y.ndim == 1:
+            self.classes_ = np.unique(self._y)
+        else:
+            self.classes_ = [
+                np.unique(self._y[:, output])
+                for output in range(self._y.shape[1])
+            ]
+
+    @abc.abstractmethod
+    def _batch_size(self):
+        """Returns the number of queries processed at once."""
+
+    @abc.abstractmethod
+    def _query(self, queries, n_neighbors):
+        """Returns the distances and indices of the neighbors of queries."""
+
+    def kneighbors(self,
+                   X,  # noqa: N803
+                   n_neighbors=None,
+                   return_distance=True):
+        """Returns the nearest neighbors of X.
+
+        Args:
+            X: the query points.
+            n_neighbors: the number of neighbors, defaults to n_neighbors.
+            return_distance: if False, only the indices are returned.
+
+        Returns: the distances and indices of the neighbors sorted by
+            distance, both of shape (n_queries, n_neighbors).
+        """
+        if n_neighbors is None:
+            n_neighbors = self.n_neighbors
+        queries = check_array(X,
+                              dtype=self._fit_x.dtype,
+                              accept_sparse=self._accept_sparse)
+        batch_size = self._batch_size()
+        batches = Parallel(n_jobs=self.n_jobs, prefer='threads')(
+            delayed(self._query)(queries[i:i + batch_size], n_neighbors)
+            for i in range(0, queries.shape[0], batch_size))
+        distances = np.concatenate([batch[0] for batch in batches])
+        indices = np.concatenate([batch[1] for batch in batches])
+
+        if return_distance:
+            return distances, indices
+        return indices
+
+    def predict(self, X):  # noqa: N803
+        """Predicts the classes of X by a vote of its neighbors."""
+        distances, indices = self.kneighbors(X)
+        return predict_classes(self._y, indices,
+                               neighbor_weights(distances, self.weights))
+
+    def save(self, path):
+        """Stores the fitted classifier including its training data."""
+        joblib.dump(self, path)
+
+    @classmethod
+    def load(cls, path):
+        """Loads a classifier stored with save."""
+        return joblib.load(path)
+
+
+class ApproximateKNeighborsClassifier(_NeighborsClassifier):
+    """Approximate k-nearest neighbors classifier.
+
+    The neighbors are searched in a forest of random projection trees. Each
+    query is routed to one leaf per tree and the exact distances to the
+    points of these leaves are computed, so the returned distances are exact
+    but some true neighbors may be missed. The recall increases with
+    search_trees and leaf_size at the cost of query time. It is a drop-in
+    replacement for the KNeighborsClassifier in the KNN plans.
+    """
+
+    def __init__(self,
+                 n_neighbors=5,
+                 weights='uniform',
+                 p=2,
+                 n_trees=10,
+                 search_trees=None,
+                 leaf_size=64,
+                 batch_size=1024,
+                 n_jobs=None,
+                 random_state=None):
+        """Initializes the classifier.
+
+        Args:
+            n_neighbors: the number of neighbors used for predictions.
+            weights: either 'uniform' or 'distance'.
+            p: the power of the minkowski metric.
+            n_trees: the number of trees built by fit.
+            search_trees: the number of trees searched per query. Defaults to
+                all trees, smaller values trade recall for query time without
+                rebuilding the index.
+            leaf_size: the maximal number of points in a leaf.
+            batch_size: the number of queries processed at once.
+            n_jobs: the number of threads processing query batches.
+            random_state: the seed used to build the trees.
+        """
+        self.n_neighbors = n_neighbors
+        self.weights = weights
+        self.p = p
+        self.n_trees = n_trees
+        self.search_trees = search_trees
+        self.leaf_size = leaf_size
+        self.batch_size = batch_size
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+
+    def fit(self, X, y):  # noqa: N803
+        """Builds the index on X."""
+        self._fit_data(X, y)
+        random_state = check_random_state(self.random_state)
+        self.trees_ = [
+            RandomProjectionTree(self._fit_x, self.leaf_size, random_state)
+            for _ in range(self.n_trees)
+        ]
+        return self
+
+    def _batch_size(self):
+        return self.batch_size
+
+    def _query(self, queries, n_neighbors):
+        """Returns the approximate neighbors of a batch of queries."""
+        n_trees = self.search_trees or len(self.trees_)
+        distances = np.full((queries.shape[0], n_trees * n_neighbors), np.inf)
+        indices = np.full(distances.shape, -1, dtype=np.int64)
+
+        for t, tree in enumerate(self.trees_[:n_trees]):
+            leaves = tree.leaves(self._fit_x, queries)
+            order = np.argsort(leaves, kind='stable')
+            bounds = np.flatnonzero(np.diff(leaves[order])) + 1
+            for group in np.split(order, bounds):
+                points = tree.points(leaves[group[0]])
+                block = minkowski_distances(queries[group],
+                                            self._fit_x[points], self.p)
+                k = min(n_neighbors, len(points))
+                nearest = np.argpartition(block, k - 1, axis=1)[:, :k]
+                columns = slice(t * n_neighbors, t * n_neighbors + k)
+                distances[group, columns] = np.take_along_axis(block,
+                                                               nearest,
+                                                               axis=1)
+                indices[group, columns] = points[nearest]
+
+        # Points found by several trees are only counted once.
+        order = np.argsort(indices, axis=1, kind='stable')
+        sorted_indices = np.take_along_axis(indices, order, axis=1)
+        duplicates = np.zeros(indices.shape, dtype=bool)
+        duplicates[:, 1:] = sorted_indices[:, 1:] == sorted_indices[:, :-1]
+        np.put_along_axis(distances, order,
+                          np.where(duplicates, np.inf,
+                                   np.take_along_axis(distances, order,
+                                                      axis=1)),
+                          axis=1)
+
+        nearest = np.argsort(distances, axis=1, kind='stable')[:, :n_neighbors]
+        distances = np.take_along_axis(distances, nearest, axis=1)
+        indices = np.take_along_axis(indices, nearest, axis=1)
+
+        # Queries with too few candidates fall back to an exact search.
+        missing = np.flatnonzero(np.isinf(distances[:, -1]))
+        if len(missing) > 0:
+            block = minkowski_distances(queries[missing], self._fit_x, self.p)
+            nearest = np.argsort(block, axis=1, kind='stable')[:, :n_neighbors]
+            distances[missing] = np.take_along_axis(block, nearest, axis=1)
+            indices[missing] = nearest
+
+        return distances, indices
+
+
+class ExactKNeighborsClassifier(_NeighborsClassifier):
+    """Exact brute force k-nearest neighbors classifier.
+
+    The queries are processed in tiles which run in a thread pool, such that
+    the distance matrices to all training points of the concurrently
+    processed tiles fit into memory_budget. For p=2 the candidates are
+    selected with matrix products (GEMM), and the exact distances of the
+    best 2 * n_neighbors candidates are recomputed from the differences
+    before the neighbors are selected. For other p the distances are
+    computed by the blocked kernels of scipy. All points tied with the last
+    candidate are kept as candidates and ties are broken by the index of the
+    training point, hence the neighbors are exact even for duplicate
+    training points and the results are deterministic. It replaces the ball
+    tree of the KNN plans, which does not help for high dimensional
+    features. Sparse (csr) features are supported for p=2. float32 features
+    are not converted and, for p=2, the distances are computed in float32.
+    """
+
+    _accept_sparse = 'csr'
+
+    def __init__(self,
+                 n_neighbors=5,
+                 weights='uniform',
+                 p=2,
+                 memory_budget=2**28,
+                 n_jobs=None):
+        """Initializes the classifier.
+
+        Args:
+            n_neighbors: the number of neighbors used for predictions.
+            weights: either 'uniform' or 'distance'.
+            p: the power of the minkowski metric.
+            memory_budget: the number of bytes the tiles of distances of all
+                threads may use together.
+            n_jobs: the number of threads processing tiles.
+        """
+        self.n_neighbors = n_neighbors
+        self.weights = weights
+        self.p = p
+        self.memory_budget = memory_budget
+        self.n_jobs = n_jobs
+
+    def fit(self, X, y):  # noqa: N803
+        """Stores the training data."""
+        self._fit_data(X, y)
+        if self.p == 2:
+            self._squared_norms = row_norms(self._fit_x, squared=True)
+        elif sparse.issparse(self._fit_x):
+            raise ValueError(f'Sparse input requires p=2, got p={self.p}')
+        return self
+
+    def _batch_size(self):
+        # The distances and the candidate indices of every tile processed
+        # concurrently have to fit. scipy computes the distances for p != 2
+        # in float64.
+        dtype = self._fit_x.dtype if self.p == 2 else np.dtype(np.float64)
+        row_size = self._fit_x.shape[0] * (dtype.itemsize +
+                                           np.dtype(np.intp).itemsize)
+        tiles = effective_n_jobs(self.n_jobs)
+        return max(1, self.memory_budget // (row_size * tiles))
+
+    def _query(self, queries, n_neighbors):
+        """Returns the exact neighbors of a tile of queries."""
+        n_samples = self._fit_x.shape[0]
+        if self.p == 2:
+            distances = safe_sparse_dot(queries,
+                                        self._fit_x.T,
+                                        dense_output=True)
+            distances *= -2
+            distances += self._squared_norms
+            distances += row_norms(queries, squared=True)[:, np.newaxis]
+            n_candidates = min(n_samples, 2 * n_neighbors)
+        else:
+            distances = minkowski_distances(queries, self._fit_x, self.p)
+            n_candidates = n_neighbors
+
+        indices = nearest_candidates(distances, n_candidates)
+
+        if self.p == 2:
+            # Exact distances of the candidates, one column at a time.
+            distances = np.empty(indices.shape, dtype=self._fit_x.dtype)
+            for column in range(indices.shape[1]):
+                distances[:, column] = row_norms(
+                    queries - self._fit_x[indices[:, column]])
+        else:
+            distances = np.take_along_axis(distances, indices, axis=1)
+
+        order = np.lexsort((indices, distances), axis=1)[:, :n_neighbors]
+        return (np.take_along_axis(distances, order, axis=1),
+                np.take_along_axis(indices, order, axis=1))
@@ -1,20 +1,40 @@
+import time
+
 import numpy as np
+from scipy import sparse
+from dbispipeline.utils import LOGGER
 from sklearn.base import BaseEstimator, RegressorMixin
-from sklearn.metrics import roc_curve
-from sklearn.preprocessing import normalize
-from tensorflow.keras.models import Model
-from tensorflow.keras.layers import Input, Dense, Concatenate, Dropout, AlphaDropout
+
+from . import training_log
+from .dataset import make_dataset
 
 class SimpleGenreNN(BaseEstimator, RegressorMixin):
-    def __init__(self, batch_size=2, epochs=10, dense_sizes=(100,), dropout_rate=0.1):
+    # The defaults reproduce the published results: batches of two, fitted
+    # on all data without early stopping. use_dataset, larger batches and a
+    # validation_split change the results.
+    def __init__(self, batch_size=2, epochs=10, dense_sizes=(100,),
+                 dropout_rate=0.1, use_dataset=False, shuffle=True,
+                 random_state=None, validation_split=0.0, patience=5,
+                 training_log=None):
         self.batch_size = batch_size
         self.epochs = epochs
         self.dense_sizes = dense_sizes
         self.dropout_rate = dropout_rate
+        self.use_dataset = use_dataset
+        self.shuffle = shuffle
+        self.random_state = random_state
+        self.validation_split = validation_split
+        self.patience = patience
+        # Path of a JSON lines file the record of every fit is appended to.
+        self.training_log = training_log
 
     def _create_model(self, X, y):
+        # TensorFlow is imported on first use to keep the import fast.
+        from tensorflow.keras.models import Model
+        from tensorflow.keras.layers import Input, Dense, AlphaDropout
+
         # Input layer.
-        inp = Input(shape=(X.shape[1],))
+        inp = Input(shape=(X.shape[1],), sparse=sparse.issparse(X))
 
         # Dense layers.
         layer = inp
@@ -36,12 +56,79 @@ class SimpleGenreNN(BaseEstimator, RegressorMixin):
         # Create the model.
         self._create_model(X, y)
 
+        from tensorflow.keras.callbacks import EarlyStopping
+
+        # Hold out a random validation split for early stopping.
+        rows = np.arange(X.shape[0])
+        validation_rows = None
+        callbacks = []
+        if self.validation_split > 0:
+            rng = np.random.RandomState(self.random_state)
+            order = rng.permutation(X.shape[0])
+            n_validation = max(1, int(X.shape[0] * self.validation_split))
+            validation_rows = np.sort(order[:n_validation])
+            rows = np.sort(order[n_validation:])
+            callbacks.append(EarlyStopping(monitor="val_loss",
+                                           patience=self.patience,
+                                           restore_best_weights=True))
+
         # Fit the model.
-        self.model.fit(X, y, batch_size=self.batch_size, epochs=self.epochs)
+        start = time.perf_counter()
+        if self.use_dataset:
+            # Streams float32 batches, X is never copied as a whole.
+            dataset = make_dataset(X, y, batch_size=self.batch_size,
+                                   shuffle=self.shuffle,
+                                   random_state=self.random_state, rows=rows)
+            validation_data = None
+            if validation_rows is not None:
+                validation_data = make_dataset(X, y,
+                                               batch_size=self.batch_size,
+                                               rows=validation_rows)
+            history = self.model.fit(dataset, epochs=self.epochs,
+                                     validation_data=validation_data,
+                                     callbacks=callbacks)
+        else:
+            if sparse.issparse(X):
+                raise ValueError("Sparse input requires use_dataset=True.")
+            # Keras computes in float32, convert once instead of per batch.
+            X = np.asarray(X, dtype="float32")
+            y = np.asarray(y, dtype="float32")
+            validation_data = None
+            if validation_rows is not None:
+                validation_data = (X[validation_rows], y[validation_rows])
+                X, y = X[rows], y[rows]
+            history = self.model.fit(X, y,
+                                     batch_size=self.batch_size,
+                                     epochs=self.epochs, shuffle=self.shuffle,
+                                     validation_data=validation_data,
+                                     callbacks=callbacks)
+        self.fit_time_ = time.perf_counter() - start
+
+        # Report the epochs actually trained and the time saved by stopping.
+        self.epochs_ = len(history.history["loss"])
+        self.time_saved_ = (self.fit_time_ / self.epochs_ *
+                            (self.epochs - self.epochs_))
+        LOGGER.info("Trained %d of %d epochs in %.1fs, saved %.1fs.",
+                    self.epochs_, self.epochs, self.fit_time_,
+                    self.time_saved_)
+        if self.training_log is not None:
+            params = self.get_params()
+            del params["training_log"]
+            training_log.append(self.training_log, {
+                "params": params,
+                "epochs": self.epochs_,
+                "fit_time": self.fit_time_,
+                "time_saved": self.time_saved_,
+            })
+
+        return self
 
     def predict(self, X):
         # Make predictions.
-        y  = self.model.predict(X)
+        if self.use_dataset:
+            y = self.model.predict(make_dataset(X, batch_size=self.batch_size))
+        else:
+            y = self.model.predict(np.asarray(X, dtype="float32"))
 
         # Convert probabilities to labels.
         res = np.zeros(y.shape)
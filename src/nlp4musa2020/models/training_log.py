@@ -0,0 +1,73 @@
+"""Records of the fits of the Keras models, e.g. the epochs trained.
+
+The grid search clones the models and may fit them in other processes,
+hence every fit appends its record to a JSON lines file whose path is a
+parameter of the model. The result handler created by result_handler
+attaches the records to the result of the evaluation, which is stored in
+the database next to the cv_results. The log has to be cleared before an
+evaluation starts, see clear and nlp4musa2020.runner, otherwise records of
+earlier fits in the same process, e.g. refits of a persisted plan, are
+attached as well.
+"""
+import json
+import os
+import tempfile
+
+from dbispipeline.utils import LOGGER
+
+
+def log_path(name):
+    """Returns a path for the training log of a plan.
+
+    The path is unique per process, so plans running concurrently or stale
+    logs of aborted runs are never mixed up.
+
+    Args:
+        name: the name of the plan.
+    """
+    return os.path.join(tempfile.gettempdir(),
+                        f'nlp4musa2020-{name}-{os.getpid()}.jsonl')
+
+
+def append(path, record):
+    """Appends a record to the training log."""
+    with open(path, 'a') as log:
+        log.write(json.dumps(record, sort_keys=True, default=repr) + '\n')
+
+
+def clear(path):
+    """Removes all records of the training log."""
+    if os.path.isfile(path):
+        os.remove(path)
+
+
+def read(path):
+    """Returns all records of the training log."""
+    if not os.path.isfile(path):
+        return []
+
+    with open(path, 'r') as log:
+        return [json.loads(line) for line in log if line.strip()]
+
+
+def result_handler(path):
+    """Returns a result handler attaching the training log to the result.
+
+    The records are stored as result['training']. The log is kept, e.g.
+    for the refit of a persisted plan, and cleared before the next run.
+
+    Args:
+        path: the path of the training log.
+    """
+
+    def attach_training_log(result):
+        records = read(path)
+        result['training'] = records
+        if records:
+            epochs = sum(record['epochs'] for record in records)
+            time_saved = sum(record['time_saved'] for record in records)
+            LOGGER.info(
+                'Trained %.1f epochs per fit on average, early stopping '
+                'saved %.1fs in total.', epochs / len(records), time_saved)
+
+    return attach_training_log
@@ -0,0 +1,289 @@
+"""Runs multiple plans in one process sharing the loaded data."""
+from collections import OrderedDict
+import glob
+import json
+import os.path
+
+from dbispipeline.base import Loader
+from dbispipeline.core import Core
+from dbispipeline.utils import LOGGER
+
+
+class PreloadedLoader(Loader):
+    """Loader returning data that was already loaded by another loader."""
+
+    def __init__(self, data, configuration):
+        """Initializes the loader.
+
+        Args:
+            data: the data returned by load.
+            configuration: the configuration of the original loader.
+        """
+        self.data = data
+        self._configuration = configuration
+
+    def load(self):
+        """Returns the preloaded data."""
+        return self.data
+
+    @property
+    def configuration(self):
+        """Returns the configuration of the original loader."""
+        return dict(self._configuration)
+
+
+def find_plans(paths):
+    """Returns the plan files of the given files and directories.
+
+    Args:
+        paths: plan files or directories searched recursively for plans.
+    """
+    plans = []
+    for path in paths:
+        if os.path.isdir(path):
+            pattern = os.path.join(path, '**', '*.py')
+            plans.extend(sorted(glob.glob(pattern, recursive=True)))
+        else:
+            plans.append(path)
+
+    return plans
+
+
+def loader_key(dataloader):
+    """Returns a key identifying the data produced by a dataloader.
+
+    Args:
+        dataloader: the dataloader of a plan.
+    """
+    return json.dumps(dataloader.configuration, sort_keys=True, default=str)
+
+
+def group_plans(cores):
+    """Groups plans by the configuration of their dataloader.
+
+    Args:
+        cores: a list of dbispipeline Core objects.
+
+    Returns: an ordered dict mapping loader keys to lists of cores. Plans
+        using a multiloader are never grouped.
+    """
+    groups = OrderedDict()
+    for core in cores:
+        if core.dataloader.is_multiloader:
+            key = core.plan_path
+        else:
+            key = loader_key(core.dataloader)
+        groups.setdefault(key, []).append(core)
+
+    return groups
+
+
+def limit_n_jobs(core, n_jobs):
+    """Sets all n_jobs parameters of a plan to the given budget.
+
+    Args:
+        core: the dbispipeline Core object of the plan.
+        n_jobs: the number of jobs each parallel estimator may use.
+    """
+    pipeline = core.pipeline
+    if hasattr(pipeline, 'get_params'):
+        params = {
+            name: n_jobs
+            for name in pipeline.get_params(deep=True)
+            if name == 'n_jobs' or name.endswith('__n_jobs')
+        }
+        pipeline.set_params(**params)
+
+    grid_parameters = getattr(core.evaluator, 'grid_parameters', None)
+    if grid_parameters is not None and 'n_jobs' in grid_parameters:
+        grid_parameters['n_jobs'] = n_jobs
+
+
+def clear_training_logs(core):
+    """Clears the training logs of the estimators of a plan.
+
+    Args:
+        core: the dbispipeline Core object of the plan.
+    """
+    from nlp4musa2020.models import training_log
+
+    pipeline = core.pipeline
+    if not hasattr(pipeline, 'get_params'):
+        return
+
+    for name, path in pipeline.get_params(deep=True).items():
+        if path is not None and (name == 'training_log' or
+                                 name.endswith('__training_log')):
+            training_log.clear(path)
+
+
+def run_plan(core):
+    """Runs a plan and returns the results of its evaluations.
+
+    Core.run logs and swallows errors of the data loading and of the
+    evaluation, hence a plan failed if it produced fewer results than its
+    dataloader loads datasets.
+
+    Args:
+        core: the dbispipeline Core object of the plan.
+
+    Returns: the list of results, or None if the plan failed.
+    """
+    results = []
+    handlers = core.result_handlers
+    core.result_handlers = list(handlers) + [results.append]
+    try:
+        clear_training_logs(core)
+        core.run()
+    except Exception as e:
+        LOGGER.error('Error during plan %s:', core.plan_path)
+        LOGGER.exception(e)
+        return None
+    finally:
+        core.result_handlers = handlers
+
+    n_datasets = 1
+    if core.dataloader.is_multiloader:
+        n_datasets = len(list(core.dataloader.configuration))
+    if len(results) < n_datasets:
+        LOGGER.error('Plan %s failed.', core.plan_path)
+        return None
+
+    return results
+
+
+def persist_plan(core,
+                 result,
+                 data,
+                 dataloader,
+                 directory,
+                 ranking_score='f1_micro'):
+    """Refits the best pipeline of an evaluated plan and saves it.
+
+    The artifacts are stored in a subdirectory named after the plan file.
+
+    Args:
+        core: the dbispipeline Core object of the plan.
+        result: the result of the evaluator of the plan.
+        data: the data the plan was evaluated on.
+        dataloader: the loader that loaded data, its fitted text vectorizers
+            are saved with the pipeline.
+        directory: the directory containing the artifacts of all plans.
+        ranking_score: the score used to select the best parameters.
+    """
+    from nlp4musa2020 import artifacts
+
+    name = os.path.splitext(os.path.basename(core.plan_path))[0]
+    params = artifacts.best_params(result, ranking_score=ranking_score)
+    LOGGER.info('Refitting plan %s with %s', core.plan_path, params)
+    pipeline = artifacts.refit(core.pipeline, params, data)
+    artifacts.save(
+        os.path.join(directory, name),
+        pipeline,
+        dataloader,
+        info={
+            'plan': core.plan_path,
+            'params': params,
+            'ranking_score': ranking_score,
+        },
+    )
+
+
+def run_group(cores, persist=None, ranking_score='f1_micro'):
+    """Loads the data of a group once and evaluates all plans on it.
+
+    Args:
+        cores: the cores sharing the same dataloader configuration.
+        persist: if set, the best pipeline of every plan is refitted on all
+            data and saved to this directory, see persist_plan.
+        ranking_score: the score used to select the best parameters.
+
+    Returns: the paths of the plans that failed.
+    """
+    dataloader = cores[0].dataloader
+    if dataloader.is_multiloader:
+        if persist is not None:
+            LOGGER.warning('Plans using a multiloader are not persisted.')
+        return [core.plan_path for core in cores if run_plan(core) is None]
+
+    LOGGER.info('Loading data for %d plan(s): %s', len(cores),
+                ', '.join(core.plan_path for core in cores))
+    try:
+        data = dataloader.load()
+    except Exception as e:
+        LOGGER.error('Error during data loading:')
+        LOGGER.exception(e)
+        return [core.plan_path for core in cores]
+
+    configuration = dataloader.configuration
+    configuration['class'] = dataloader.__class__.__name__
+    failed = []
+    for core in cores:
+        LOGGER.info('Running plan %s', core.plan_path)
+        plan_dataloader = core.dataloader
+        core.dataloader = PreloadedLoader(data, configuration)
+        try:
+            results = run_plan(core)
+        finally:
+            # Do not keep the data alive after the group is done.
+            core.dataloader = plan_dataloader
+
+        if results is None:
+            failed.append(core.plan_path)
+        elif persist is not None:
+            try:
+                persist_plan(core, results[0], data, dataloader, persist,
+                             ranking_score)
+            except Exception as e:
+                LOGGER.error('Could not persist plan %s:', core.plan_path)
+                LOGGER.exception(e)
+                failed.append(core.plan_path)
+
+    return failed
+
+
+def run_plans(paths,
+              dryrun=False,
+              mail=None,
+              n_jobs=None,
+              persist=None,
+              ranking_score='f1_micro'):
+    """Runs all plans found in paths, loading each distinct data once.
+
+    Args:
+        paths: plan files or directories containing plan files.
+        dryrun: if true, the results are not stored in the database.
+        mail: the mail notification level passed to the dbispipeline.
+        n_jobs: if set, overrides the n_jobs parameters of all plans.
+        persist: if set, the best pipelines are refitted and saved to this
+            directory, see run_group.
+        ranking_score: the score used to select the best parameters.
+
+    Returns: the paths of the plans that could not be loaded, run or
+        persisted.
+    """
+    cores = []
+    failed = []
+    for plan in find_plans(paths):
+        try:
+            core = Core(plan, dryrun=dryrun, mail=mail)
+        except Exception as e:
+            LOGGER.error('Could not load plan %s:', plan)
+            LOGGER.exception(e)
+            failed.append(plan)
+            continue
+
+        if n_jobs is not None:
+            limit_n_jobs(core, n_jobs)
+        cores.append(core)
+
+    groups = group_plans(cores)
+    LOGGER.info('Running %d plan(s) using %d distinct dataloader(s).',
+                len(cores), len(groups))
+    for group in groups.values():
+        failed.extend(
+            run_group(group, persist=persist, ranking_score=ranking_score))
+
+    if failed:
+        LOGGER.error('%d plan(s) failed: %s', len(failed), ', '.join(failed))
+    return failed
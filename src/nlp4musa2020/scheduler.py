@@ -0,0 +1,257 @@
+"""Runs plans concurrently on one node within a CPU budget.
+
+Plans sharing a dataloader configuration form one job which is run by the
+batch runner in its own process. Every job gets a fixed number of threads
+that is propagated to the n_jobs parameters of the plans, the BLAS/OpenMP
+thread pools and the TensorFlow thread pools. The jobs are started longest
+first based on their estimated runtime, using the runtimes of previous
+schedules if available. The cost heuristic of plans without a measured
+runtime is calibrated to seconds using the plans that have one.
+"""
+from collections import OrderedDict
+import json
+import os
+import subprocess
+import sys
+import time
+
+from dbispipeline.core import load_plan
+from dbispipeline.utils import LOGGER
+
+from .runner import find_plans
+from .runner import loader_key
+
+THREAD_VARIABLES = [
+    'OMP_NUM_THREADS',
+    'OPENBLAS_NUM_THREADS',
+    'MKL_NUM_THREADS',
+    'BLIS_NUM_THREADS',
+    'VECLIB_MAXIMUM_THREADS',
+    'NUMEXPR_NUM_THREADS',
+    'TF_NUM_INTRAOP_THREADS',
+]
+
+# Rough relative costs used if no runtime of a plan is known, unitless.
+MODEL_COSTS = {
+    'nn': 20.0,
+    'knn': 5.0,
+    'svr': 3.0,
+    'rf': 3.0,
+    'et': 2.0,
+}
+FEATURE_COSTS = {
+    'tfidf': 10.0,
+    'lda': 5.0,
+}
+
+
+class Job:
+    """A group of plans run together in one process."""
+
+    def __init__(self, plans, estimate):
+        """Initializes the job.
+
+        Args:
+            plans: the plan files of the job.
+            estimate: the estimated runtime, see estimate_runtimes.
+        """
+        self.plans = plans
+        self.estimate = estimate
+        self.process = None
+        self.start = None
+
+    def command(self, threads, dryrun, mail=None):
+        """Returns the command running the job."""
+        command = [
+            sys.executable,
+            '-m',
+            'nlp4musa2020.cli',
+            'run',
+            '--force',
+            '--n-jobs',
+            str(threads),
+        ]
+        if dryrun:
+            command.append('--dryrun')
+        if mail is not None:
+            command.extend(['--mail', mail])
+        return command + self.plans
+
+
+def thread_environment(threads):
+    """Returns the environment limiting all thread pools of a process.
+
+    Args:
+        threads: the number of threads the process may use.
+    """
+    env = dict(os.environ)
+    for variable in THREAD_VARIABLES:
+        env[variable] = str(threads)
+    # The inter-op pool runs independent operations in parallel.
+    env['TF_NUM_INTEROP_THREADS'] = '1'
+    return env
+
+
+def estimate_cost(plan):
+    """Estimates the relative cost of a plan from its model and features.
+
+    Args:
+        plan: the path of the plan file.
+    """
+    name = os.path.splitext(os.path.basename(plan))[0]
+    parts = name.split('_')
+    estimate = 1.0
+    for model, cost in MODEL_COSTS.items():
+        if model in parts or model in plan.split(os.sep):
+            estimate *= cost
+            break
+    for feature, cost in FEATURE_COSTS.items():
+        if feature in parts:
+            estimate *= cost
+
+    return estimate
+
+
+def estimate_runtimes(plans, history):
+    """Estimates the runtimes of plans in seconds.
+
+    Plans with a measured runtime use it. The costs of the other plans are
+    scaled by the ratio of measured runtimes to costs of the measured plans,
+    so that all estimates are comparable. Without any measured plan, the
+    costs are returned as they are, which are comparable among themselves.
+
+    Args:
+        plans: the paths of the plan files.
+        history: a dict mapping plan paths to previously measured runtimes.
+    """
+    costs = {plan: estimate_cost(plan) for plan in plans}
+    measured = [plan for plan in plans if plan in history]
+    scale = 1.0
+    if measured:
+        scale = (sum(history[plan] for plan in measured) /
+                 sum(costs[plan] for plan in measured))
+
+    return {
+        plan: history[plan] if plan in history else costs[plan] * scale
+        for plan in plans
+    }
+
+
+def create_jobs(paths, history):
+    """Groups the plans by dataloader configuration into jobs.
+
+    Args:
+        paths: plan files or directories containing plan files.
+        history: a dict mapping plan paths to previously measured runtimes.
+    """
+    groups = OrderedDict()
+    for plan in find_plans(paths):
+        try:
+            dataloader = load_plan(plan).dataloader
+        except Exception as e:
+            LOGGER.error('Could not load plan %s:', plan)
+            LOGGER.exception(e)
+            continue
+
+        if dataloader.is_multiloader:
+            key = plan
+        else:
+            key = loader_key(dataloader)
+        groups.setdefault(key, []).append(plan)
+
+    estimates = estimate_runtimes(
+        [plan for plans in groups.values() for plan in plans], history)
+    jobs = []
+    for plans in groups.values():
+        estimate = sum(estimates[plan] for plan in plans)
+        jobs.append(Job(plans, estimate))
+
+    # Longest processing time first.
+    return sorted(jobs, key=lambda job: job.estimate, reverse=True)
+
+
+def load_history(path):
+    """Loads the measured runtimes of previous schedules."""
+    if path is None or not os.path.isfile(path):
+        return {}
+
+    with open(path, 'r') as history_file:
+        return json.load(history_file)
+
+
+def store_history(path, history):
+    """Stores the measured runtimes."""
+    if path is None:
+        return
+
+    with open(path, 'w') as history_file:
+        json.dump(history, history_file, indent=2, sort_keys=True)
+
+
+def schedule(paths,
+             cpus=None,
+             threads_per_job=4,
+             history_path=None,
+             dryrun=False,
+             mail=None,
+             poll_interval=1.0):
+    """Runs the plans concurrently without oversubscribing the CPUs.
+
+    Args:
+        paths: plan files or directories containing plan files.
+        cpus: the number of CPUs to use. Defaults to all available CPUs.
+        threads_per_job: the number of threads every job may use.
+        history_path: a json file used to read and store measured runtimes.
+        dryrun: if true, the results are not stored in the database.
+        mail: the mail notification level passed to every job.
+        poll_interval: the number of seconds between checks for finished
+            jobs.
+
+    Returns: the number of failed jobs.
+    """
+    if cpus is None:
+        cpus = len(os.sched_getaffinity(0))
+    threads_per_job = max(1, min(threads_per_job, cpus))
+    slots = max(1, cpus // threads_per_job)
+
+    history = load_history(history_path)
+    pending = create_jobs(paths, history)
+    LOGGER.info('Scheduling %d job(s) on %d CPU(s), %d concurrently with %d '
+                'thread(s) each.', len(pending), cpus, slots, threads_per_job)
+
+    running = []
+    failed = 0
+    env = thread_environment(threads_per_job)
+    while pending or running:
+        while pending and len(running) < slots:
+            job = pending.pop(0)
+            LOGGER.info('Starting job (estimate %.1f): %s', job.estimate,
+                        ', '.join(job.plans))
+            job.start = time.perf_counter()
+            job.process = subprocess.Popen(
+                job.command(threads_per_job, dryrun, mail),
+                env=env,
+            )
+            running.append(job)
+
+        time.sleep(poll_interval)
+
+        for job in list(running):
+            if job.process.poll() is None:
+                continue
+
+            running.remove(job)
+            duration = time.perf_counter() - job.start
+            if job.process.returncode != 0:
+                failed += 1
+                LOGGER.error('Job failed with code %d: %s',
+                             job.process.returncode, ', '.join(job.plans))
+                continue
+
+            LOGGER.info('Finished job in %.1fs: %s', duration,
+                        ', '.join(job.plans))
+            for plan in job.plans:
+                history[plan] = duration / len(job.plans)
+            store_history(history_path, history)
+
+    return failed
@@ -0,0 +1,148 @@
+"""Scores streams of new tracks with a model persisted by artifacts.save.
+
+The input is read in chunks of json records containing the lyrics ('text')
+and the numeric features of the schema, see ALF200KLoader.input_columns.
+The chunks are featurized in a process pool, each worker loading the fitted
+text vectorizers once, while the main process predicts the featurized
+chunks in input order. At most two chunks per worker are in flight, hence
+the memory is bounded independent of the input size.
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import json
+import os
+import time
+
+from dbispipeline.utils import LOGGER
+import pandas as pd
+
+from . import artifacts
+
+_featurizer = None
+
+
+def _init_worker(directory, extract_lyrics_features):
+    """Loads the featurizing loader once per worker process."""
+    global _featurizer
+    _, _featurizer = artifacts.load_featurizer(
+        directory, extract_lyrics_features=extract_lyrics_features)
+
+
+def _featurize(records):
+    """Featurizes a chunk of records in a worker process."""
+    return _featurizer.transform(pd.DataFrame.from_records(records))
+
+
+def read_chunks(lines, chunk_size):
+    """Yields lists of json records parsed from the non-empty lines.
+
+    Args:
+        lines: an iterable of json lines, e.g. a file.
+        chunk_size: the number of records per chunk.
+    """
+    records = (json.loads(line) for line in lines if line.strip())
+    while True:
+        chunk = list(itertools.islice(records, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def featurized_chunks(directory,
+                      chunks,
+                      n_jobs=None,
+                      extract_lyrics_features=False):
+    """Yields the chunks together with their features in input order.
+
+    Args:
+        directory: the artifacts directory providing the featurization.
+        chunks: an iterable of lists of records.
+        n_jobs: the number of worker processes. If 1, the chunks are
+            featurized in the calling process. None means all CPUs.
+        extract_lyrics_features: if True, missing features of the lyrics
+            feature groups are computed, see ALF200KLoader.
+    """
+    if n_jobs is None or n_jobs < 0:
+        n_jobs = os.cpu_count()
+
+    if n_jobs == 1:
+        _init_worker(directory, extract_lyrics_features)
+        for chunk in chunks:
+            yield chunk, _featurize(chunk)
+        return
+
+    with ProcessPoolExecutor(n_jobs,
+                             initializer=_init_worker,
+                             initargs=(directory,
+                                       extract_lyrics_features)) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk, executor.submit(_featurize, chunk)))
+            if len(pending) >= 2 * n_jobs:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+
+        while pending:
+            chunk, future = pending.popleft()
+            yield chunk, future.result()
+
+
+def score(directory,
+          lines,
+          output,
+          chunk_size=1000,
+          n_jobs=None,
+          id_field='id',
+          extract_lyrics_features=False):
+    """Predicts json lines and writes one json line per prediction.
+
+    Every output record contains the value of the id_field of the input
+    record, or its position if it has none, and the 'prediction'. For
+    multiple target labels, e.g. the genres, the prediction is the list of
+    predicted labels.
+
+    Args:
+        directory: a directory created by artifacts.save.
+        lines: an iterable of json lines, e.g. a file.
+        output: a text file the predictions are written to.
+        chunk_size: the number of records featurized and predicted at once.
+        n_jobs: the number of featurizing worker processes.
+        id_field: the field identifying a record.
+        extract_lyrics_features: if True, missing features of the lyrics
+            feature groups are computed, see ALF200KLoader.
+
+    Returns: the number of scored records and the elapsed seconds.
+    """
+    schema, _, pipeline = artifacts.load(directory)
+
+    start = time.perf_counter()
+    predict_time = 0
+    position = 0
+    chunks = read_chunks(lines, chunk_size)
+    for chunk, x in featurized_chunks(
+            directory,
+            chunks,
+            n_jobs=n_jobs,
+            extract_lyrics_features=extract_lyrics_features):
+        predict_start = time.perf_counter()
+        predictions = artifacts.predict(schema, pipeline, x)
+        predict_time += time.perf_counter() - predict_start
+
+        for record, prediction in zip(chunk, predictions):
+            output.write(
+                json.dumps({
+                    id_field: record.get(id_field, position),
+                    'prediction': prediction,
+                }) + '\n')
+            position += 1
+
+        elapsed = time.perf_counter() - start
+        LOGGER.info('Scored %d records, %.1f records/s.', position,
+                    position / elapsed)
+
+    elapsed = time.perf_counter() - start
+    LOGGER.info(
+        'Scored %d records in %.2fs (%.1f records/s), %.2fs predicting.',
+        position, elapsed, position / max(elapsed, 1e-9), predict_time)
+    return position, elapsed
@@ -0,0 +1,422 @@
+"""HTTP server predicting the genres of lyrics with a persisted model.
+
+The server loads a directory created by artifacts.save once. Concurrent
+requests are coalesced into micro-batches: a batch is closed after
+max_batch_size records or max_delay seconds after its first record, and
+featurized and predicted at once in a worker thread while the event loop
+keeps accepting requests. Endpoints:
+
+    POST /predict  a json record or a list of json records containing the
+                   input columns of the ALF200KLoader, i.e. the lyrics
+                   ('text') and the numeric features. With
+                   extract_lyrics_features, the features computed from the
+                   lyrics may be omitted.
+                   Returns the prediction or the list of predictions.
+    GET /metrics   latency percentiles and throughput of the recent
+                   predictions.
+    GET /health    returns 'ok' once the model is loaded.
+
+Records are validated before they are queued, so an invalid record only
+fails its own request. Only the stdlib HTTP/1.1 subset needed by these
+endpoints is implemented, including keep-alive connections.
+"""
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+import json
+import time
+
+from dbispipeline.utils import LOGGER
+import numpy as np
+import pandas as pd
+
+from . import artifacts
+
+
+class Metrics:
+    """Records the latencies of the most recent predictions."""
+
+    def __init__(self, window=10_000):
+        """Initializes the metrics.
+
+        Args:
+            window: the number of recent requests the percentiles and the
+                throughput are computed on.
+        """
+        self.start = time.perf_counter()
+        self.requests = 0
+        self.records = 0
+        self.batches = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=window)
+        self.finished = deque(maxlen=window)
+        self.batch_sizes = deque(maxlen=window)
+
+    def add_batch(self, size):
+        """Records the size of a predicted batch."""
+        self.batches += 1
+        self.batch_sizes.append(size)
+
+    def add_request(self, records, latency):
+        """Records the latency of an answered request in seconds."""
+        self.requests += 1
+        self.records += records
+        self.latencies.append(latency)
+        self.finished.append(time.perf_counter())
+
+    def snapshot(self):
+        """Returns the metrics as a json serializable dict."""
+        snapshot = {
+            'uptime': time.perf_counter() - self.start,
+            'requests': self.requests,
+            'records': self.records,
+            'batches': self.batches,
+            'errors': self.errors,
+            'latency_p50_ms': None,
+            'latency_p99_ms': None,
+            'requests_per_second': None,
+            'mean_batch_size': None,
+        }
+        if self.latencies:
+            p50, p99 = np.percentile(self.latencies, [50, 99]) * 1000
+            snapshot['latency_p50_ms'] = p50
+            snapshot['latency_p99_ms'] = p99
+            # Idle time after the last request does not lower the rate.
+            duration = self.finished[-1] - self.finished[0]
+            if duration > 0:
+                snapshot['requests_per_second'] = (
+                    (len(self.finished) - 1) / duration)
+        if self.batch_sizes:
+            snapshot['mean_batch_size'] = float(np.mean(self.batch_sizes))
+
+        return snapshot
+
+
+class MicroBatcher:
+    """Coalesces concurrently predicted records into batches."""
+
+    def __init__(self,
+                 schema,
+                 dataloader,
+                 pipeline,
+                 metrics,
+                 max_batch_size=64,
+                 max_delay=0.005):
+        """Initializes the batcher.
+
+        Args:
+            schema: the schema returned by artifacts.load.
+            dataloader: the loader featurizing the records.
+            pipeline: the fitted pipeline.
+            metrics: the Metrics object counting the batches.
+            max_batch_size: the maximal number of records per batch.
+            max_delay: the maximal number of seconds the first record of a
+                batch waits for further records.
+        """
+        self.schema = schema
+        self.dataloader = dataloader
+        self.pipeline = pipeline
+        self.metrics = metrics
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.queue = asyncio.Queue()
+        self.executor = ThreadPoolExecutor(1)
+
+        self.fields = dataloader.input_columns()
+
+    def validate(self, record):
+        """Returns the record reduced to the input columns and its errors.
+
+        The lyrics have to be a string, all other fields numbers. Numeric
+        strings are converted.
+
+        Returns: a tuple (record, errors), where errors maps the invalid or
+            missing fields to a description and is empty for valid records.
+        """
+        if not isinstance(record, dict):
+            return None, {'record': 'Expected a json object.'}
+
+        valid = {}
+        errors = {}
+        for field in self.fields:
+            if field not in record:
+                errors[field] = 'Missing.'
+            elif field == 'text':
+                if isinstance(record[field], str):
+                    valid[field] = record[field]
+                else:
+                    errors[field] = 'Expected a string.'
+            else:
+                try:
+                    if isinstance(record[field], bool):
+                        raise TypeError()
+                    valid[field] = float(record[field])
+                except (TypeError, ValueError):
+                    errors[field] = 'Expected a number.'
+
+        return valid, errors
+
+    async def predict(self, records):
+        """Returns the predictions of the records once they are batched."""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for record in records:
+            future = loop.create_future()
+            await self.queue.put((record, future))
+            futures.append(future)
+
+        return await asyncio.gather(*futures)
+
+    def _predict_batch(self, records):
+        x = self.dataloader.transform(pd.DataFrame.from_records(records))
+        return artifacts.predict(self.schema, self.pipeline, x)
+
+    def _predict_records(self, records):
+        """Predicts a batch, record wise if the batch fails.
+
+        Returns: a list containing the prediction or the exception of every
+            record.
+        """
+        try:
+            return self._predict_batch(records)
+        except Exception as e:
+            if len(records) == 1:
+                LOGGER.exception(e)
+                return [e]
+
+        results = []
+        for record in records:
+            try:
+                results.extend(self._predict_batch([record]))
+            except Exception as e:
+                LOGGER.exception(e)
+                results.append(e)
+        return results
+
+    async def run(self):
+        """Predicts the queued records batch wise until cancelled.
+
+        Cancelling a get of the queue can drop a record it already took, see
+        asyncio.wait_for before Python 3.12. Hence, a get that is still
+        pending when a batch is closed is kept for the next batch.
+        """
+        loop = asyncio.get_running_loop()
+        getter = None
+        try:
+            while True:
+                if getter is None:
+                    getter = asyncio.ensure_future(self.queue.get())
+                batch = [await getter]
+                getter = None
+
+                deadline = loop.time() + self.max_delay
+                while len(batch) < self.max_batch_size:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                        continue
+                    except asyncio.QueueEmpty:
+                        pass
+
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    getter = asyncio.ensure_future(self.queue.get())
+                    done, _ = await asyncio.wait({getter}, timeout=timeout)
+                    if not done:
+                        break
+                    batch.append(getter.result())
+                    getter = None
+
+                await self._resolve(batch)
+        finally:
+            if getter is not None:
+                getter.cancel()
+
+    async def _resolve(self, batch):
+        """Predicts a batch and resolves the futures of its records."""
+        loop = asyncio.get_running_loop()
+        records = [record for record, _ in batch]
+        predictions = await loop.run_in_executor(self.executor,
+                                                 self._predict_records,
+                                                 records)
+
+        self.metrics.add_batch(len(batch))
+        for (_, future), prediction in zip(batch, predictions):
+            if future.done():
+                continue
+            if isinstance(prediction, Exception):
+                future.set_exception(prediction)
+            else:
+                future.set_result(prediction)
+
+
+class PredictionServer:
+    """Serves the predictions of a MicroBatcher over HTTP."""
+
+    def __init__(self, batcher, metrics, max_body_size=2**24):
+        """Initializes the server.
+
+        Args:
+            batcher: the MicroBatcher predicting the records.
+            metrics: the Metrics object recording the latencies.
+            max_body_size: the maximal size of a request body in bytes,
+                larger requests are rejected.
+        """
+        self.batcher = batcher
+        self.metrics = metrics
+        self.max_body_size = max_body_size
+
+    async def handle(self, reader, writer):
+        """Answers the requests of a connection until it is closed."""
+        try:
+            while True:
+                request = await _read_request(reader, self.max_body_size)
+                if request is None:
+                    break
+
+                method, path, headers, body = request
+                if body is None:
+                    # The body was not read, hence the connection is closed.
+                    status, response = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {
+                        'error': 'Request body too large.',
+                        'max_body_size': self.max_body_size,
+                    }
+                    keep_alive = False
+                else:
+                    status, response = await self.respond(method, path, body)
+                    keep_alive = headers.get('connection', '') != 'close'
+                _write_response(writer, status, response, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, method, path, body):
+        """Returns the status and the json response of a request."""
+        if path == '/health' and method == 'GET':
+            return HTTPStatus.OK, 'ok'
+        if path == '/metrics' and method == 'GET':
+            return HTTPStatus.OK, self.metrics.snapshot()
+        if path != '/predict':
+            return HTTPStatus.NOT_FOUND, {'error': 'Unknown path.'}
+        if method != 'POST':
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': 'Use POST.'}
+
+        start = time.perf_counter()
+        try:
+            records = json.loads(body)
+        except ValueError:
+            return HTTPStatus.BAD_REQUEST, {'error': 'Invalid json.'}
+
+        single = not isinstance(records, list)
+        if single:
+            records = [records]
+        for i, record in enumerate(records):
+            records[i], errors = self.batcher.validate(record)
+            if errors:
+                return HTTPStatus.BAD_REQUEST, {
+                    'error': 'Invalid record.',
+                    'record': i,
+                    'fields': errors,
+                }
+
+        try:
+            predictions = await self.batcher.predict(records)
+        except Exception as e:
+            self.metrics.errors += 1
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)}
+
+        self.metrics.add_request(len(records), time.perf_counter() - start)
+        return HTTPStatus.OK, predictions[0] if single else predictions
+
+
+async def _read_request(reader, max_body_size):
+    """Returns method, path, headers and body or None if closed.
+
+    The body is None if it is larger than max_body_size and was not read.
+    """
+    line = await reader.readline()
+    if not line:
+        return None
+
+    method, path, _ = line.decode('latin-1').split(' ', 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, value = line.decode('latin-1').split(':', 1)
+        headers[name.strip().lower()] = value.strip().lower()
+
+    body = b''
+    if 'content-length' in headers:
+        length = int(headers['content-length'])
+        if length < 0:
+            raise ValueError(f'Invalid Content-Length: {length}')
+        if length > max_body_size:
+            return method, path, headers, None
+        body = await reader.readexactly(length)
+
+    return method, path, headers, body
+
+
+def _write_response(writer, status, response, keep_alive):
+    body = json.dumps(response).encode()
+    writer.write((f'HTTP/1.1 {status.value} {status.phrase}\r\n'
+                  'Content-Type: application/json\r\n'
+                  f'Content-Length: {len(body)}\r\n'
+                  f'Connection: {"keep-alive" if keep_alive else "close"}\r\n'
+                  '\r\n').encode('latin-1') + body)
+
+
+async def serve_forever(directory,
+                        host='127.0.0.1',
+                        port=8000,
+                        max_batch_size=64,
+                        max_delay=0.005,
+                        max_body_size=2**24,
+                        extract_lyrics_features=False):
+    """Loads the artifacts and serves predictions until cancelled.
+
+    Args:
+        directory: a directory created by artifacts.save.
+        host: the interface to listen on.
+        port: the port to listen on.
+        max_batch_size: the maximal number of records per batch.
+        max_delay: the maximal number of seconds a batch waits for records.
+        max_body_size: the maximal size of a request body in bytes.
+        extract_lyrics_features: if True, missing features of the lyrics
+            feature groups are computed, see ALF200KLoader.
+    """
+    schema, dataloader, pipeline = artifacts.load(
+        directory, extract_lyrics_features=extract_lyrics_features)
+    metrics = Metrics()
+    batcher = MicroBatcher(schema,
+                           dataloader,
+                           pipeline,
+                           metrics,
+                           max_batch_size=max_batch_size,
+                           max_delay=max_delay)
+    server = PredictionServer(batcher, metrics, max_body_size=max_body_size)
+
+    batching = asyncio.ensure_future(batcher.run())
+    tcp_server = await asyncio.start_server(server.handle, host, port)
+    LOGGER.info('Serving %s on http://%s:%d', directory, host, port)
+    try:
+        async with tcp_server:
+            await tcp_server.serve_forever()
+    finally:
+        batching.cancel()
+        batcher.executor.shutdown()
+
+
+def serve(directory, **kwargs):
+    """Runs serve_forever until interrupted, see serve_forever."""
+    try:
+        asyncio.run(serve_forever(directory, **kwargs))
+    except KeyboardInterrupt:
+        pass
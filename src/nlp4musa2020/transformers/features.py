@@ -0,0 +1,44 @@
+"""Transformers selecting numeric features of the ALF200k dataset."""
+from sklearn.base import BaseEstimator
+from sklearn.base import TransformerMixin
+
+from ..dataloaders.alf200k import ALF200KLoader
+
+
+class FeatureGroupSelector(BaseEstimator, TransformerMixin):
+    """Selects feature groups from a dataframe loaded by ALF200KLoader.
+
+    Use it together with the text blocks in a FeatureUnion if the loader was
+    created with include_text=True.
+    """
+
+    def __init__(self, groups=None, features=None, dtype='float64'):
+        """Initializes the selector.
+
+        Args:
+            groups: the feature groups to select, see
+                ALF200KLoader.feature_groups.
+            features: if set, the groups are ignored and these features are
+                selected.
+            dtype: the dtype of the selected features.
+        """
+        self.groups = groups
+        self.features = features
+        self.dtype = dtype
+
+    def _columns(self):
+        if self.features is not None:
+            return list(self.features)
+
+        columns = []
+        for group in self.groups:
+            columns.extend(ALF200KLoader.feature_groups[group])
+        return columns
+
+    def fit(self, X, y=None):  # noqa: N803
+        """Nothing to fit, the selection is stateless."""
+        return self
+
+    def transform(self, X):  # noqa: N803
+        """Returns the selected features as an array."""
+        return X[self._columns()].to_numpy(dtype=self.dtype)
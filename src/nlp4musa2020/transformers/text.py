@@ -0,0 +1,120 @@
+"""Fold-aware text transformers for the lyrics of the ALF200k dataset.
+
+In contrast to the text vectorizers of the ALF200KLoader, these transformers
+are fitted inside the pipeline and hence only on the training folds. The
+fitted vectorizers and the transformed training texts are cached on disk
+using joblib, keyed by the vectorizer parameters and the texts. Thus, folds
+of different grid points and plans sharing a vectorizer configuration reuse
+the fitted text features.
+"""
+import abc
+
+from sklearn.base import BaseEstimator
+from sklearn.base import TransformerMixin
+from sklearn.utils.validation import check_memory
+
+from ..dataloaders import vectorizer
+
+
+def _fit_vectorizer(text_vectorizer, texts):
+    """Fits the vectorizer and returns it with the transformed texts."""
+    transformed = text_vectorizer.fit_transform(texts)
+    return text_vectorizer, transformed
+
+
+class TextBlock(BaseEstimator, TransformerMixin, abc.ABC):
+    """Base class of transformers vectorizing a text column."""
+
+    @abc.abstractmethod
+    def _vectorizer(self):
+        """Returns the unfitted vectorizer used by this block."""
+
+    def _fit(self, X):  # noqa: N803
+        memory = check_memory(self.memory)
+        fit_vectorizer = memory.cache(_fit_vectorizer)
+        self.vectorizer_, transformed = fit_vectorizer(
+            self._vectorizer(),
+            X[self.column],
+        )
+        return transformed
+
+    def fit(self, X, y=None):  # noqa: N803
+        """Fits the vectorizer on the text column of X."""
+        self._fit(X)
+        return self
+
+    def fit_transform(self, X, y=None):  # noqa: N803
+        """Fits the vectorizer and returns the vectorized texts."""
+        return self._fit(X)
+
+    def transform(self, X):  # noqa: N803
+        """Vectorizes the text column of X with the fitted vectorizer."""
+        return self.vectorizer_.transform(X[self.column])
+
+
+class TfidfBlock(TextBlock):
+    """Tf-idf vectorizes the lyrics, see vectorizer.tfidf_word."""
+
+    def __init__(self,
+                 analyzer='word',
+                 max_features=2_000,
+                 dtype='float64',
+                 column='text',
+                 memory=None):
+        """Initializes the block.
+
+        Args:
+            analyzer: either 'word' or 'char'.
+            max_features: number of features to consider.
+            dtype: the dtype of the resulting matrix.
+            column: the column containing the texts.
+            memory: a joblib Memory object or a path used to cache the fitted
+                vectorizer. If None, nothing is cached.
+        """
+        self.analyzer = analyzer
+        self.max_features = max_features
+        self.dtype = dtype
+        self.column = column
+        self.memory = memory
+
+    def _vectorizer(self):
+        if self.analyzer == 'word':
+            return vectorizer.tfidf_word(self.max_features, dtype=self.dtype)
+        return vectorizer.tfidf_char(self.max_features, dtype=self.dtype)
+
+
+class LDABlock(TextBlock):
+    """Computes the LDA topic distributions of the lyrics."""
+
+    def __init__(self,
+                 n_components=25,
+                 max_features=None,
+                 dtype='float64',
+                 column='text',
+                 memory=None,
+                 random_state=None):
+        """Initializes the block.
+
+        Args:
+            n_components: the number of topics.
+            max_features: the number of most frequent words to consider.
+            dtype: the dtype of the resulting matrix.
+            column: the column containing the texts.
+            memory: a joblib Memory object or a path used to cache the fitted
+                vectorizer. If None, nothing is cached.
+            random_state: the seed of the topic model.
+        """
+        self.n_components = n_components
+        self.max_features = max_features
+        self.dtype = dtype
+        self.column = column
+        self.memory = memory
+        self.random_state = random_state
+
+    def _vectorizer(self):
+        return vectorizer.LDAVectorizer(
+            dtype=self.dtype,
+            n_components=self.n_components,
+            max_features=self.max_features,
+            random_state=self.random_state,
+        )
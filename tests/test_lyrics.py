@@ -0,0 +1,50 @@
+"""Tests of the features extracted from the lyrics."""
+import os
+import unicodedata
+import unittest
+
+import pandas as pd
+
+from nlp4musa2020.dataloaders.alf200k import ALF200KLoader
+from nlp4musa2020.dataloaders.alf200k import lyrics_extractors
+from nlp4musa2020.lyrics import parity
+from nlp4musa2020.lyrics.tokens import TokenizedLyrics
+
+# Lyrics with their feature values, either checked by hand or written from
+# the dataset by tools/check_lyrics.py --save-sample. Only the features
+# contained in the sample are compared.
+SAMPLE = os.path.join(os.path.dirname(__file__), 'data',
+                      'lyrics_sample.jsonl')
+
+# The maximal mean absolute difference relative to the mean absolute value.
+TOLERANCE = 0.05
+
+
+class TokenizedLyricsTest(unittest.TestCase):
+
+    def test_unicode_words(self):
+        tokenized = TokenizedLyrics(['Ünïcödé naïve café', "l'été, 日本語"])
+        self.assertEqual(tokenized.vocabulary,
+                         ['ünïcödé', 'naïve', 'café', "l'été", '日本語'])
+
+    def test_decomposed_accents(self):
+        tokenized = TokenizedLyrics(['café'])
+        self.assertEqual(tokenized.vocabulary, ['café'])
+
+
+class ParityTest(unittest.TestCase):
+
+    def test_sample(self):
+        sample = pd.read_json(SAMPLE, lines=True)
+        for group, extractor in lyrics_extractors().items():
+            features = ALF200KLoader.feature_groups[group]
+            columns = [column for column in features if column in sample]
+            if not columns:
+                continue
+            extracted = pd.DataFrame(extractor.transform(sample['text']),
+                                     columns=features,
+                                     index=sample.index)
+            comparison = parity.compare(sample[columns], extracted[columns])
+            for feature, relative_mae in comparison['relative_mae'].items():
+                with self.subTest(feature=feature):
+                    self.assertLessEqual(relative_mae, TOLERANCE)
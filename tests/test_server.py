@@ -0,0 +1,66 @@
+"""Tests of the micro-batching of the prediction server."""
+import asyncio
+import unittest
+
+import numpy as np
+from sklearn.dummy import DummyClassifier
+
+from nlp4musa2020.dataloaders.alf200k import ALF200KLoader
+from nlp4musa2020.server import Metrics
+from nlp4musa2020.server import MicroBatcher
+
+
+def _batcher(max_batch_size=64, max_delay=0.001):
+    """Returns a batcher predicting the constant 1 for feature 'a'."""
+    dataloader = ALF200KLoader(path=None, features=['a'], target='y')
+    pipeline = DummyClassifier(strategy='constant', constant=1)
+    pipeline.fit(np.zeros((2, 1)), [0, 1])
+    schema = {'target': 'y', 'include_text': False}
+    return MicroBatcher(schema,
+                        dataloader,
+                        pipeline,
+                        Metrics(),
+                        max_batch_size=max_batch_size,
+                        max_delay=max_delay)
+
+
+class MicroBatcherTest(unittest.TestCase):
+
+    def test_put_at_batch_deadline(self):
+        """Records queued when a batch times out are predicted."""
+
+        async def run():
+            batcher = _batcher()
+            loop = asyncio.get_running_loop()
+            running = asyncio.ensure_future(batcher.run())
+            futures = []
+            for i in range(50):
+                first = asyncio.ensure_future(batcher.predict([{'a': 1.}]))
+                await asyncio.sleep(0)
+                # Around the deadline of the batch of the first record.
+                when = loop.time() + batcher.max_delay + (i % 5 - 2) * 1e-5
+                future = loop.create_future()
+                loop.call_at(when, batcher.queue.put_nowait,
+                             ({'a': 2.}, future))
+                futures.append(future)
+                await first
+            predictions = await asyncio.wait_for(asyncio.gather(*futures), 5)
+            running.cancel()
+            return predictions
+
+        self.assertEqual(asyncio.run(run()), [1] * 50)
+
+    def test_batches(self):
+        """Concurrent records are predicted together in full batches."""
+
+        async def run():
+            batcher = _batcher(max_batch_size=4, max_delay=1)
+            running = asyncio.ensure_future(batcher.run())
+            records = [{'a': float(i)} for i in range(10)]
+            predictions = await asyncio.wait_for(batcher.predict(records), 5)
+            running.cancel()
+            return predictions, batcher.metrics
+
+        predictions, metrics = asyncio.run(run())
+        self.assertEqual(predictions, [1] * 10)
+        self.assertEqual(metrics.batches, 3)
@@ -0,0 +1,143 @@
+"""Benchmarks recall and query time of the approximate KNN classifier.
+
+The dataset is loaded like in the genre_knn_rsste_a_lda_tfidf plan and
+standardized. The exact neighbors of the test points are searched with the
+ball_tree of the KNeighborsClassifier, followed by the approximate
+classifier searching an increasing number of trees. The recall is the
+fraction of exact neighbors that was found.
+"""
+import argparse
+import os.path
+import time
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.preprocessing import StandardScaler
+
+from nlp4musa2020.dataloaders import vectorizer
+from nlp4musa2020.dataloaders.alf200k import ALF200KLoader
+from nlp4musa2020.dataloaders.alf200k import genre_target_labels
+from nlp4musa2020.models.neighbors import ApproximateKNeighborsClassifier
+
+
+def load():
+    """Returns the standardized train and test data."""
+    dataloader = ALF200KLoader(
+        path=args.dataset,
+        load_feature_groups=[
+            "rhymes",
+            "statistical",
+            "statistical_time",
+            "explicitness",
+            "audio",
+        ],
+        text_vectorizers=vectorizer.lda() + vectorizer.tfidf(),
+        target=genre_target_labels(),
+    )
+    x, y = dataloader.load()
+    x_train, x_test, y_train, _ = train_test_split(x,
+                                                   y,
+                                                   test_size=args.test_size,
+                                                   random_state=42)
+    scaler = StandardScaler().fit(x_train)
+    return scaler.transform(x_train), scaler.transform(x_test), y_train
+
+
+def recall(exact, approximate):
+    """Returns the fraction of exact neighbors found."""
+    found = [
+        len(np.intersect1d(e, a, assume_unique=True))
+        for e, a in zip(exact, approximate)
+    ]
+    return np.sum(found) / exact.size
+
+
+def main():
+    x_train, x_test, y_train = load()
+    print(f"train {x_train.shape}, test {x_test.shape}")
+
+    for p in args.p:
+        exact = KNeighborsClassifier(n_neighbors=args.n_neighbors,
+                                     p=p,
+                                     algorithm="ball_tree",
+                                     n_jobs=-1)
+        start = time.perf_counter()
+        exact.fit(x_train, y_train)
+        build = time.perf_counter() - start
+        start = time.perf_counter()
+        exact_indices = exact.kneighbors(x_test, return_distance=False)
+        query = time.perf_counter() - start
+        print(f"p={p} ball_tree: build {build:.2f}s, query {query:.2f}s")
+
+        index_path = None
+        if args.index is not None:
+            index_path = f"{args.index}-p{p}.joblib"
+        if index_path is not None and os.path.isfile(index_path):
+            start = time.perf_counter()
+            approximate = ApproximateKNeighborsClassifier.load(index_path)
+            print(f"p={p} loaded index in {time.perf_counter() - start:.2f}s")
+        else:
+            approximate = ApproximateKNeighborsClassifier(
+                n_neighbors=args.n_neighbors,
+                p=p,
+                n_trees=max(args.search_trees),
+                leaf_size=args.leaf_size,
+                n_jobs=-1,
+                random_state=42,
+            )
+            start = time.perf_counter()
+            approximate.fit(x_train, y_train)
+            print(f"p={p} built index in {time.perf_counter() - start:.2f}s")
+            if index_path is not None:
+                approximate.save(index_path)
+
+        for search_trees in args.search_trees:
+            approximate.set_params(search_trees=search_trees)
+            start = time.perf_counter()
+            indices = approximate.kneighbors(x_test, return_distance=False)
+            query = time.perf_counter() - start
+            print(f"p={p} trees={search_trees}: query {query:.2f}s, "
+                  f"recall {recall(exact_indices, indices):.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset",
+                        dest="dataset",
+                        default="data/processed/dataset-lfm-genres.pickle",
+                        help="The path to the dataset pickle or store.")
+    parser.add_argument("--test-size",
+                        dest="test_size",
+                        type=float,
+                        default=0.2,
+                        help="The fraction of the data used as queries.")
+    parser.add_argument("--n-neighbors",
+                        dest="n_neighbors",
+                        type=int,
+                        default=10,
+                        help="The number of neighbors to search.")
+    parser.add_argument("--p",
+                        dest="p",
+                        type=int,
+                        nargs="+",
+                        default=[1, 2],
+                        help="The minkowski powers to benchmark.")
+    parser.add_argument("--search-trees",
+                        dest="search_trees",
+                        type=int,
+                        nargs="+",
+                        default=[1, 2, 5, 10, 20],
+                        help="The numbers of trees searched per query.")
+    parser.add_argument("--leaf-size",
+                        dest="leaf_size",
+                        type=int,
+                        default=64,
+                        help="The maximal number of points in a leaf.")
+    parser.add_argument("--index",
+                        dest="index",
+                        default=None,
+                        help="Path prefix used to store and reuse indexes.")
+    args = parser.parse_args()
+
+    main()
@@ -0,0 +1,117 @@
+"""Benchmarks memory and fit time of float32 against float64 features.
+
+For each dtype the dataset is loaded like in the *_rsste_a_lda_tfidf plans
+and one model of the rf, knn and nn plan families is fitted on a single
+train/test split. The peak memory is measured with tracemalloc and therefore
+only covers allocations made by python and numpy (not TensorFlow).
+"""
+import argparse
+import time
+import tracemalloc
+
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from nlp4musa2020.dataloaders import vectorizer
+from nlp4musa2020.dataloaders.alf200k import ALF200KLoader
+from nlp4musa2020.dataloaders.alf200k import genre_target_labels
+
+
+def models():
+    """Returns the models of the benchmarked plan families."""
+    result = {
+        "rf": RandomForestClassifier(n_estimators=100, n_jobs=-1),
+        "knn": KNeighborsClassifier(n_neighbors=5,
+                                    weights="distance",
+                                    n_jobs=-1,
+                                    algorithm="ball_tree"),
+    }
+    if not args.skip_nn:
+        from nlp4musa2020.models.simplenn_genre import SimpleGenreNN
+        result["nn"] = SimpleGenreNN(epochs=args.epochs,
+                                     batch_size=args.batch_size,
+                                     dense_sizes=(64, 64))
+
+    return result
+
+
+def measure(function):
+    """Returns the result, runtime and peak memory of calling function."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function()
+    duration = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, duration, peak
+
+
+def benchmark(dtype):
+    """Runs the benchmark for a single dtype."""
+    dataloader = ALF200KLoader(
+        path=args.dataset,
+        load_feature_groups=[
+            "rhymes",
+            "statistical",
+            "statistical_time",
+            "explicitness",
+            "audio",
+        ],
+        text_vectorizers=vectorizer.lda(dtype=dtype) +
+        vectorizer.tfidf(dtype=dtype),
+        target=genre_target_labels(),
+        dtype=dtype,
+    )
+    (x, y), duration, peak = measure(dataloader.load)
+    print(f"{dtype} load: {duration:.2f}s, peak {peak / 2**20:.1f} MiB, "
+          f"features {x.nbytes / 2**20:.1f} MiB")
+
+    x_train, x_test, y_train, y_test = train_test_split(x,
+                                                        y,
+                                                        test_size=0.2,
+                                                        random_state=42)
+    for name, model in models().items():
+        pipeline = Pipeline([
+            ("scaler", StandardScaler()),
+            ("model", model),
+        ])
+        _, duration, peak = measure(lambda: pipeline.fit(x_train, y_train))
+        print(f"{dtype} {name} fit: {duration:.2f}s, "
+              f"peak {peak / 2**20:.1f} MiB")
+        _, duration, peak = measure(lambda: pipeline.predict(x_test))
+        print(f"{dtype} {name} predict: {duration:.2f}s, "
+              f"peak {peak / 2**20:.1f} MiB")
+
+
+def main():
+    for dtype in ["float64", "float32"]:
+        benchmark(dtype)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset",
+                        dest="dataset",
+                        default="data/processed/dataset-lfm-genres.pickle",
+                        help="The path to the dataset pickle or store.")
+    parser.add_argument("--epochs",
+                        dest="epochs",
+                        type=int,
+                        default=1,
+                        help="The number of epochs used for the nn model.")
+    parser.add_argument("--batch-size",
+                        dest="batch_size",
+                        type=int,
+                        default=32,
+                        help="The batch size used for the nn model.")
+    parser.add_argument("--skip-nn",
+                        dest="skip_nn",
+                        action="store_true",
+                        help="Skip the nn model, e.g. without TensorFlow.")
+    args = parser.parse_args()
+
+    main()
@@ -0,0 +1,78 @@
+"""Benchmarks the throughput of the lyrics feature extraction.
+
+The lyrics of the dataset are repeated until --n-texts lyrics (200k by
+default, about the size of ALF200k) are reached and the features of a
+feature group are extracted with an increasing number of processes. The
+results of all runs are compared to the first one.
+"""
+import argparse
+import itertools
+import pickle
+import time
+
+import numpy as np
+
+from nlp4musa2020.dataloaders import store
+from nlp4musa2020.dataloaders.alf200k import lyrics_extractors
+
+
+def read_texts(path):
+    """Returns the lyrics of a dataset pickle or store."""
+    if store.is_store(path):
+        return list(store.read_store(path, columns=["text"])["text"])
+
+    return list(pickle.load(open(path, "rb"))["text"])
+
+
+def main():
+    texts = read_texts(args.dataset)
+    texts = list(itertools.islice(itertools.cycle(texts), args.n_texts))
+    characters = sum(len(text) for text in texts if isinstance(text, str))
+    print(f"{len(texts)} lyrics, {characters / 1e6:.1f}M characters")
+
+    expected = None
+    for n_jobs in args.n_jobs:
+        extractor = lyrics_extractors()[args.group].set_params(
+            shard_size=args.shard_size, n_jobs=n_jobs)
+        start = time.perf_counter()
+        features = extractor.transform(texts)
+        duration = time.perf_counter() - start
+
+        if expected is None:
+            expected = features
+        same = np.array_equal(features, expected)
+        print(f"n_jobs={n_jobs}: {duration:.2f}s, "
+              f"{len(texts) / duration:.0f} lyrics/s, "
+              f"{'identical' if same else 'DIFFERENT'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--group",
+                        dest="group",
+                        choices=["statistical", "rhymes"],
+                        default="statistical",
+                        help="The feature group to extract.")
+    parser.add_argument("--dataset",
+                        dest="dataset",
+                        default="data/processed/dataset-lfm-genres.pickle",
+                        help="The path to the dataset pickle or store.")
+    parser.add_argument("--n-texts",
+                        dest="n_texts",
+                        type=int,
+                        default=200_000,
+                        help="The number of lyrics to extract.")
+    parser.add_argument("--n-jobs",
+                        dest="n_jobs",
+                        type=int,
+                        nargs="+",
+                        default=[1, 2, 4, -1],
+                        help="The numbers of processes to benchmark.")
+    parser.add_argument("--shard-size",
+                        dest="shard_size",
+                        type=int,
+                        default=10_000,
+                        help="The number of lyrics per shard.")
+    args = parser.parse_args()
+
+    main()
@@ -0,0 +1,110 @@
+"""Benchmarks the import time of the package modules and the plans.
+
+Every module and plan is imported in a fresh interpreter, so the measured
+time includes all (transitive) imports. It also reports whether TensorFlow
+was loaded, which should only happen once a Keras model is fitted.
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+from nlp4musa2020.runner import find_plans
+
+MODULES = [
+    "nlp4musa2020",
+    "nlp4musa2020.cli",
+    "nlp4musa2020.dataloaders.alf200k",
+    "nlp4musa2020.dataloaders.vectorizer",
+    "nlp4musa2020.evaluators",
+    "nlp4musa2020.lyrics.rhymes",
+    "nlp4musa2020.lyrics.statistical",
+    "nlp4musa2020.models.linear",
+    "nlp4musa2020.models.neighbors",
+    "nlp4musa2020.models.simplenn",
+    "nlp4musa2020.models.simplenn_genre",
+    "nlp4musa2020.runner",
+    "nlp4musa2020.scheduler",
+    "nlp4musa2020.scoring",
+    "nlp4musa2020.server",
+]
+
+MEASURE = """
+import json
+import sys
+import time
+start = time.perf_counter()
+{statement}
+duration = time.perf_counter() - start
+print(json.dumps([duration, "tensorflow" in sys.modules]))
+"""
+
+
+def measure(statement):
+    """Returns the best time and whether TensorFlow was loaded."""
+    durations = []
+    for _ in range(args.repeat):
+        output = subprocess.run(
+            [sys.executable, "-c",
+             MEASURE.format(statement=statement)],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        duration, tensorflow = json.loads(output.strip().splitlines()[-1])
+        durations.append(duration)
+
+    return min(durations), tensorflow
+
+
+def report(name, statement):
+    """Measures a statement and prints the result."""
+    try:
+        duration, tensorflow = measure(statement)
+    except subprocess.CalledProcessError as e:
+        print(f"{'failed':>8} {name}: {e.stderr.strip().splitlines()[-1]}")
+        return False
+
+    flags = []
+    if duration > args.threshold:
+        flags.append("slow")
+    if tensorflow:
+        flags.append("tensorflow")
+    print(f"{duration:7.3f}s {name} {' '.join(flags)}")
+    return duration <= args.threshold
+
+
+def main():
+    fast = True
+    print("Modules:")
+    for module in MODULES:
+        fast &= report(module, f"import {module}")
+
+    print("Plans:")
+    for plan in find_plans(args.plans):
+        fast &= report(
+            plan, "from dbispipeline.core import load_plan\n"
+            f"load_plan({plan!r})")
+
+    sys.exit(0 if fast else 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("plans",
+                        nargs="*",
+                        default=["plans"],
+                        help="Plan files or directories containing plans.")
+    parser.add_argument("--repeat",
+                        dest="repeat",
+                        type=int,
+                        default=3,
+                        help="The number of measurements per import.")
+    parser.add_argument("--threshold",
+                        dest="threshold",
+                        type=float,
+                        default=1.0,
+                        help="The import time in seconds considered slow.")
+    args = parser.parse_args()
+
+    main()
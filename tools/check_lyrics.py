@@ -0,0 +1,108 @@
+"""Compares the features extracted from the lyrics with the dataset columns.
+
+The statistical and rhyme features of the dataset were computed by the
+ALF200k authors. This script extracts a feature group from the lyrics of the
+dataset with nlp4musa2020.lyrics and reports per feature the Pearson and
+Spearman correlation, the mean absolute difference, the mean absolute
+difference relative to the mean absolute dataset value and the fraction of
+(nearly) equal values. It exits with a non-zero status if a correlation is
+below --min-correlation or a relative difference exceeds --tolerance, i.e.
+if the extracted features cannot replace the dataset columns, see the
+extract_lyrics_features option of the ALF200KLoader.
+"""
+import argparse
+import pickle
+import sys
+
+import pandas as pd
+
+from nlp4musa2020.dataloaders import store
+from nlp4musa2020.dataloaders.alf200k import ALF200KLoader
+from nlp4musa2020.dataloaders.alf200k import lyrics_extractors
+from nlp4musa2020.lyrics import parity
+
+
+def read_dataset(path, features):
+    """Returns the lyrics and the given features of the dataset."""
+    columns = features + ["text"]
+    if store.is_store(path):
+        return store.read_store(path, columns=columns)
+
+    df = pickle.load(open(path, "rb"))
+    return df.drop_duplicates(["name", "artist_name"])[columns]
+
+
+def main():
+    features = ALF200KLoader.feature_groups[args.group]
+    df = read_dataset(args.dataset, features)
+    if args.n_texts is not None:
+        df = df.sample(min(args.n_texts, len(df)), random_state=42)
+    if args.save_sample is not None:
+        # E.g. to refresh tests/data/lyrics_sample.jsonl.
+        df.to_json(args.save_sample, orient="records", lines=True,
+                   force_ascii=False)
+    extractor = lyrics_extractors()[args.group].set_params(n_jobs=args.n_jobs)
+    extracted = pd.DataFrame(extractor.transform(df["text"]),
+                             columns=features,
+                             index=df.index)
+    comparison = parity.compare(df[features], extracted)
+
+    print(f"{len(df)} lyrics")
+    print(f"{'feature':<26}{'pearson':>9}{'spearman':>9}{'mae':>11}"
+          f"{'rel_mae':>9}{'equal':>8}")
+    passed = True
+    for feature, row in comparison.iterrows():
+        # Constant columns have no correlation, reported as nan.
+        constant = (df[feature].nunique() <= 1 and
+                    extracted[feature].nunique() <= 1)
+        flag = ""
+        if (not (row["pearson"] >= args.min_correlation or constant) or
+                not row["relative_mae"] <= args.tolerance):
+            flag = " <"
+            passed = False
+        print(f"{feature:<26}{row['pearson']:9.3f}{row['spearman']:9.3f}"
+              f"{row['mae']:11.4g}{row['relative_mae']:9.3f}"
+              f"{row['equal']:8.1%}{flag}")
+
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--group",
+                        dest="group",
+                        choices=["statistical", "rhymes"],
+                        default="statistical",
+                        help="The feature group to check.")
+    parser.add_argument("--dataset",
+                        dest="dataset",
+                        default="data/processed/dataset-lfm-genres.pickle",
+                        help="The path to the dataset pickle or store.")
+    parser.add_argument("--n-texts",
+                        dest="n_texts",
+                        type=int,
+                        default=None,
+                        help="Checks a random sample of this many lyrics.")
+    parser.add_argument("--n-jobs",
+                        dest="n_jobs",
+                        type=int,
+                        default=-1,
+                        help="The number of extracting processes.")
+    parser.add_argument("--min-correlation",
+                        dest="min_correlation",
+                        type=float,
+                        default=0.9,
+                        help="The minimal Pearson correlation per feature.")
+    parser.add_argument("--tolerance",
+                        dest="tolerance",
+                        type=float,
+                        default=0.05,
+                        help="The maximal mean absolute difference per "
+                        "feature relative to its mean absolute value.")
+    parser.add_argument("--save-sample",
+                        dest="save_sample",
+                        default=None,
+                        help="Writes the checked rows as json lines.")
+    args = parser.parse_args()
+
+    main()
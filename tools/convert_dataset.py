@@ -0,0 +1,33 @@
+"""Converts the pickled LFM dataset into a columnar dataset store."""
+import argparse
+import pickle
+
+from nlp4musa2020.dataloaders.alf200k import ALF200KLoader
+from nlp4musa2020.dataloaders.store import write_store
+
+
+def main():
+    """Writes the store including the feature group blocks."""
+    with open(args.input, "rb") as f:
+        df = pickle.load(f)
+
+    write_store(df, args.output, feature_groups=ALF200KLoader.feature_groups)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--input",
+        dest="input",
+        required=True,
+        help="The path to the pickled LFM dataset with genres.",
+    )
+    parser.add_argument(
+        "--output",
+        dest="output",
+        required=True,
+        help="The directory used to store the dataset.",
+    )
+    args = parser.parse_args()
+
+    main()
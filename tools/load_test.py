@@ -0,0 +1,115 @@
+"""Load tests a running prediction server (nlp4musa2020 serve).
+
+Concurrent clients send the records of a JSONL file, one record per
+request, over keep-alive connections to POST /predict. The client side
+latency percentiles and throughput are printed together with the metrics
+reported by the server, including the mean micro-batch size.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+
+import numpy as np
+
+
+async def request(reader, writer, method, path, body=b""):
+    """Sends a request and returns the status and the decoded response."""
+    writer.write((f"{method} {path} HTTP/1.1\r\n"
+                  f"Host: {args.host}\r\n"
+                  "Content-Type: application/json\r\n"
+                  f"Content-Length: {len(body)}\r\n"
+                  "\r\n").encode("latin-1") + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, value = line.decode("latin-1").split(":", 1)
+        if name.strip().lower() == "content-length":
+            length = int(value)
+
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def client(bodies, latencies, errors):
+    """Sends requests until all bodies are taken."""
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    try:
+        for body in bodies:
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, "POST", "/predict",
+                                      body)
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run():
+    with open(args.records) as records_file:
+        records = [line.strip().encode() for line in records_file]
+    records = [record for record in records if record]
+    # All clients share one iterator, hence every request is sent once.
+    bodies = itertools.islice(itertools.cycle(records), args.requests)
+
+    # Warm up the server, e.g. lazily loaded libraries.
+    await asyncio.gather(
+        client(itertools.islice(records, args.concurrency), [], []))
+
+    latencies = []
+    errors = []
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        client(bodies, latencies, errors) for _ in range(args.concurrency)
+    ])
+    duration = time.perf_counter() - start
+
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"{len(latencies)} requests with {args.concurrency} clients in "
+          f"{duration:.2f}s: {len(latencies) / duration:.1f} requests/s, "
+          f"p50 {p50:.1f}ms, p99 {p99:.1f}ms, {len(errors)} errors")
+
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    _, metrics = await request(reader, writer, "GET", "/metrics")
+    writer.close()
+    print("server:", json.dumps(metrics, indent=2))
+
+
+def main():
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("records",
+                        help="JSONL file with one record per line, e.g. "
+                        "the input of nlp4musa2020 score.")
+    parser.add_argument("--host",
+                        dest="host",
+                        default="127.0.0.1",
+                        help="The host of the server.")
+    parser.add_argument("--port",
+                        dest="port",
+                        type=int,
+                        default=8000,
+                        help="The port of the server.")
+    parser.add_argument("--requests",
+                        dest="requests",
+                        type=int,
+                        default=2000,
+                        help="The number of requests to send.")
+    parser.add_argument("--concurrency",
+                        dest="concurrency",
+                        type=int,
+                        default=32,
+                        help="The number of concurrent clients.")
+    args = parser.parse_args()
+
+    main()